@@ -14,27 +14,32 @@ Options:
 
 from docopt import docopt
 from flask import Flask, render_template, request, jsonify
-import json
 import os
-from datetime import datetime
+import threading
 import difflib
 
+from store import RequirementStore
+
 app = Flask(__name__)
 
 # Data storage
 REQUIREMENTS_FILE = 'requirements.json'
-
-def load_requirements():
-    """Load requirements from JSON file"""
-    if os.path.exists(REQUIREMENTS_FILE):
-        with open(REQUIREMENTS_FILE, 'r') as f:
-            return json.load(f)
-    return []
-
-def save_requirements(requirements):
-    """Save requirements to JSON file"""
-    with open(REQUIREMENTS_FILE, 'w') as f:
-        json.dump(requirements, f, indent=2)
+DATABASE_FILE = os.environ.get('TRACESPEC_DB', 'requirements.db')
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Open the requirement store, importing requirements.json on first run"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            store = RequirementStore(DATABASE_FILE)
+            if store.is_empty() and os.path.exists(REQUIREMENTS_FILE):
+                count = store.import_json(REQUIREMENTS_FILE)
+                print(f"Imported {count} requirements from {REQUIREMENTS_FILE} into {DATABASE_FILE}")
+            _store = store
+        return _store
 
 def generate_diff_html(old_text, new_text):
     """Generate HTML diff with red/green highlighting"""
@@ -64,20 +69,19 @@ def generate_diff_html(old_text, new_text):
 @app.route('/')
 def index():
     """Main page showing all requirements"""
-    requirements = load_requirements()
+    requirements = get_store().all()
     return render_template('index.html', requirements=requirements)
 
 @app.route('/requirements')
 def requirements_list():
     """Return requirements as HTML fragment"""
-    requirements = load_requirements()
+    requirements = get_store().all()
     return render_template('requirements_list.html', requirements=requirements)
 
 @app.route('/requirement/<int:req_id>')
 def requirement_detail(req_id):
     """Show detailed view of a requirement"""
-    requirements = load_requirements()
-    req = next((r for r in requirements if r['id'] == req_id), None)
+    req = get_store().get(req_id)
     if not req:
         return "Requirement not found", 404
     return render_template('requirement_detail.html', requirement=req)
@@ -85,10 +89,12 @@ def requirement_detail(req_id):
 @app.route('/requirement/<int:req_id>/diff/<int:version>')
 def requirement_diff(req_id, version):
     """Show diff between requirement versions"""
-    requirements = load_requirements()
-    req = next((r for r in requirements if r['id'] == req_id), None)
-    if not req or 'history' not in req or version >= len(req['history']):
+    store = get_store()
+    req = store.get(req_id)
+    entry = store.version(req_id, version) if req else None
+    if not entry:
         return "Version not found", 404
+    req['history'][version] = entry
 
     current_text = req['description']
     previous_text = req['history'][version]['description']
@@ -106,56 +112,31 @@ def new_requirement():
     if request.method == 'GET':
         return render_template('requirement_form.html')
 
-    requirements = load_requirements()
-    new_id = max([r['id'] for r in requirements], default=0) + 1
-
-    new_req = {
-        'id': new_id,
-        'title': request.form['title'],
-        'description': request.form['description'],
-        'priority': request.form['priority'],
-        'status': 'draft',
-        'created_at': datetime.now().isoformat(),
-        'updated_at': datetime.now().isoformat(),
-        'history': []
-    }
+    store = get_store()
+    store.create(request.form['title'], request.form['description'], request.form['priority'])
 
-    requirements.append(new_req)
-    save_requirements(requirements)
-
-    return render_template('requirements_list.html', requirements=requirements)
+    return render_template('requirements_list.html', requirements=store.all())
 
 @app.route('/requirement/<int:req_id>/edit', methods=['GET', 'POST'])
 def edit_requirement(req_id):
     """Edit existing requirement"""
-    requirements = load_requirements()
-    req = next((r for r in requirements if r['id'] == req_id), None)
-    if not req:
-        return "Requirement not found", 404
+    store = get_store()
 
     if request.method == 'GET':
+        req = store.get(req_id)
+        if not req:
+            return "Requirement not found", 404
         return render_template('requirement_form.html', requirement=req)
 
-    # Save current version to history before updating
-    if 'history' not in req:
-        req['history'] = []
-
-    req['history'].append({
-        'title': req['title'],
-        'description': req['description'],
-        'priority': req['priority'],
-        'updated_at': req['updated_at']
-    })
-
-    # Update requirement
-    req['title'] = request.form['title']
-    req['description'] = request.form['description']
-    req['priority'] = request.form['priority']
-    req['updated_at'] = datetime.now().isoformat()
-
-    save_requirements(requirements)
+    # The previous version is saved to history in the same transaction
+    req = store.update(req_id,
+                       request.form['title'],
+                       request.form['description'],
+                       request.form['priority'])
+    if not req:
+        return "Requirement not found", 404
 
-    return render_template('requirements_list.html', requirements=requirements)
+    return render_template('requirements_list.html', requirements=store.all())
 
 if __name__ == '__main__':
     args = docopt(__doc__)
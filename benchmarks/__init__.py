@@ -0,0 +1 @@
+"""Benchmarks for TraceSpec's load, ingest, show and diff paths."""
@@ -0,0 +1,124 @@
+"""
+Synthetic requirement corpora for benchmarking.
+
+A corpus is a throwaway Git repository laid out like ``requirements_repo``
+plus the CSV baselines that produced it, with a configurable number of
+subsystems, requirements per subsystem, baselines and text size.
+"""
+
+import csv
+import random
+import string
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tracespec.fastimport import fast_import_csvs
+
+WORDS = ("system shall provide support validate record report user data secure "
+         "interface process display store retrieve notify audit configure monitor "
+         "within seconds after before each every request response network access").split()
+
+
+@dataclass
+class CorpusShape:
+    subsystems: int = 4
+    requirements: int = 250
+    versions: int = 3
+    text_size: int = 200
+    # Fraction of requirements whose text changes between baselines
+    churn: float = 0.1
+    seed: int = 0
+
+
+@dataclass
+class Corpus:
+    shape: CorpusShape
+    root: Path
+    repo_dir: Path
+    csv_paths: list = field(default_factory=list)
+    tags: list = field(default_factory=list)
+    requirement_ids: list = field(default_factory=list)
+
+    @property
+    def subsystem_names(self):
+        return sorted({req_id[3:-5].lower() for req_id in self.requirement_ids})
+
+
+def subsystem_codes(count):
+    """Return ``count`` distinct three-letter subsystem codes."""
+    codes = []
+    for a in string.ascii_uppercase:
+        for b in string.ascii_uppercase:
+            for c in string.ascii_uppercase:
+                codes.append(a + b + c)
+                if len(codes) == count:
+                    return codes
+    raise ValueError("Too many subsystems")
+
+
+def _text(rng, req_id, size):
+    words = [f"The system shall [{req_id}]"]
+    length = len(words[0])
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words) + "."
+
+
+def write_baselines(shape, csv_dir):
+    """
+    Write ``shape.versions`` CSV baselines.
+
+    Returns:
+        tuple: (csv paths oldest first, requirement IDs)
+    """
+    rng = random.Random(shape.seed)
+    csv_dir.mkdir(parents=True, exist_ok=True)
+    ids = [f"SYS{code}{n:05d}"
+           for code in subsystem_codes(shape.subsystems)
+           for n in range(1, shape.requirements + 1)]
+    rows = {req_id: {'record_id': f"REC_{i:07d}",
+                     'requirement_id': req_id,
+                     'requirement_text': _text(rng, req_id, shape.text_size),
+                     'notes': f"Generated note {i}"}
+            for i, req_id in enumerate(ids, 1)}
+
+    paths = []
+    for version in range(1, shape.versions + 1):
+        if version > 1:
+            for req_id in rng.sample(ids, int(len(ids) * shape.churn)):
+                rows[req_id]['requirement_text'] = _text(rng, req_id, shape.text_size)
+                rows[req_id]['notes'] = f"Revised in baseline {version}"
+        path = csv_dir / f"baseline_v{version}.csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=['record_id', 'requirement_id', 'requirement_text', 'notes'])
+            writer.writeheader()
+            writer.writerows(rows[req_id] for req_id in ids)
+        paths.append(path)
+    return paths, ids
+
+
+def init_repo(root):
+    """Create an empty repository with a ``requirements`` folder and return that folder."""
+    repo_dir = root / "requirements_repo" / "requirements"
+    repo_dir.mkdir(parents=True)
+    subprocess.run(["git", "init", "-q", "-b", "main"], cwd=repo_dir.parent, check=True)
+    for key, value in (("user.name", "TraceSpec Bench"), ("user.email", "bench@example.com")):
+        subprocess.run(["git", "config", key, value], cwd=repo_dir.parent, check=True)
+    return repo_dir
+
+
+def build_corpus(root, shape=None):
+    """
+    Generate baselines and import them into a fresh repository under ``root``.
+
+    Every baseline becomes one commit and one tag (``v1.0``, ``v2.0``, ...).
+    """
+    shape = shape or CorpusShape()
+    root = Path(root)
+    csv_paths, ids = write_baselines(shape, root / "csv")
+    repo_dir = init_repo(root)
+    results = fast_import_csvs(csv_paths, repo_dir)
+    return Corpus(shape, root, repo_dir, csv_paths, [r['tag'] for r in results], ids)
@@ -0,0 +1,238 @@
+"""
+TraceSpec benchmarks
+
+Builds a synthetic corpus in a scratch folder, times the main read and
+write paths, and writes the results as JSON so runs can be compared across
+commits.  Run from the repository root with ``python -m benchmarks.run``.
+
+Usage:
+  benchmarks.run [options]
+
+Options:
+  --subsystems=<n>     Subsystems in the corpus [default: 4]
+  --requirements=<n>   Requirements per subsystem [default: 250]
+  --versions=<n>       Baselines (commits/tags) [default: 3]
+  --text-size=<n>      Characters of requirement text [default: 200]
+  --repeat=<n>         Timed repetitions per benchmark [default: 5]
+  --samples=<n>        Requirements sampled by per-item benchmarks [default: 50]
+  --workdir=<dir>      Build the corpus here instead of a temporary folder
+  --out=<file>         Write JSON results to this file instead of stdout
+"""
+
+import contextlib
+import io
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from docopt import docopt
+
+from tracespec import app as app_module
+from tracespec.cache import DiffCache
+from tracespec.index import RequirementIndex
+from tracespec.ingest import get_requirements_by_subsystem, ingest_csv
+from tracespec.utils import git_diff, git_show_file
+
+from .corpus import CorpusShape, build_corpus, init_repo
+
+
+def measure(fn, repeat, setup=None):
+    """
+    Time ``fn`` ``repeat`` times and summarize the wall-clock seconds.
+
+    ``setup`` runs untimed before every repetition.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return {
+        'repeat': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'max': max(timings),
+    }
+
+
+def bench_load(corpus, repeat):
+    results = {}
+    results['get_requirements_by_subsystem'] = measure(
+        lambda: get_requirements_by_subsystem(corpus.repo_dir), repeat)
+    results['index.cold_build'] = measure(
+        lambda: RequirementIndex(corpus.repo_dir).by_subsystem(), repeat)
+    warm = RequirementIndex(corpus.repo_dir)
+    warm.refresh()
+    results['index.warm_by_subsystem'] = measure(warm.by_subsystem, repeat)
+    return results
+
+
+def bench_ingest(corpus, repeat, scratch):
+    results = {}
+    target = scratch / "ingest"
+
+    def fresh_repo():
+        shutil.rmtree(target, ignore_errors=True)
+        target.mkdir()
+        return init_repo(target)
+
+    repo = {}
+
+    def cold_setup():
+        repo['dir'] = fresh_repo()
+
+    results['ingest_csv.cold'] = measure(
+        lambda: ingest_csv(corpus.csv_paths[0], repo['dir'], commit_mode='csv'), repeat, cold_setup)
+
+    results['ingest_csv.noop'] = measure(
+        lambda: ingest_csv(corpus.csv_paths[0], repo['dir'], commit_mode='csv'), repeat)
+
+    if len(corpus.csv_paths) > 1:
+        def partial_setup():
+            cold_setup()
+            with contextlib.redirect_stdout(io.StringIO()):
+                ingest_csv(corpus.csv_paths[0], repo['dir'], commit_mode='csv')
+
+        results['ingest_csv.partial'] = measure(
+            lambda: ingest_csv(corpus.csv_paths[1], repo['dir'], commit_mode='csv'), repeat, partial_setup)
+
+    shutil.rmtree(target, ignore_errors=True)
+    return results
+
+
+def _paths(corpus, sample_ids):
+    return [f"requirements/{req_id[3:-5].lower()}/{req_id}.json" for req_id in sample_ids]
+
+
+def bench_git(corpus, repeat, sample_ids):
+    results = {}
+    paths = _paths(corpus, sample_ids)
+    first, last = corpus.tags[0], corpus.tags[-1]
+
+    results['git_show_file'] = measure(
+        lambda: [git_show_file(path, last, corpus.repo_dir) for path in paths], repeat)
+    results['git_show_file']['items'] = len(paths)
+
+    results['git_diff.uncached'] = measure(
+        lambda: [git_diff(path, first, last, corpus.repo_dir) for path in paths], repeat)
+    results['git_diff.uncached']['items'] = len(paths)
+
+    cache = DiffCache()
+    for path in paths:
+        git_diff(path, first, last, corpus.repo_dir, cache=cache)
+    results['git_diff.cached'] = measure(
+        lambda: [git_diff(path, first, last, corpus.repo_dir, cache=cache) for path in paths], repeat)
+    results['git_diff.cached']['items'] = len(paths)
+    return results
+
+
+def bench_routes(corpus, repeat, sample_ids):
+    client = app_module.app.test_client()
+    first, last = corpus.tags[0], corpus.tags[-1]
+    subsystem = corpus.subsystem_names[0]
+
+    def get_all(urls):
+        for url in urls:
+            response = client.get(url)
+            if response.status_code >= 400:
+                raise RuntimeError(f"GET {url} returned {response.status_code}")
+
+    routes = {
+        'route.index': ["/"],
+        'route.subsystem': [f"/subsystem/{subsystem}"],
+        'route.requirement_detail': [f"/requirement/{req_id}" for req_id in sample_ids],
+        'route.view_latest': [f"/requirements/{req_id}" for req_id in sample_ids],
+        'route.view_version': [f"/requirements/{req_id}/{first}" for req_id in sample_ids],
+        'route.diff_view': [f"/requirements/{req_id}/diff/{first}/{last}" for req_id in sample_ids],
+    }
+    results = {}
+    repo_dir, app_module.REPO_DIR = app_module.REPO_DIR, corpus.repo_dir
+    try:
+        for name, urls in routes.items():
+            get_all(urls)  # warm up
+            results[name] = measure(lambda urls=urls: get_all(urls), repeat)
+            results[name]['items'] = len(urls)
+    finally:
+        app_module.REPO_DIR = repo_dir
+    return results
+
+
+def tracespec_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(shape, repeat, samples, workdir):
+    corpus = build_corpus(workdir / "corpus", shape)
+    rng = random.Random(shape.seed)
+    sample_ids = rng.sample(corpus.requirement_ids, min(samples, len(corpus.requirement_ids)))
+
+    results = {}
+    results.update(bench_load(corpus, repeat))
+    results.update(bench_git(corpus, repeat, sample_ids))
+    results.update(bench_routes(corpus, repeat, sample_ids))
+    results.update(bench_ingest(corpus, repeat, workdir))
+
+    return {
+        'meta': {
+            'tracespec_revision': tracespec_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'shape': vars(shape),
+            'requirements_total': len(corpus.requirement_ids),
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+    shape = CorpusShape(
+        subsystems=int(args['--subsystems']),
+        requirements=int(args['--requirements']),
+        versions=int(args['--versions']),
+        text_size=int(args['--text-size']),
+    )
+
+    if args['--workdir']:
+        workdir = Path(args['--workdir'])
+        workdir.mkdir(parents=True, exist_ok=True)
+        cleanup = None
+    else:
+        cleanup = tempfile.TemporaryDirectory(prefix="tracespec-bench-")
+        workdir = Path(cleanup.name)
+
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            report = run(shape, int(args['--repeat']), int(args['--samples']), workdir)
+    finally:
+        if cleanup is not None:
+            cleanup.cleanup()
+
+    output = json.dumps(report, indent=2)
+    if args['--out']:
+        Path(args['--out']).write_text(output + "\n", encoding="utf-8")
+        for name, result in report['results'].items():
+            print(f"{name:36s} median {result['median'] * 1000:9.2f} ms", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
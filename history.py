@@ -0,0 +1,113 @@
+"""
+TraceSpec - Reverse-delta encoding for requirement history
+
+Each history entry is stored as the difference needed to turn the next
+newer version back into it.  Appending an edit therefore never rewrites
+older entries.  Every KEYFRAME_INTERVAL-th entry is stored in full, so any
+version can be rebuilt by applying at most KEYFRAME_INTERVAL - 1 deltas.
+"""
+
+import difflib
+import json
+import re
+
+KEYFRAME_INTERVAL = 8
+FIELDS = ('title', 'description', 'priority')
+
+_TOKEN = re.compile(r'\s+|\S+')
+
+
+def is_keyframe(version):
+    """Whether the history entry at this version is stored in full"""
+    return version % KEYFRAME_INTERVAL == 0
+
+
+def _text_delta(base, target):
+    """Encode target as copies of word ranges from base plus inserted text"""
+    base_tokens = _TOKEN.findall(base)
+    target_tokens = _TOKEN.findall(target)
+    matcher = difflib.SequenceMatcher(None, base_tokens, target_tokens, autojunk=False)
+
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            text = ''.join(target_tokens[j1:j2])
+            if ops and isinstance(ops[-1], str):
+                ops[-1] += text
+            else:
+                ops.append(text)
+
+    # Fall back to the literal value when the delta would not be smaller
+    if len(json.dumps(ops)) >= len(json.dumps(target)):
+        return target
+    return ops
+
+
+def _apply_text_delta(base, delta):
+    if isinstance(delta, str):
+        return delta
+    base_tokens = _TOKEN.findall(base)
+    return ''.join(''.join(base_tokens[op[0]:op[1]]) if isinstance(op, list) else op
+                   for op in delta)
+
+
+def make_delta(base, target):
+    """
+    Encode the fields of target relative to base
+
+    Unchanged fields are omitted; changed fields hold either the literal
+    value or a list of copy ranges and inserted text.
+    """
+    delta = {}
+    for field in FIELDS:
+        if base[field] != target[field]:
+            delta[field] = _text_delta(base[field], target[field])
+    return delta
+
+
+def apply_delta(base, delta):
+    """Rebuild the version encoded by delta from the next newer version base"""
+    return {field: _apply_text_delta(base[field], delta[field]) if field in delta else base[field]
+            for field in FIELDS}
+
+
+def encode_history(entries, current):
+    """
+    Encode a full history list for storage
+
+    Args:
+        entries: history entries, oldest first, each with FIELDS
+        current: the current version of the requirement
+
+    Returns:
+        list of (keyframe, data) pairs, one per entry
+    """
+    encoded = []
+    for version, entry in enumerate(entries):
+        newer = entries[version + 1] if version + 1 < len(entries) else current
+        if is_keyframe(version):
+            data = {field: entry[field] for field in FIELDS}
+        else:
+            data = make_delta(newer, entry)
+        encoded.append((is_keyframe(version), data))
+    return encoded
+
+
+def decode_version(current, chain):
+    """
+    Rebuild one version from the current version and a chain of entries
+
+    Args:
+        current: the current version, used when no keyframe is in the chain
+        chain: (keyframe, data) pairs from the wanted version up to and
+            including the nearest keyframe, oldest first
+
+    Returns:
+        dict with FIELDS for the oldest entry in chain
+    """
+    version = {field: current[field] for field in FIELDS}
+    for keyframe, data in reversed(chain):
+        version = dict(data) if keyframe else apply_delta(version, data)
+    return version
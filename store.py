@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+TraceSpec - SQLite requirement store
+
+Keeps requirements and their edit history in a SQLite database so that a
+request touches only the rows it needs and concurrent edits are applied
+atomically instead of rewriting one JSON file.  History is stored as
+reverse deltas with periodic keyframes (see history.py).
+
+Usage:
+  store.py import <jsonfile> [--db=<db>]
+  store.py migrate [--db=<db>]
+  store.py -h | --help
+
+Options:
+  -h --help       Show this screen.
+  --db=<db>       Database file [default: requirements.db].
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from docopt import docopt
+
+from history import KEYFRAME_INTERVAL, decode_version, encode_history, is_keyframe, make_delta
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requirements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    requirement_id INTEGER NOT NULL REFERENCES requirements(id),
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    keyframe INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (requirement_id, version)
+);
+"""
+
+REQUIREMENT_FIELDS = ('id', 'title', 'description', 'priority', 'status', 'created_at', 'updated_at')
+HISTORY_FIELDS = ('title', 'description', 'priority', 'updated_at')
+
+
+class RequirementStore:
+    """SQLite-backed requirement storage with per-row reads and writes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        """Return this thread's connection, creating the schema on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            self._upgrade(conn)
+        return conn
+
+    def _upgrade(self, conn):
+        """Create the schema, converting full-copy history to deltas if needed"""
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another connection may have upgraded while we waited for the lock
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+                conn.execute('COMMIT')
+                return
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(history)')]
+            if 'title' in columns:
+                self._migrate_full_history(conn)
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _migrate_full_history(self, conn):
+        """Re-encode a version 1 history table, which held a full copy per edit"""
+        legacy = {}
+        for row in conn.execute('SELECT * FROM history ORDER BY requirement_id, version'):
+            legacy.setdefault(row['requirement_id'], []).append(
+                {field: row[field] for field in HISTORY_FIELDS})
+        conn.execute('ALTER TABLE history RENAME TO history_v1')
+        conn.execute(SCHEMA.split(';')[1])
+        for req_id, entries in legacy.items():
+            current = conn.execute('SELECT * FROM requirements WHERE id = ?', (req_id,)).fetchone()
+            self._insert_history(conn, req_id, entries, current)
+        conn.execute('DROP TABLE history_v1')
+        print(f"Converted history of {len(legacy)} requirements to reverse deltas")
+
+    def _insert_history(self, conn, req_id, entries, current):
+        for version, (entry, (keyframe, data)) in enumerate(zip(entries, encode_history(entries, current))):
+            conn.execute(
+                'INSERT INTO history (requirement_id, version, updated_at, keyframe, data) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (req_id, version, entry['updated_at'], int(keyframe), json.dumps(data)))
+
+    @contextmanager
+    def _transaction(self):
+        """Run a block in a write transaction, taking the write lock up front"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _history(self, conn, req_ids=None):
+        """
+        Return {requirement_id: [history entries, oldest first]}
+
+        Entries carry only 'version' and 'updated_at'; use version() to
+        rebuild the content of one entry.
+        """
+        query = 'SELECT requirement_id, version, updated_at FROM history'
+        params = ()
+        if req_ids is not None:
+            query += f" WHERE requirement_id IN ({','.join('?' * len(req_ids))})"
+            params = tuple(req_ids)
+        history = {}
+        for row in conn.execute(query + ' ORDER BY requirement_id, version', params):
+            history.setdefault(row['requirement_id'], []).append(
+                {'version': row['version'], 'updated_at': row['updated_at']})
+        return history
+
+    def all(self):
+        """Return every requirement with its history timestamps, ordered by ID"""
+        conn = self._connect()
+        rows = conn.execute('SELECT * FROM requirements ORDER BY id').fetchall()
+        history = self._history(conn)
+        return [dict(row, history=history.get(row['id'], [])) for row in rows]
+
+    def get(self, req_id):
+        """Return one requirement with its history timestamps, or None"""
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM requirements WHERE id = ?', (req_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(row, history=self._history(conn, [req_id]).get(req_id, []))
+
+    def version(self, req_id, version):
+        """
+        Rebuild one history entry of a requirement, or return None
+
+        Reads the entry and the deltas up to the nearest newer keyframe (or
+        the current row), so the cost is bounded by KEYFRAME_INTERVAL.
+        """
+        conn = self._connect()
+        current = conn.execute('SELECT * FROM requirements WHERE id = ?', (req_id,)).fetchone()
+        if current is None or version < 0:
+            return None
+        keyframe_at = -(-version // KEYFRAME_INTERVAL) * KEYFRAME_INTERVAL
+        rows = conn.execute(
+            'SELECT version, updated_at, keyframe, data FROM history '
+            'WHERE requirement_id = ? AND version BETWEEN ? AND ? ORDER BY version',
+            (req_id, version, keyframe_at)).fetchall()
+        if not rows or rows[0]['version'] != version:
+            return None
+        chain = [(bool(row['keyframe']), json.loads(row['data'])) for row in rows]
+        entry = decode_version(current, chain)
+        entry['updated_at'] = rows[0]['updated_at']
+        return entry
+
+    def is_empty(self):
+        conn = self._connect()
+        return conn.execute('SELECT 1 FROM requirements LIMIT 1').fetchone() is None
+
+    def create(self, title, description, priority, status='draft'):
+        """Insert a new requirement and return it"""
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'INSERT INTO requirements (title, description, priority, status, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (title, description, priority, status, now, now))
+        return self.get(cursor.lastrowid)
+
+    def update(self, req_id, title, description, priority):
+        """Snapshot the current version into history and apply an edit atomically"""
+        with self._transaction() as conn:
+            row = conn.execute('SELECT * FROM requirements WHERE id = ?', (req_id,)).fetchone()
+            if row is None:
+                return None
+            version = conn.execute('SELECT COUNT(*) FROM history WHERE requirement_id = ?',
+                                   (req_id,)).fetchone()[0]
+            # Older entries are deltas against the row being replaced, which
+            # is exactly what this new entry holds, so they stay valid
+            edited = {'title': title, 'description': description, 'priority': priority}
+            if is_keyframe(version):
+                data = {field: row[field] for field in edited}
+            else:
+                data = make_delta(edited, row)
+            conn.execute(
+                'INSERT INTO history (requirement_id, version, updated_at, keyframe, data) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (req_id, version, row['updated_at'], int(is_keyframe(version)), json.dumps(data)))
+            conn.execute(
+                'UPDATE requirements SET title = ?, description = ?, priority = ?, updated_at = ? WHERE id = ?',
+                (title, description, priority, datetime.now().isoformat(), req_id))
+        return self.get(req_id)
+
+    def import_json(self, json_path):
+        """
+        Load requirements and history from a legacy requirements.json file
+
+        Existing IDs are kept, so links to /requirement/<id> stay valid, and
+        full-copy history entries are re-encoded as reverse deltas.
+        Returns the number of requirements imported.
+        """
+        with open(json_path, 'r') as f:
+            requirements = json.load(f)
+
+        with self._transaction() as conn:
+            for req in requirements:
+                conn.execute(
+                    f"INSERT INTO requirements ({', '.join(REQUIREMENT_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    tuple(req.get(field, 'draft' if field == 'status' else '') for field in REQUIREMENT_FIELDS))
+                entries = [{field: entry.get(field, '') for field in HISTORY_FIELDS}
+                           for entry in req.get('history', [])]
+                self._insert_history(conn, req['id'], entries, req)
+        return len(requirements)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+
+    if args['migrate']:
+        if not os.path.exists(args['--db']):
+            raise SystemExit(f"{args['--db']} does not exist")
+        size_before = os.path.getsize(args['--db'])
+        store = RequirementStore(args['--db'])
+        store._connect().execute('VACUUM')
+        print(f"{args['--db']}: {size_before} -> {os.path.getsize(args['--db'])} bytes")
+
+    elif args['import']:
+        store = RequirementStore(args['--db'])
+        if not store.is_empty():
+            raise SystemExit(f"{args['--db']} already contains requirements; refusing to import twice")
+        count = store.import_json(args['<jsonfile>'])
+        print(f"Imported {count} requirements into {args['--db']}")
@@ -0,0 +1,32 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+@pytest.fixture
+def repo_dir(tmp_path, monkeypatch):
+    """An empty Git repository with a ``requirements`` folder, as ingest expects."""
+    for var, value in [("GIT_AUTHOR_NAME", "Test"), ("GIT_AUTHOR_EMAIL", "test@example.com"),
+                       ("GIT_COMMITTER_NAME", "Test"), ("GIT_COMMITTER_EMAIL", "test@example.com")]:
+        monkeypatch.setenv(var, value)
+
+    root = tmp_path / "requirements_repo"
+    requirements = root / "requirements"
+    requirements.mkdir(parents=True)
+    subprocess.run(["git", "init", "-q", "-b", "main"], cwd=root, check=True)
+    return requirements
+
+
+@pytest.fixture
+def csv_versions():
+    """The sample baselines in test/data, oldest first."""
+    return [DATA_DIR / f"requirements_v{i}.csv" for i in (1, 2, 3)]
+
+
+def commit_count(repo_dir):
+    result = subprocess.run(["git", "rev-list", "--count", "HEAD"],
+                            cwd=repo_dir, capture_output=True, text=True, check=True)
+    return int(result.stdout)
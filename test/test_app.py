@@ -0,0 +1,152 @@
+import io
+import subprocess
+
+import pytest
+
+from tracespec import app as app_module
+from tracespec.ingest import ingest_csv
+
+from conftest import commit_count
+
+
+@pytest.fixture
+def client(repo_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "REPO_DIR", repo_dir)
+    monkeypatch.setattr(app_module, "SPOOL_DIR", tmp_path / "spool")
+    monkeypatch.setattr(app_module, "_ingest_queue", None)
+    return app_module.app.test_client()
+
+
+def upload(client, csv_path):
+    data = {'file': (io.BytesIO(csv_path.read_bytes()), csv_path.name)}
+    return client.post("/upload", data=data, content_type="multipart/form-data")
+
+
+def test_upload_returns_job_and_ingests_in_background(client, repo_dir, csv_versions):
+    first = upload(client, csv_versions[0])
+    second = upload(client, csv_versions[2])
+    assert first.status_code == 202
+    assert first.headers['Location'].endswith(f"/jobs/{first.json['id']}")
+
+    app_module.get_ingest_queue().join()
+
+    status = client.get(f"/jobs/{first.json['id']}").json
+    assert status['status'] == 'done'
+    assert status['result'] == {'processed': 10, 'updated': 10, 'errors': 0}
+    assert client.get(f"/jobs/{second.json['id']}").json['progress']['processed'] == 17
+    assert [job['id'] for job in client.get("/jobs").json] == [first.json['id'], second.json['id']]
+    # One commit per upload, and the spool files are cleaned up
+    assert commit_count(repo_dir) == 2
+    assert list((repo_dir.parent.parent / "spool").iterdir()) == []
+
+
+def test_failed_job_reports_error(client, tmp_path):
+    bad = tmp_path / "bad.csv"
+    bad.write_text("wrong,columns\n1,2\n")
+    job_id = upload(client, bad).json['id']
+
+    app_module.get_ingest_queue().join()
+
+    status = client.get(f"/jobs/{job_id}").json
+    assert status['status'] == 'failed'
+    assert 'missing required columns' in status['error']
+
+
+def test_unknown_job(client):
+    assert client.get("/jobs/nope").status_code == 404
+
+
+def test_metrics_endpoint_reports_routes_git_and_caches(client, repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    ingest_csv(csv_versions[1], repo_dir, commit_mode='csv')
+    client.get("/requirements/SYSAUTH00002/diff/HEAD~1/HEAD")
+    client.get("/subsystem/auth")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    assert 'route="/subsystem/<subsystem>"' in text
+    assert 'tracespec_git_command_duration_seconds_count{command="commit"}' in text
+    assert 'tracespec_git_object_request_duration_seconds_count{mode="batch"}' in text
+    assert 'tracespec_cache_misses_total{cache="diff"}' in text
+
+
+def test_requirement_responses_revalidate_by_blob_id(client, repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_dir,
+                          capture_output=True, text=True, check=True).stdout.strip()
+    blob = subprocess.run(["git", "rev-parse", "HEAD:./auth/SYSAUTH00001.json"], cwd=repo_dir,
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+    latest = client.get("/requirements/SYSAUTH00001")
+    assert latest.headers['ETag'] == f'"{blob}"'
+    assert latest.headers['Cache-Control'] == "no-cache"
+    again = client.get("/requirements/SYSAUTH00001", headers={'If-None-Match': f'"{blob}"'})
+    assert again.status_code == 304 and again.data == b""
+
+    # Only a full commit id pins the content for good
+    pinned = client.get(f"/requirements/SYSAUTH00001/{head}")
+    assert pinned.headers['ETag'] == f'"{blob}"'
+    assert "immutable" in pinned.headers['Cache-Control']
+    assert client.get(f"/requirements/SYSAUTH00001/{head}",
+                      headers={'If-None-Match': f'"{blob}"'}).status_code == 304
+    assert client.get("/requirements/SYSAUTH00001/main").headers['Cache-Control'] == "no-cache"
+    assert 'ETag' not in client.get("/requirements/SYSAUTH99999/main").headers
+
+
+def test_latest_body_matches_its_etag_during_uncommitted_edits(client, repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    first = client.get("/requirements/SYSAUTH00003")
+    etag = first.headers['ETag']
+
+    # Same size, different bytes, not committed yet
+    path = repo_dir / "auth" / "SYSAUTH00003.json"
+    text = path.read_text()
+    path.write_text(text.replace("Basic", "BASIC"))
+    assert path.read_text() != text and len(path.read_text()) == len(text)
+    assert client.get("/requirements/SYSAUTH00003", headers={'If-None-Match': etag}).status_code == 304
+    assert client.get("/requirements/SYSAUTH00003").data == first.data
+
+    subprocess.run(["git", "commit", "-qam", "Edit"], cwd=repo_dir, check=True)
+    edited = client.get("/requirements/SYSAUTH00003", headers={'If-None-Match': etag})
+    assert edited.status_code == 200 and edited.headers['ETag'] != etag
+    assert edited.data.decode() == path.read_text()
+
+
+@pytest.mark.parametrize("url", ["/", "/subsystem/auth", "/requirement/SYSAUTH00003"])
+def test_pages_match_their_etag_during_uncommitted_edits(client, repo_dir, csv_versions, url):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    first = client.get(url)
+    etag = first.headers['ETag']
+
+    # An edited and an added file, neither committed yet
+    path = repo_dir / "auth" / "SYSAUTH00003.json"
+    path.write_text(path.read_text().replace("Basic password policy", "Uncommitted policy"))
+    (repo_dir / "auth" / "SYSAUTH00099.json").write_text((repo_dir / "auth" / "SYSAUTH00001.json")
+                                                         .read_text().replace("00001", "00099"))
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert client.get(url).data == first.data
+
+    subprocess.run(["git", "add", "-A"], cwd=repo_dir, check=True)
+    subprocess.run(["git", "commit", "-qm", "Edit"], cwd=repo_dir, check=True)
+    edited = client.get(url, headers={'If-None-Match': etag})
+    assert edited.status_code == 200 and edited.headers['ETag'] != etag
+    assert edited.data != first.data
+
+
+def test_latest_rejects_malformed_id(client, repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    response = client.get("/requirements/12345")
+    assert response.status_code == 400
+
+
+def test_listing_etag_follows_head(client, repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    etag = client.get("/subsystem/auth").headers['ETag']
+    assert client.get("/subsystem/auth", headers={'If-None-Match': etag}).status_code == 304
+
+    ingest_csv(csv_versions[1], repo_dir, commit_mode='csv')
+    page = client.get("/subsystem/auth", headers={'If-None-Match': etag})
+    assert page.status_code == 200 and page.headers['ETag'] != etag
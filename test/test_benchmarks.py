@@ -0,0 +1,25 @@
+import json
+
+from benchmarks import run
+from benchmarks.corpus import CorpusShape, build_corpus
+
+
+def test_build_corpus_tags_each_baseline(tmp_path):
+    corpus = build_corpus(tmp_path, CorpusShape(subsystems=2, requirements=5, versions=2))
+
+    assert corpus.tags == ["v1.0", "v2.0"]
+    assert len(corpus.requirement_ids) == 10
+    assert len(corpus.subsystem_names) == 2
+    assert len(list(corpus.repo_dir.glob("*/*.json"))) == 10
+
+
+def test_run_writes_json_report(tmp_path):
+    out = tmp_path / "bench.json"
+    run.main(["--subsystems=1", "--requirements=3", "--versions=2", "--repeat=1",
+              "--samples=2", f"--workdir={tmp_path / 'work'}", f"--out={out}"])
+
+    report = json.loads(out.read_text())
+    assert report['meta']['shape']['requirements'] == 3
+    for name in ('get_requirements_by_subsystem', 'ingest_csv.cold', 'ingest_csv.noop',
+                 'ingest_csv.partial', 'git_show_file', 'git_diff.uncached', 'route.diff_view'):
+        assert report['results'][name]['repeat'] == 1
@@ -0,0 +1,45 @@
+import subprocess
+
+from tracespec.cache import DiffCache, LRUCache
+from tracespec.ingest import ingest_csv
+from tracespec.utils import git_diff
+
+
+def test_lru_cache_evicts_by_size():
+    cache = LRUCache(max_bytes=10)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'yyyy')
+    assert cache.get('a') == 'xxxx'
+
+    cache.put('c', 'zzzz')
+
+    assert 'b' not in cache
+    assert cache.get('a') == 'xxxx'
+    assert cache.stats()['bytes'] == 8
+    assert cache.stats()['evictions'] == 1
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_lru_cache_skips_oversized_values():
+    cache = LRUCache(max_bytes=3)
+    cache.put('a', 'abcd')
+    assert len(cache) == 0
+
+
+def test_diff_cache_serves_repeat_diffs(repo_dir, csv_versions, tmp_path, monkeypatch):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    ingest_csv(csv_versions[1], repo_dir, commit_mode='csv')
+    path = "requirements/auth/SYSAUTH00002.json"
+
+    cache = DiffCache(max_bytes=1024 * 1024, directory=tmp_path / "diffs")
+    first = git_diff(path, "HEAD~1", "HEAD", repo_dir, cache=cache)
+    assert cache.stats()['misses'] == 1
+
+    # A second cache over the same directory stands in for a restart
+    restarted = DiffCache(max_bytes=1024 * 1024, directory=tmp_path / "diffs")
+    monkeypatch.setattr(subprocess, "Popen", None)
+    assert git_diff(path, "HEAD~1", "HEAD", repo_dir, cache=restarted) == first
+    assert git_diff(path, "HEAD~1", "HEAD", repo_dir, cache=restarted) == first
+    assert restarted.stats()['hits'] == 2
+    assert restarted.stats()['disk_hits'] == 1
@@ -0,0 +1,82 @@
+import json
+import subprocess
+
+import pytest
+
+from tracespec import app as app_module
+from tracespec.compare import compare_commits, field_changes, tree_changes
+from tracespec.fastimport import fast_import_csvs
+from tracespec.gitobjects import GitObjectMissing
+
+
+@pytest.fixture
+def baselines(repo_dir, csv_versions):
+    fast_import_csvs(csv_versions, repo_dir)
+    return repo_dir
+
+
+def name_status(repo_dir, commit1, commit2):
+    output = subprocess.run(["git", "diff", "--name-status", "--relative", commit1, commit2],
+                            cwd=repo_dir, capture_output=True, text=True, check=True).stdout
+    return {line.split("\t")[1].split("/")[1][:-len(".json")]: line[0] for line in output.splitlines()}
+
+
+def test_tree_changes_lists_changed_blobs(baselines):
+    changes = list(tree_changes("v1.0", "v3.0", baselines))
+    expected = name_status(baselines, "v1.0", "v3.0")
+    assert {req_id: change[0].upper() for change, _sub, req_id, _old, _new in changes} == \
+        {req_id: 'R' if status == 'D' else status for req_id, status in expected.items()}
+
+    for change, subsystem, req_id, old_oid, new_oid in changes:
+        path = f"./{subsystem}/{req_id}.json"
+        if change != 'added':
+            assert old_oid == subprocess.run(["git", "rev-parse", f"v1.0:{path}"], cwd=baselines,
+                                             capture_output=True, text=True, check=True).stdout.strip()
+        if change != 'removed':
+            assert new_oid == subprocess.run(["git", "rev-parse", f"v3.0:{path}"], cwd=baselines,
+                                             capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_compare_matches_git_and_reports_fields(baselines):
+    records = list(compare_commits("v1.0", "v3.0", baselines))
+    summary = records.pop()['summary']
+
+    expected = name_status(baselines, "v1.0", "v3.0")
+    assert {r['requirement_id']: r['change'][0].upper() for r in records} == \
+        {req_id: 'R' if status == 'D' else status for req_id, status in expected.items()}
+    assert summary['added'] + summary['removed'] + summary['modified'] == len(records)
+    assert sum(counts['modified'] for counts in summary['subsystems'].values()) == summary['modified']
+
+    # Records arrive grouped by subsystem
+    subsystems = [r['subsystem'] for r in records]
+    assert subsystems == sorted(subsystems)
+
+    changed = next(r for r in records if r['requirement_id'] == "SYSAUTH00002")
+    assert changed['change'] == 'modified'
+    assert set(changed['fields']) <= {'record_id', 'requirement_text', 'notes'}
+    assert changed['fields']
+    assert all(r['requirement_id'] != "SYSAUTH00001" for r in records)
+
+
+def test_compare_unknown_commit(baselines):
+    with pytest.raises(GitObjectMissing):
+        compare_commits("v1.0", "v9.0", baselines)
+
+
+def test_field_changes():
+    assert field_changes({'a': 1, 'b': 2}, {'a': 1, 'b': 3, 'c': 4}) == {
+        'b': {'old': 2, 'new': 3}, 'c': {'old': None, 'new': 4}}
+
+
+def test_compare_endpoint_streams_ndjson(baselines, monkeypatch):
+    monkeypatch.setattr(app_module, "REPO_DIR", baselines)
+    client = app_module.app.test_client()
+
+    response = client.get("/compare/v1.0/v2.0")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[:-1] == list(compare_commits("v1.0", "v2.0", baselines))[:-1]
+    assert 'summary' in lines[-1]
+
+    assert client.get("/compare/v1.0/nope").status_code == 404
@@ -0,0 +1,81 @@
+import pytest
+
+from tracespec.compiled import CompiledSnapshot, build_snapshot_file, snapshot_path
+from tracespec.fastimport import fast_import_csvs
+from tracespec.index import RequirementIndex
+from tracespec.ingest import ingest_csv
+
+
+def commit_of(path):
+    snapshot = CompiledSnapshot(path)
+    try:
+        return snapshot.commit
+    finally:
+        snapshot.close()
+
+
+@pytest.fixture
+def baselines(repo_dir, csv_versions):
+    fast_import_csvs(csv_versions[:2], repo_dir)
+    return repo_dir
+
+
+def test_snapshot_round_trips_the_index(baselines):
+    info = build_snapshot_file(baselines)
+    assert info['path'] == snapshot_path(baselines)
+
+    snapshot = CompiledSnapshot(info['path'])
+    try:
+        assert snapshot.commit == info['commit']
+        compiled = snapshot.by_subsystem()
+    finally:
+        snapshot.close()
+
+    expected = RequirementIndex(baselines)
+    expected.refresh()
+    assert compiled == expected._records
+
+
+def test_cold_load_uses_snapshot_only_while_current(baselines, csv_versions, monkeypatch):
+    build_snapshot_file(baselines)
+    expected = RequirementIndex(baselines).by_subsystem()
+
+    def no_json(self, name):
+        raise AssertionError("read JSON files despite a current snapshot")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(RequirementIndex, "_load_subsystem", no_json)
+        assert RequirementIndex(baselines).by_subsystem() == expected
+
+    # A stale snapshot is not used, so the JSON files are read and it is rebuilt
+    built_at = commit_of(snapshot_path(baselines))
+    build_snapshot_file(baselines, commit="v1.0")
+    loaded = []
+    original = RequirementIndex._load_subsystem
+    monkeypatch.setattr(RequirementIndex, "_load_subsystem",
+                        lambda self, name: loaded.append(name) or original(self, name))
+    assert RequirementIndex(baselines).by_subsystem() == expected
+    assert loaded
+    assert commit_of(snapshot_path(baselines)) == built_at
+
+    # Ingest leaves the file alone; the first cold load after it rebuilds it
+    ingest_csv(csv_versions[2], baselines, commit_mode='csv')
+    assert commit_of(snapshot_path(baselines)) == built_at
+    loaded.clear()
+    index = RequirementIndex(baselines)
+    assert sum(index.counts().values()) > sum(len(reqs) for reqs in expected.values())
+    assert loaded
+    assert commit_of(snapshot_path(baselines)) == index.commit
+
+    loaded.clear()
+    assert RequirementIndex(baselines).by_subsystem() == index.by_subsystem()
+    assert not loaded
+
+
+def test_corrupt_snapshot_is_ignored(baselines):
+    path = build_snapshot_file(baselines)['path']
+    path.write_bytes(b"junk")
+
+    with pytest.raises(ValueError):
+        CompiledSnapshot(path)
+    assert RequirementIndex(baselines).counts()
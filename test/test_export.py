@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from tracespec import app as app_module
+from tracespec.fastimport import fast_import_csvs
+from tracespec.ingest import get_requirements_by_subsystem
+
+
+@pytest.fixture
+def client(repo_dir, csv_versions, monkeypatch):
+    fast_import_csvs(csv_versions, repo_dir)
+    monkeypatch.setattr(app_module, "REPO_DIR", repo_dir)
+    return app_module.app.test_client()
+
+
+def ndjson(response):
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_bulk_get_at_head_and_at_commit(client, repo_dir):
+    ids = ["SYSAUTH00002", "SYSAUTH99999", "BOGUS"]
+    head = client.post("/requirements/bulk", json={'ids': ids}).json
+    assert list(head['requirements']) == ["SYSAUTH00002"]
+    assert head['missing'] == ["SYSAUTH99999", "BOGUS"]
+
+    old = client.post("/requirements/bulk", json={'ids': ids, 'commit': "v1.0"}).json
+    assert old['requirements']["SYSAUTH00002"] != head['requirements']["SYSAUTH00002"]
+    assert old['requirements']["SYSAUTH00002"] == next(
+        r for r in get_requirements_by_subsystem(repo_dir, commit="v1.0")['auth']
+        if r['requirement_id'] == "SYSAUTH00002")
+
+
+def test_bulk_get_rejects_bad_input(client, monkeypatch):
+    assert client.post("/requirements/bulk", json={'ids': "SYSAUTH00001"}).status_code == 400
+    assert client.post("/requirements/bulk", data="not json").status_code == 400
+    assert client.post("/requirements/bulk", json=["SYSAUTH00001"]).status_code == 400
+    for commit in (5, ["v1.0"], {'ref': "v1.0"}):
+        response = client.post("/requirements/bulk", json={'ids': [], 'commit': commit})
+        assert response.status_code == 400
+        assert response.json == {'error': "Expected 'commit' to be a string"}
+    monkeypatch.setattr(app_module, "MAX_BULK_IDS", 1)
+    assert client.post("/requirements/bulk", json={'ids': ["a", "b"]}).status_code == 413
+    assert client.post("/requirements/bulk", json={'ids': [], 'commit': "nope"}).status_code == 404
+
+
+def test_export_streams_all_or_one_subsystem(client, repo_dir):
+    expected = get_requirements_by_subsystem(repo_dir)
+    assert ndjson(client.get("/export")) == [r for name in sorted(expected) for r in expected[name]]
+    assert ndjson(client.get("/export/AUTH")) == expected['auth']
+
+    old = get_requirements_by_subsystem(repo_dir, commit="v1.0")
+    assert ndjson(client.get("/export?at=v1.0")) == [r for name in sorted(old) for r in old[name]]
+    assert ndjson(client.get("/export/auth?at=v1.0")) == old['auth']
+    assert client.get("/export?at=nope").status_code == 404
@@ -0,0 +1,58 @@
+import subprocess
+
+import pytest
+
+from tracespec.fastimport import fast_import_csvs
+from tracespec.ingest import ingest_csv, ingest_multiple_csvs, get_requirements_by_subsystem
+
+from conftest import commit_count
+
+
+def git(repo_dir, *args):
+    return subprocess.run(["git", *args], cwd=repo_dir, capture_output=True,
+                          text=True, check=True).stdout
+
+
+def test_fast_import_matches_sequential_ingest(repo_dir, csv_versions):
+    results = fast_import_csvs(csv_versions, repo_dir)
+
+    assert [r['tag'] for r in results] == ['v1.0', 'v2.0', 'v3.0']
+    assert [r['processed'] for r in results] == [10, 13, 17]
+    assert commit_count(repo_dir) == 3
+    assert git(repo_dir, "tag", "-l").split() == ['v1.0', 'v2.0', 'v3.0']
+    assert git(repo_dir, "status", "--porcelain") == ""
+
+    # The imported tree is exactly what ingest would write for the last baseline
+    assert ingest_csv(csv_versions[-1], repo_dir, commit_mode='csv')['updated'] == 0
+
+
+def test_fast_import_deduplicates_blobs(repo_dir, csv_versions):
+    fast_import_csvs([csv_versions[0], csv_versions[0]], repo_dir, tag_format="b{n}")
+
+    blobs = [line for line in git(repo_dir, "rev-list", "--objects", "--all").splitlines()
+             if line.endswith(".json")]
+    assert len(blobs) == 10
+    # The unchanged second baseline is tagged on the first commit
+    assert git(repo_dir, "rev-parse", "b1^{commit}") == git(repo_dir, "rev-parse", "b2^{commit}")
+
+
+def test_fast_import_on_top_of_existing_history(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    fast_import_csvs(csv_versions[1:], repo_dir, tag_format="{name}")
+
+    assert commit_count(repo_dir) == 3
+    assert git(repo_dir, "status", "--porcelain") == ""
+    assert len(get_requirements_by_subsystem(repo_dir)['auth']) == 5
+
+
+def test_fast_import_refuses_existing_tags(repo_dir, csv_versions):
+    fast_import_csvs(csv_versions[:1], repo_dir)
+    with pytest.raises(ValueError):
+        fast_import_csvs(csv_versions[1:], repo_dir)
+
+
+def test_ingest_multiple_csvs_tags_each_version(repo_dir, csv_versions):
+    results = ingest_multiple_csvs(csv_versions, repo_dir)
+
+    assert [r['errors'] for r in results] == [0, 0, 1]
+    assert git(repo_dir, "tag", "-l").split() == ['v1.0', 'v2.0', 'v3.0']
@@ -0,0 +1,72 @@
+import subprocess
+
+import pytest
+
+from tracespec import app as app_module
+from tracespec.fragments import get_fragment_cache
+from tracespec.gitobjects import GitObjectReader
+from tracespec.ingest import ingest_csv
+
+
+@pytest.fixture
+def client(repo_dir, monkeypatch):
+    monkeypatch.setattr(app_module, "REPO_DIR", repo_dir)
+    return app_module.app.test_client()
+
+
+PAGES = ["/subsystem/auth", "/subsystem/nav", "/requirement/SYSAUTH00001", "/requirement/SYSAUTH00002"]
+
+
+def test_pages_are_served_from_rendered_fragments(client, repo_dir, csv_versions, monkeypatch):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    first = [client.get(page).data for page in PAGES]
+    cache = get_fragment_cache(repo_dir)
+    assert len(cache) == 4
+
+    def no_render(*args, **kwargs):
+        raise AssertionError("re-rendered a cached fragment")
+
+    monkeypatch.setattr(app_module, "render_template", no_render)
+    monkeypatch.setattr(app_module, "requirement_detail_card", no_render)
+    # Hot pages find their object ids without asking git again
+    monkeypatch.setattr(GitObjectReader, "info", no_render)
+    monkeypatch.setattr(GitObjectReader, "read", no_render)
+    assert [client.get(page).data for page in PAGES] == first
+    assert cache.stats()['hits'] == 4
+
+    # ?at= changes the links in the list, so it is a separate fragment
+    monkeypatch.undo()
+    monkeypatch.setattr(app_module, "REPO_DIR", repo_dir)
+    assert b"at=main" in client.get("/subsystem/auth?at=main").data
+    client.get("/requirement/SYSAUTH00001?at=main")
+    assert len(cache) == 6
+
+
+def test_uncommitted_edits_are_not_cached_under_committed_ids(client, repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    path = repo_dir / "auth" / "SYSAUTH00003.json"
+    path.write_text(path.read_text().replace("Basic password policy", "Uncommitted policy"))
+
+    for page in ("/subsystem/auth", "/requirement/SYSAUTH00003"):
+        data = client.get(page).data
+        assert b"Basic password policy" in data and b"Uncommitted" not in data
+
+    subprocess.run(["git", "commit", "-qam", "Edit"], cwd=repo_dir, check=True)
+    for page in ("/subsystem/auth", "/requirement/SYSAUTH00003"):
+        assert b"Uncommitted policy" in client.get(page).data
+
+
+def test_ingest_drops_only_replaced_fragments(client, repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    for page in PAGES:
+        client.get(page)
+    cache = get_fragment_cache(repo_dir)
+
+    # v2 changes SYSAUTH00002 and the auth folder; nav and SYSAUTH00001 are untouched
+    ingest_csv(csv_versions[1], repo_dir, commit_mode='csv')
+    assert len(cache) == 2
+    hits = cache.stats()['hits']
+    client.get("/subsystem/nav")
+    client.get("/requirement/SYSAUTH00001")
+    assert cache.stats()['hits'] == hits + 2
+    assert b"12 characters" in client.get("/subsystem/auth").data
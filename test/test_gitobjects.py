@@ -0,0 +1,103 @@
+import subprocess
+import threading
+
+import pytest
+
+from tracespec.gitobjects import GitObjectMissing, GitObjectReader
+from tracespec.ingest import ingest_csv
+from tracespec.utils import git_diff, git_show_file
+
+
+def rev_parse(repo_dir, rev):
+    return subprocess.run(["git", "rev-parse", rev], cwd=repo_dir,
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+
+@pytest.fixture
+def two_baselines(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    first = rev_parse(repo_dir, "HEAD")
+    ingest_csv(csv_versions[2], repo_dir, commit_mode='csv')
+    return first, rev_parse(repo_dir, "HEAD")
+
+
+def test_show_file_matches_git_show(repo_dir, two_baselines):
+    first, _ = two_baselines
+    path = "requirements/auth/SYSAUTH00001.json"
+    expected = subprocess.run(["git", "show", f"{first}:{path}"], cwd=repo_dir,
+                              capture_output=True, text=True, check=True).stdout
+
+    assert git_show_file(path, first, repo_dir) == expected
+
+
+def test_show_missing_file(repo_dir, two_baselines):
+    with pytest.raises(GitObjectMissing):
+        git_show_file("requirements/auth/SYSAUTH99999.json", "HEAD", repo_dir)
+
+
+@pytest.mark.parametrize("path", ["requirements/auth/SYSAUTH00002.json",
+                                  "requirements/auth/SYSAUTH00005.json"])
+def test_diff_matches_git_diff(repo_dir, two_baselines, path):
+    first, second = two_baselines
+    expected = subprocess.run(["git", "diff", first, second, "--", path], cwd=repo_dir.parent,
+                              capture_output=True, text=True, check=True).stdout
+
+    assert expected
+    assert git_diff(path, first, second, repo_dir) == expected
+    assert git_diff(path, second, second, repo_dir) == ""
+
+
+def test_diff_unknown_commit(repo_dir, two_baselines):
+    with pytest.raises(GitObjectMissing):
+        git_diff("requirements/auth/SYSAUTH00001.json", "nosuchref", "HEAD", repo_dir)
+
+
+def test_reader_restarts_dead_worker(repo_dir, two_baselines):
+    reader = GitObjectReader(repo_dir, size=1)
+    try:
+        assert reader.read("HEAD").type == "commit"
+        worker = reader._contents._idle.get_nowait()
+        worker.proc.kill()
+        worker.proc.wait()
+        reader._contents._release(worker)
+
+        assert reader.read("HEAD").type == "commit"
+    finally:
+        reader.close()
+
+
+def test_reader_is_thread_safe(repo_dir, two_baselines):
+    reader = GitObjectReader(repo_dir, size=2)
+    expected = reader.read("HEAD:requirements/auth/SYSAUTH00001.json").data
+    results = []
+
+    def work():
+        for _ in range(20):
+            results.append(reader.read("HEAD:requirements/auth/SYSAUTH00001.json").data)
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    reader.close()
+
+    assert len(results) == 120
+    assert all(r == expected for r in results)
+
+
+def test_read_many_keeps_order_and_reports_missing(repo_dir, two_baselines, monkeypatch):
+    monkeypatch.setattr("tracespec.gitobjects.BATCH_SIZE", 2)
+    first, second = two_baselines
+    specs = [f"{first}:requirements/auth/SYSAUTH00001.json",
+             f"{second}:requirements/auth/SYSAUTH99999.json",
+             f"{second}:requirements/auth/SYSAUTH00002.json"]
+    reader = GitObjectReader(repo_dir, size=1)
+    try:
+        objects = reader.read_many(specs)
+    finally:
+        reader.close()
+
+    assert objects[1] is None
+    assert objects[0].data.decode() == git_show_file(specs[0].split(":", 1)[1], first, repo_dir)
+    assert objects[2].data.decode() == git_show_file(specs[2].split(":", 1)[1], second, repo_dir)
@@ -0,0 +1,107 @@
+import json
+import subprocess
+
+import pytest
+
+from tracespec import app as app_module
+from tracespec.graph import LinkGraph
+from tracespec.ingest import ingest_csv
+
+HEADER = "record_id,requirement_id,requirement_text,notes,parents,children,derived_from\n"
+ROWS = [
+    "R1,SYSREQ00001,Top level,,,,",
+    "R2,SYSAUTH00001,Log in,,SYSREQ00001,,",
+    "R3,SYSAUTH00002,Log out,,,,SYSAUTH00001",
+    "R4,SYSNAV00001,Menu,,,SYSNAV00002,",
+    "R5,SYSNAV00002,Submenu,,SYSNAV00001,,",
+    "R6,SYSDATA00001,Backups,,,,",
+    "R7,SYSRPT00001,Report,,SYSRPT00002,,",
+    "R8,SYSRPT00002,Summary,,SYSRPT00001,,",
+    "R9,SYSPERF00001,Fast,,SYSMISS00001; SYSREQ00001,,",
+]
+
+
+def write_csv(path, rows):
+    path.write_text(HEADER + "\n".join(rows) + "\n")
+    return path
+
+
+@pytest.fixture
+def linked(repo_dir, tmp_path):
+    ingest_csv(write_csv(tmp_path / "links.csv", ROWS), repo_dir, commit_mode='csv')
+    return repo_dir
+
+
+def names(walk):
+    return [(item['requirement_id'], item['depth']) for item in walk]
+
+
+def test_links_are_stored_only_when_given(linked):
+    with_links = json.loads((linked / "perf" / "SYSPERF00001.json").read_text())
+    assert with_links['links'] == {'parents': ["SYSMISS00001", "SYSREQ00001"]}
+    assert list(with_links)[-1] == 'links'
+    assert 'links' not in json.loads((linked / "data" / "SYSDATA00001.json").read_text())
+
+
+def test_invalid_link_ids_are_rejected(repo_dir, tmp_path):
+    summary = ingest_csv(write_csv(tmp_path / "bad.csv", ["R1,SYSAUTH00001,Log in,,not-an-id,,"]),
+                         repo_dir, commit_mode='csv')
+    assert summary == {'processed': 1, 'updated': 0, 'errors': 1}
+
+
+def test_impact_queries(linked):
+    graph = LinkGraph(linked)
+    assert names(graph.downstream("SYSREQ00001")) == [
+        ("SYSAUTH00001", 1), ("SYSPERF00001", 1), ("SYSAUTH00002", 2)]
+    assert names(graph.downstream("SYSREQ00001", max_depth=1)) == [("SYSAUTH00001", 1), ("SYSPERF00001", 1)]
+    assert names(graph.upstream("SYSAUTH00002")) == [("SYSAUTH00001", 1), ("SYSREQ00001", 2)]
+    # Declared from both ends, but listed once
+    assert names(graph.downstream("SYSNAV00001")) == [("SYSNAV00002", 1)]
+    assert graph.upstream("SYSPERF00001")[0] == {'requirement_id': "SYSMISS00001", 'depth': 1, 'exists': False}
+    assert graph.orphans() == {'orphans': ["SYSDATA00001"], 'dangling': ["SYSMISS00001"]}
+    assert graph.cycles() == [["SYSRPT00001", "SYSRPT00002"]]
+
+
+def test_graph_follows_commits(linked, tmp_path):
+    graph = LinkGraph(linked)
+    assert graph.cycles()
+
+    # Break the cycle and drop one end of the doubly declared nav link
+    rows = ROWS[:3] + ["R4,SYSNAV00001,Menu,,,,", ROWS[4], ROWS[5],
+                       "R7,SYSRPT00001,Report,,,,", ROWS[7], ROWS[8]]
+    ingest_csv(write_csv(tmp_path / "links2.csv", rows), linked, commit_mode='csv')
+    assert graph.cycles() == []
+    assert names(graph.downstream("SYSNAV00001")) == [("SYSNAV00002", 1)]
+    assert names(graph.upstream("SYSRPT00002")) == [("SYSRPT00001", 1)]
+    assert names(graph.upstream("SYSRPT00001")) == []
+
+
+def test_unknown_graphed_commit_rebuilds(linked, tmp_path):
+    graph = LinkGraph(linked)
+    assert graph.cycles()
+
+    # As after a history rewrite
+    graph.head = "0" * 40
+    rows = ROWS[:6] + ["R7,SYSRPT00001,Report,,,,"] + ROWS[7:]
+    ingest_csv(write_csv(tmp_path / "links2.csv", rows), linked, commit_mode='csv')
+    assert graph.cycles() == []
+    assert names(graph.downstream("SYSREQ00001", max_depth=1)) == [("SYSAUTH00001", 1), ("SYSPERF00001", 1)]
+
+
+def test_graph_endpoints(linked, monkeypatch):
+    monkeypatch.setattr(app_module, "REPO_DIR", linked)
+    client = app_module.app.test_client()
+
+    response = client.get("/requirements/SYSAUTH00001/links/downstream")
+    assert response.json == {'requirement_id': "SYSAUTH00001", 'count': 1, 'downstream': [
+        {'requirement_id': "SYSAUTH00002", 'depth': 1, 'exists': True}]}
+    assert client.get("/requirements/SYSAUTH00002/links/upstream?depth=1").json['count'] == 1
+    assert client.get("/requirements/SYSAUTH00002/links/upstream?depth=0").status_code == 400
+    assert client.get("/requirements/SYSMISS00001/links/upstream").status_code == 404
+
+    # Tags named like a direction still reach the version route
+    subprocess.run(["git", "tag", "upstream"], cwd=linked, check=True)
+    version = client.get("/requirements/SYSAUTH00001/upstream")
+    assert version.status_code == 200 and version.json['requirement_id'] == "SYSAUTH00001"
+    assert client.get("/graph/orphans").json['dangling'] == ["SYSMISS00001"]
+    assert client.get("/graph/cycles").json == {'cycles': [["SYSRPT00001", "SYSRPT00002"]]}
@@ -0,0 +1,96 @@
+import json
+import subprocess
+
+from tracespec import index as index_module
+from tracespec.index import RequirementIndex, get_index
+from tracespec.ingest import ingest_csv, get_requirements_by_subsystem
+from tracespec.utils import read_head
+
+
+def test_index_matches_directory_scan(repo_dir, csv_versions):
+    ingest_csv(csv_versions[2], repo_dir, commit_mode='csv')
+
+    index = RequirementIndex(repo_dir)
+    assert index.by_subsystem() == get_requirements_by_subsystem(repo_dir)
+    assert index.counts()['auth'] == 5
+
+
+def test_index_follows_external_commits(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    index = RequirementIndex(repo_dir)
+    assert len(index.subsystem('AUTH')) == 3
+
+    # Another process edits and commits a file in place
+    path = repo_dir / "auth" / "SYSAUTH00001.json"
+    record = json.loads(path.read_text())
+    record['notes'] = "changed elsewhere"
+    path.write_text(json.dumps(record, indent=2))
+    subprocess.run(["git", "commit", "-qam", "edit"], cwd=repo_dir, check=True)
+
+    assert index.subsystem('auth')[0]['notes'] == "changed elsewhere"
+
+
+def test_index_survives_history_rewrite(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    index = RequirementIndex(repo_dir)
+    index.refresh()
+
+    # Replace the indexed commit and drop it from the object store
+    (repo_dir / "nav" / "SYSNAV00001.json").unlink()
+    git = lambda *args: subprocess.run(["git", *args], cwd=repo_dir, check=True, capture_output=True)
+    git("commit", "-qa", "--amend", "-m", "Rewritten")
+    git("reflog", "expire", "--expire=now", "--all")
+    git("gc", "-q", "--prune=now")
+
+    assert index.get("SYSNAV00001") is None
+    assert index.counts()['nav'] == 1
+
+
+def test_index_notices_new_files(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    index = RequirementIndex(repo_dir)
+    assert 'mob' not in index.counts()
+
+    (repo_dir / "mob").mkdir()
+    (repo_dir / "mob" / "SYSMOB00001.json").write_text(json.dumps({'requirement_id': 'SYSMOB00001'}))
+
+    assert index.counts()['mob'] == 1
+
+
+def test_ingest_updates_shared_index_directly(repo_dir, csv_versions, monkeypatch):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    index = get_index(repo_dir)
+    index.refresh()
+
+    def fail(*args):
+        raise AssertionError("index should not rescan after ingest")
+
+    monkeypatch.setattr(index_module, "git_changed_files", fail)
+    monkeypatch.setattr(index, "_load_subsystem", fail)
+    ingest_csv(csv_versions[2], repo_dir, commit_mode='csv')
+
+    assert index._head == read_head(repo_dir)
+    assert index.counts()['auth'] == 5
+
+
+def test_lookup_by_id(repo_dir, csv_versions):
+    ingest_csv(csv_versions[2], repo_dir, commit_mode='csv')
+    index = RequirementIndex(repo_dir)
+
+    assert index.get('SYSNAV00001')['record_id'] == 'REC_004'
+    assert index.get('SYSNAV99999') is None
+    assert index.get('INVALID') is None
+
+    found = index.get_many(['SYSAUTH00001', 'SYSAPI00002', 'SYSNAV99999'])
+    assert sorted(found) == ['SYSAPI00002', 'SYSAUTH00001']
+
+
+def test_lookup_falls_back_to_file(repo_dir, csv_versions, monkeypatch):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    index = RequirementIndex(repo_dir)
+    index.refresh()
+    # Pretend the index has not seen the file yet
+    del index._records['auth']['SYSAUTH00002']
+    monkeypatch.setattr(index, "refresh", lambda: None)
+
+    assert index.get('SYSAUTH00002')['record_id'] == 'REC_002'
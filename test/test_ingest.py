@@ -0,0 +1,136 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tracespec.ingest import ingest_csv, get_requirements_by_subsystem
+from tracespec.manifest import Manifest, blob_id
+from tracespec.utils import read_head
+
+from conftest import commit_count
+
+
+def test_row_mode_commits_each_requirement(repo_dir, csv_versions):
+    result = ingest_csv(csv_versions[0], repo_dir)
+
+    assert result == {'processed': 10, 'updated': 10, 'errors': 0}
+    assert commit_count(repo_dir) == 10
+
+
+def test_csv_mode_writes_single_commit(repo_dir, csv_versions):
+    first = ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    second = ingest_csv(csv_versions[1], repo_dir, commit_mode='csv')
+
+    assert first['updated'] == 10
+    assert second['processed'] == 13
+    assert commit_count(repo_dir) == 2
+
+
+def test_subsystem_mode_commits_per_subsystem(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='subsystem')
+
+    subsystems = get_requirements_by_subsystem(repo_dir)
+    assert commit_count(repo_dir) == len(subsystems)
+
+
+def test_unchanged_csv_is_noop(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    result = ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+
+    assert result['updated'] == 0
+    assert commit_count(repo_dir) == 1
+
+
+def test_unknown_commit_mode(repo_dir, csv_versions):
+    with pytest.raises(ValueError):
+        ingest_csv(csv_versions[0], repo_dir, commit_mode='bogus')
+
+
+def test_dry_run_reports_changes_without_writing(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    before = sorted(p.read_text() for p in repo_dir.rglob("*.json"))
+
+    result = ingest_csv(csv_versions[1], repo_dir, commit_mode='csv', dry_run=True)
+
+    assert result['updated'] == len(result['changes']['added']) + len(result['changes']['modified'])
+    assert 'SYSAUTH00004' in result['changes']['added']
+    assert 'SYSAUTH00002' in result['changes']['modified']
+    assert sorted(p.read_text() for p in repo_dir.rglob("*.json")) == before
+    assert commit_count(repo_dir) == 1
+
+
+def test_noop_reingest_skips_file_reads(repo_dir, csv_versions, monkeypatch):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+
+    read_text = Path.read_text
+
+    def guarded_read_text(path, *args, **kwargs):
+        assert repo_dir not in path.parents, "unchanged rows should not read requirement files"
+        return read_text(path, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "read_text", guarded_read_text)
+    result = ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+
+    assert result['updated'] == 0
+
+
+def test_manifest_rebuilds_when_stale(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    subprocess.run(["git", "rm", "-q", "auth/SYSAUTH00001.json"], cwd=repo_dir, check=True)
+    subprocess.run(["git", "commit", "-qm", "remove"], cwd=repo_dir, check=True)
+
+    manifest = Manifest.load(repo_dir)
+    assert 'SYSAUTH00001' not in manifest.entries
+    assert manifest.head == read_head(repo_dir)
+
+    # The file is restored because HEAD no longer has it
+    assert ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')['updated'] == 1
+
+
+def test_blob_id_matches_git(tmp_path):
+    path = tmp_path / "blob.json"
+    path.write_text('{"a": "é"}', encoding='utf-8')
+    expected = subprocess.run(["git", "hash-object", str(path)],
+                              capture_output=True, text=True, check=True).stdout.strip()
+
+    assert blob_id(path.read_bytes()) == expected
+
+
+def test_parallel_pipeline_matches_serial(repo_dir, csv_versions, monkeypatch, capsys):
+    import tracespec.ingest as ingest_module
+    monkeypatch.setattr(ingest_module, "CHUNK_SIZE", 3)
+
+    serial = ingest_csv(csv_versions[2], repo_dir, dry_run=True)
+    serial_output = capsys.readouterr().out
+    parallel = ingest_csv(csv_versions[2], repo_dir, dry_run=True, workers=2)
+
+    assert parallel == serial
+    assert capsys.readouterr().out == serial_output
+    assert parallel['errors'] == 1
+
+
+def test_writer_runs_on_its_own_thread(repo_dir, csv_versions, monkeypatch):
+    import threading
+    import tracespec.ingest as ingest_module
+    assert ingest_module._pool_context().get_start_method() != "fork"
+
+    threads = set()
+    original = ingest_module.git_commit
+
+    def record(*args, **kwargs):
+        threads.add(threading.current_thread().name)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(ingest_module, "git_commit", record)
+    ingest_csv(csv_versions[0], repo_dir)
+    assert threads == {"tracespec-ingest-writer"}
+
+    # A failure in the writer reaches the caller instead of hanging the reader
+    monkeypatch.setattr(ingest_module, "WRITE_QUEUE_ROWS", 1)
+    monkeypatch.setattr(ingest_module, "PROGRESS_INTERVAL", 1)
+
+    def broken(counts):
+        raise RuntimeError("progress failed")
+
+    with pytest.raises(RuntimeError, match="progress failed"):
+        ingest_csv(csv_versions[1], repo_dir, progress=broken)
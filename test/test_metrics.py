@@ -0,0 +1,35 @@
+from tracespec.ingest import ingest_csv
+from tracespec.metrics import GIT_COMMAND_SECONDS, INGEST_ROWS, Registry
+
+
+def test_render_counters_histograms_and_collectors():
+    registry = Registry()
+    rows = registry.counter("rows_total", "Rows.", ("outcome",))
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    registry.add_collector(lambda: [("queue_depth", "gauge", "Depth.", [({'queue': 'a"b'}, 3)])])
+
+    rows.inc(outcome="ok")
+    rows.inc(2, outcome="ok")
+    latency.observe(0.05, route="/")
+    latency.observe(0.5, route="/")
+
+    text = registry.render()
+    assert "# TYPE rows_total counter\nrows_total{outcome=\"ok\"} 3\n" in text
+    assert 'latency_seconds_bucket{route="/",le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{route="/",le="+Inf"} 2\n' in text
+    assert 'latency_seconds_count{route="/"} 2\n' in text
+    assert 'latency_seconds_sum{route="/"} 0.55\n' in text
+    assert 'queue_depth{queue="a\\"b"} 3\n' in text
+
+
+def test_ingest_counts_rows_and_git_commands(repo_dir, csv_versions):
+    commits = GIT_COMMAND_SECONDS.count(command="commit")
+    updated = INGEST_ROWS.value(outcome="updated")
+    unchanged = INGEST_ROWS.value(outcome="unchanged")
+
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+
+    assert GIT_COMMAND_SECONDS.count(command="commit") == commits + 1
+    assert INGEST_ROWS.value(outcome="updated") == updated + 10
+    assert INGEST_ROWS.value(outcome="unchanged") == unchanged + 10
@@ -0,0 +1,63 @@
+import gc
+import json
+import pickle
+import tracemalloc
+
+from tracespec.model import Requirement
+from tracespec.utils import parse_requirement_id
+
+
+def _record(req_id, **extra):
+    return {
+        'record_id': "R1",
+        'requirement_id': req_id,
+        'requirement_text': "The system shall authenticate users.",
+        'notes': "",
+        'parsed': parse_requirement_id(req_id),
+        **extra,
+    }
+
+
+def test_requirement_reads_like_the_json_record():
+    data = _record("SYSAUTH00001")
+    req = Requirement.from_dict(data)
+
+    assert req == data and data == req
+    assert list(req) == list(data)
+    assert req['parsed'] == {'document_id': "SYS", 'subsystem': "AUTH", 'sequence': 1}
+    assert req.subsystem == "AUTH" and req.sequence == 1
+    assert req.get('missing', "x") == "x"
+    assert 'notes' in req and 'links' not in req
+    assert not hasattr(req, '__dict__')
+
+
+def test_to_dict_serializes_like_the_original():
+    for data in (_record("SYSAUTH00001"), _record("BAD", links=["SYSNAV00002"]),
+                 {'requirement_id': "SYSNAV00002", 'notes': "no parsed key"}):
+        req = Requirement.from_dict(data)
+        assert json.dumps(req.to_dict(), indent=2) == json.dumps(data, indent=2)
+        assert pickle.loads(pickle.dumps(req)) == req
+
+
+def test_codes_are_shared_between_requirements():
+    first = Requirement.from_dict(json.loads(json.dumps(_record("SYSAUTH00001"))))
+    second = Requirement.from_dict(json.loads(json.dumps(_record("SYSAUTH00002"))))
+    assert first.subsystem is second.subsystem
+    assert first.document_id is second.document_id
+
+
+def test_requirements_use_less_memory_than_dicts():
+    blobs = [json.dumps(_record(f"SYSAUTH{i:05d}")) for i in range(2000)]
+
+    def traced(build):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            kept = [build(json.loads(blob)) for blob in blobs]
+            return tracemalloc.get_traced_memory()[0], kept
+        finally:
+            tracemalloc.stop()
+
+    as_dicts, _ = traced(lambda record: record)
+    as_requirements, _ = traced(Requirement.from_dict)
+    assert as_requirements * 2 < as_dicts
@@ -0,0 +1,50 @@
+import pytest
+
+from tracespec import app as app_module
+from tracespec.ingest import ingest_csv
+from tracespec.profiling import PROFILE_HEADER, ProfilerMiddleware, profile_call
+
+
+def busy_leaf():
+    return sum(i * i for i in range(20000))
+
+
+def busy_root():
+    return busy_leaf() + busy_leaf()
+
+
+def test_profile_call_writes_pstats_and_collapsed_stacks(tmp_path):
+    result, (pstats_path, collapsed_path) = profile_call(tmp_path / "busy", busy_root)
+
+    assert result == 2 * busy_leaf()
+    assert pstats_path.stat().st_size > 0
+    lines = collapsed_path.read_text().splitlines()
+    stacks = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+    nested = [stack for stack in stacks
+              if stack.startswith("busy_root (test_profiling.py:") and ";busy_leaf (" in stack]
+    assert nested
+    assert all(count > 0 for count in stacks.values())
+
+
+def test_header_mode_profiles_only_marked_requests(repo_dir, csv_versions, tmp_path, monkeypatch):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    monkeypatch.setattr(app_module, "REPO_DIR", repo_dir)
+    monkeypatch.setattr(app_module.app, "wsgi_app",
+                        ProfilerMiddleware(app_module.app.wsgi_app.app, 'header', tmp_path / "profiles"))
+    client = app_module.app.test_client()
+
+    plain = client.get("/subsystem/auth")
+    assert PROFILE_HEADER not in plain.headers
+    assert not (tmp_path / "profiles").exists()
+
+    profiled = client.get("/subsystem/auth", headers={PROFILE_HEADER: "1"})
+    assert profiled.status_code == 200
+    assert profiled.get_data() == plain.get_data()
+    written = tmp_path / "profiles" / profiled.headers[PROFILE_HEADER]
+    assert written.exists()
+    assert written.with_suffix(".collapsed").read_text()
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ProfilerMiddleware(None, 'sometimes')
@@ -0,0 +1,101 @@
+import pytest
+
+from tracespec import app as app_module
+from tracespec import search
+from tracespec.ingest import ingest_csv
+from tracespec.search import SearchIndex, parse_query, search_path, tokenize
+
+
+def ids(found):
+    return [result['requirement_id'] for result in found['results']]
+
+
+def test_query_parsing():
+    assert tokenize("Log-in, LOGIN!") == ["log", "in", "login"]
+    assert parse_query('backup encr* "daily at" two-factor') == [
+        ('term', "backup"), ('prefix', "encr"), ('phrase', ["daily", "at"]),
+        ('phrase', ["two", "factor"]),
+    ]
+
+
+def test_terms_prefixes_phrases_and_ids(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    index = SearchIndex(repo_dir)
+
+    assert set(ids(index.search("backup"))) == {"SYSDATA00001", "SYSDATA00002"}
+    assert ids(index.search("authenticat*"))[0] == "SYSAUTH00001"
+    assert ids(index.search('"password complexity"')) == ["SYSAUTH00003"]
+    assert index.search('"complexity password"')['total'] == 0
+    # ID components: the whole ID, the subsystem code and the sequence
+    assert ids(index.search("sysauth00002")) == ["SYSAUTH00002"]
+    assert set(ids(index.search("auth"))) == {"SYSAUTH00001", "SYSAUTH00002", "SYSAUTH00003"}
+    assert ids(index.search("auth 00002")) == ["SYSAUTH00002"]
+    assert index.search("nosuchword")['total'] == 0
+    assert index.search("")['total'] == 0
+
+
+def test_ranking_prefers_more_occurrences(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    found = SearchIndex(repo_dir).search("backup")
+    scores = [result['score'] for result in found['results']]
+    assert scores == sorted(scores, reverse=True)
+    # SYSDATA00002 mentions backup in both its text and its notes
+    assert ids(found)[0] == "SYSDATA00002"
+
+
+def test_refresh_reindexes_changed_files_only(repo_dir, csv_versions, monkeypatch):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    index = SearchIndex(repo_dir)
+    assert ids(index.search('"8 characters"')) == ["SYSAUTH00003"]
+
+    ingest_csv(csv_versions[1], repo_dir, commit_mode='csv')
+    # Half the sample changes, which would normally trigger a rebuild
+    monkeypatch.setattr(search, "_DEAD_RATIO", 1.0)
+    monkeypatch.setattr(SearchIndex, "_build", lambda self, source: pytest.fail("rebuilt the index"))
+    assert index.search('"8 characters"')['total'] == 0
+    assert ids(index.search('"12 characters"')) == ["SYSAUTH00003"]
+    assert ids(index.search("lockout")) == ["SYSAUTH00005"]
+
+
+def test_saved_index_loads_without_tokenizing(repo_dir, csv_versions, monkeypatch):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    saved = SearchIndex(repo_dir)
+    assert saved.save() == search_path(repo_dir)
+    expected = saved.search("system")
+
+    monkeypatch.setattr(search, "_DEAD_RATIO", 1.0)
+    monkeypatch.setattr(SearchIndex, "_build", lambda self, source: pytest.fail("rebuilt the index"))
+    loaded = SearchIndex(repo_dir)
+    assert loaded.search("system") == expected
+
+    # Later commits are applied on top of the saved file, which only save() rewrites
+    saved_bytes = search_path(repo_dir).read_bytes()
+    ingest_csv(csv_versions[1], repo_dir, commit_mode='csv')
+    assert ids(loaded.search("lockout")) == ["SYSAUTH00005"]
+    assert ids(SearchIndex(repo_dir).search("lockout")) == ["SYSAUTH00005"]
+    assert search_path(repo_dir).read_bytes() == saved_bytes
+
+
+def test_unknown_indexed_commit_rebuilds(repo_dir, csv_versions):
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    index = SearchIndex(repo_dir)
+    assert index.search("lockout")['total'] == 0
+
+    # As after a history rewrite, or a saved file from another clone
+    index.head = "0" * 40
+    ingest_csv(csv_versions[1], repo_dir, commit_mode='csv')
+    assert ids(index.search("lockout")) == ["SYSAUTH00005"]
+
+
+def test_search_endpoint(repo_dir, csv_versions, monkeypatch):
+    monkeypatch.setattr(app_module, "REPO_DIR", repo_dir)
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    client = app_module.app.test_client()
+
+    response = client.get("/search?q=password&limit=5")
+    assert response.status_code == 200
+    result, = response.json['results']
+    assert result['requirement_id'] == "SYSAUTH00003"
+    assert result['requirement']['notes'] == "Basic password policy"
+    assert client.get("/search?q=x&limit=0").status_code == 400
+    assert client.get("/search?q=x&limit=many").status_code == 400
@@ -0,0 +1,143 @@
+import io
+import json
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import pytest
+
+from werkzeug.serving import make_server
+from werkzeug.wsgi import get_input_stream
+
+from tracespec import server
+from tracespec.ingest import ingest_csv
+
+SERVE = """
+import sys
+from tracespec import app as app_module, server
+server.POLL_SECONDS = 0.2
+app_module.REPO_DIR = server.Path(sys.argv[1])
+server.serve(app_module.app, app_module.REPO_DIR, port=0, workers=2)
+"""
+
+
+@pytest.fixture
+def prefork(repo_dir, csv_versions, tmp_path, monkeypatch):
+    monkeypatch.setenv("TRACESPEC_SPOOL_DIR", str(tmp_path / "spool"))
+    ingest_csv(csv_versions[0], repo_dir, commit_mode='csv')
+    proc = subprocess.Popen([sys.executable, "-u", "-c", SERVE, str(repo_dir)],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    lines = []
+    for line in proc.stdout:
+        lines.append(line)
+        if line.startswith("Listening on "):
+            break
+    else:
+        pytest.fail("server did not start: " + "".join(lines))
+    try:
+        yield line.split()[2], proc
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.status, response.read()
+
+
+def upload(url, path):
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{path.name}\"\r\n"
+            f"Content-Type: text/csv\r\n\r\n").encode() + path.read_bytes() + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(url + "/upload", data=body, method="POST",
+                                     headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status, json.loads(response.read())
+
+
+def test_prefork_serves_forwards_uploads_and_reloads(prefork, csv_versions):
+    url, proc = prefork
+    status, body = get(url + "/requirements/SYSAUTH00003")
+    assert status == 200 and json.loads(body)['notes'] == "Basic password policy"
+    with pytest.raises(urllib.error.HTTPError):
+        get(url + "/requirements/SYSAUTH00005")
+
+    status, job = upload(url, csv_versions[1])
+    assert status == 202
+    # Jobs live in the writer, so every reader must forward status polls to it
+    for _ in range(100):
+        job = json.loads(get(url + f"/jobs/{job['id']}")[1])
+        if job['status'] in ('done', 'failed'):
+            break
+        time.sleep(0.1)
+    assert job['status'] == 'done'
+    assert json.loads(get(url + "/requirements/SYSAUTH00005")[1])['notes'] == "Account lockout security feature"
+
+    # The parent notices HEAD moved and replaces the readers
+    assert any("reloading workers" in line for line in proc.stdout)
+    assert json.loads(get(url + "/requirements/SYSAUTH00005")[1])['notes'] == "Account lockout security feature"
+
+    proc.send_signal(signal.SIGTERM)
+    proc.communicate(timeout=30)
+    assert proc.returncode == 0
+
+
+class RecordingStream(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.largest_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.largest_read = max(self.largest_read, len(data))
+        return data
+
+
+@pytest.fixture
+def writer(tmp_path):
+    def count_body(environ, start_response):
+        stream = get_input_stream(environ)
+        total = 0
+        while True:
+            chunk = stream.read(server.CHUNK_BYTES)
+            if not chunk:
+                break
+            total += len(chunk)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return (part for part in [b"received ", str(total).encode(), b" bytes"])
+
+    path = tmp_path / "writer.sock"
+    writer_server = make_server(f"unix://{path}", 0, count_body, threaded=True)
+    thread = threading.Thread(target=writer_server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    writer_server.shutdown()
+    writer_server.server_close()
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_proxy_streams_bodies(writer, chunked):
+    size = 10 * server.CHUNK_BYTES + 123
+    stream = RecordingStream(b"x" * size)
+    environ = {'REQUEST_METHOD': "POST", 'PATH_INFO': "/upload", 'QUERY_STRING': "",
+               'CONTENT_TYPE': "text/csv", 'wsgi.input': stream}
+    if chunked:
+        environ['wsgi.input_terminated'] = True
+    else:
+        environ['CONTENT_LENGTH'] = str(size)
+    statuses = []
+    proxy = server.WriterProxy(lambda environ, start_response: pytest.fail("not forwarded"), writer)
+    body = proxy(environ, lambda status, headers: statuses.append(status))
+    try:
+        assert b"".join(body) == f"received {size} bytes".encode()
+    finally:
+        body.close()
+    assert statuses == ["200 OK"]
+    assert stream.largest_read <= server.CHUNK_BYTES
@@ -0,0 +1,66 @@
+import subprocess
+
+import pytest
+
+from tracespec import app as app_module
+from tracespec.fastimport import fast_import_csvs
+from tracespec.gitobjects import GitObjectMissing
+from tracespec.ingest import get_requirements_by_subsystem, ingest_csv
+from tracespec.snapshot import get_snapshot, snapshot_cache_stats
+
+
+@pytest.fixture
+def baselines(repo_dir, csv_versions):
+    fast_import_csvs(csv_versions, repo_dir)
+    return repo_dir
+
+
+def test_snapshot_matches_ingested_working_tree(baselines, csv_versions, tmp_path):
+    # Ingesting v1 into a fresh repo gives the working tree v1.0 had
+    fresh = tmp_path / "fresh"
+    fresh.mkdir()
+    subprocess.run(["git", "init", "-q", "-b", "main"], cwd=fresh, check=True)
+    (fresh / "requirements").mkdir()
+    ingest_csv(csv_versions[0], fresh / "requirements", commit_mode='csv')
+
+    expected = get_requirements_by_subsystem(fresh / "requirements")
+    assert get_requirements_by_subsystem(baselines, commit="v1.0") == expected
+    assert get_requirements_by_subsystem(baselines, subsystem="AUTH", commit="v1.0") == \
+        {'auth': expected['auth']}
+
+    snapshot = get_snapshot("v1.0", baselines)
+    assert snapshot.counts() == {name: len(reqs) for name, reqs in expected.items()}
+    assert snapshot.get("SYSAUTH00002") == next(
+        r for r in expected['auth'] if r['requirement_id'] == "SYSAUTH00002")
+    assert snapshot.get("SYSAUTH99999") is None
+
+
+def test_unchanged_subsystems_are_parsed_once(baselines):
+    get_snapshot("v2.0", baselines).by_subsystem()
+    before = snapshot_cache_stats()
+    get_snapshot("v2.0", baselines).by_subsystem()
+    after = snapshot_cache_stats()
+
+    assert after['misses'] == before['misses']
+    assert after['hits'] > before['hits']
+
+
+def test_unknown_commit(baselines):
+    with pytest.raises(GitObjectMissing):
+        get_snapshot("v9.0", baselines)
+
+
+def test_as_of_views(baselines, monkeypatch):
+    monkeypatch.setattr(app_module, "REPO_DIR", baselines)
+    client = app_module.app.test_client()
+
+    page = client.get("/?at=v1.0").get_data(as_text=True)
+    assert 'hx-get="/subsystem/auth?at=v1.0"' in page
+
+    old = client.get("/subsystem/auth?at=v1.0").get_data(as_text=True)
+    new = client.get("/subsystem/auth").get_data(as_text=True)
+    assert old != new
+    assert '/requirement/SYSAUTH00001?at=v1.0' in old
+    assert client.get("/requirement/SYSAUTH00002?at=v1.0").get_data() != \
+        client.get("/requirement/SYSAUTH00002").get_data()
+    assert client.get("/subsystem/auth?at=nope").status_code == 404
@@ -0,0 +1,109 @@
+import json
+import threading
+from pathlib import Path
+
+import sqlite3
+
+import pytest
+
+from history import KEYFRAME_INTERVAL
+from store import RequirementStore
+
+LEGACY_JSON = Path(__file__).parent.parent / "requirements.json"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RequirementStore(str(tmp_path / "requirements.db"))
+    yield store
+    store.close()
+
+
+def test_import_keeps_ids_and_history(store):
+    legacy = json.loads(LEGACY_JSON.read_text())
+
+    assert store.import_json(LEGACY_JSON) == len(legacy)
+    for stored, original in zip(store.all(), legacy):
+        assert {k: v for k, v in stored.items() if k != 'history'} == \
+               {k: v for k, v in original.items() if k != 'history'}
+        assert [h['updated_at'] for h in stored['history']] == \
+               [h['updated_at'] for h in original['history']]
+        for version, entry in enumerate(original['history']):
+            assert store.version(original['id'], version) == entry
+
+
+def test_create_assigns_next_id(store):
+    store.import_json(LEGACY_JSON)
+    req = store.create("New", "Something new", "low")
+
+    assert req['id'] == max(r['id'] for r in json.loads(LEGACY_JSON.read_text())) + 1
+    assert req['status'] == 'draft'
+    assert req['history'] == []
+
+
+def test_update_snapshots_previous_version(store):
+    req = store.create("Title", "First", "low")
+    store.update(req['id'], "Title", "Second", "high")
+    updated = store.update(req['id'], "Renamed", "Third", "high")
+
+    assert [store.version(req['id'], v)['description'] for v in range(2)] == ["First", "Second"]
+    assert store.version(req['id'], 2) is None
+    assert updated['title'] == "Renamed"
+    assert store.update(12345, "x", "y", "z") is None
+
+
+def test_concurrent_updates_are_not_lost(store):
+    req = store.create("Title", "v0", "low")
+
+    def edit(n):
+        store.update(req['id'], "Title", f"edit {n}", "low")
+
+    threads = [threading.Thread(target=edit, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    history = store.get(req['id'])['history']
+    assert len(history) == 8
+    assert store.version(req['id'], 0)['description'] == "v0"
+
+
+def test_long_history_is_delta_encoded(store):
+    words = [f"word{i}" for i in range(200)]
+    req = store.create("Title", " ".join(words), "low")
+    versions = []
+    for n in range(3 * KEYFRAME_INTERVAL + 2):
+        versions.append(store.get(req['id'])['description'])
+        words[n] = f"edited{n}"
+        store.update(req['id'], "Title", " ".join(words), "low")
+
+    for version, description in enumerate(versions):
+        assert store.version(req['id'], version)['description'] == description
+
+    conn = store._connect()
+    stored = sum(len(row[0]) for row in conn.execute('SELECT data FROM history'))
+    assert stored < sum(len(d) for d in versions) / 4
+
+
+def test_full_copy_history_is_migrated(tmp_path):
+    path = str(tmp_path / "v1.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE requirements (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL,
+            description TEXT NOT NULL, priority TEXT NOT NULL, status TEXT NOT NULL,
+            created_at TEXT NOT NULL, updated_at TEXT NOT NULL);
+        CREATE TABLE history (requirement_id INTEGER NOT NULL, version INTEGER NOT NULL,
+            title TEXT NOT NULL, description TEXT NOT NULL, priority TEXT NOT NULL,
+            updated_at TEXT NOT NULL, PRIMARY KEY (requirement_id, version));
+        INSERT INTO requirements VALUES (1, 'C', 'current text', 'high', 'draft', 't0', 't3');
+        INSERT INTO history VALUES (1, 0, 'A', 'first text', 'low', 't1');
+        INSERT INTO history VALUES (1, 1, 'B', 'second text', 'low', 't2');
+    """)
+    conn.commit()
+    conn.close()
+
+    store = RequirementStore(path)
+    assert store.version(1, 0) == {'title': 'A', 'description': 'first text', 'priority': 'low', 'updated_at': 't1'}
+    assert store.version(1, 1) == {'title': 'B', 'description': 'second text', 'priority': 'low', 'updated_at': 't2'}
+    store.close()
@@ -19,3 +19,18 @@ def test_reqid_parsing(test_input, doc_id, subsys, sequence):
 
     assert parse_requirement_id(test_input) == expected
 
+
+
+def test_read_head_follows_loose_and_packed_refs(repo_dir):
+    import subprocess
+    from tracespec.utils import read_head
+
+    assert read_head(repo_dir) is None
+
+    subprocess.run(["git", "commit", "-q", "--allow-empty", "-m", "init"], cwd=repo_dir, check=True)
+    expected = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_dir,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    assert read_head(repo_dir) == expected
+
+    subprocess.run(["git", "pack-refs", "--all"], cwd=repo_dir, check=True)
+    assert read_head(repo_dir) == expected
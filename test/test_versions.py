@@ -0,0 +1,59 @@
+import subprocess
+
+from tracespec import app as app_module
+from tracespec.fastimport import fast_import_csvs
+from tracespec.ingest import ingest_csv
+from tracespec.versions import HistoryIndex, get_history
+
+
+def log_commits(repo_dir, req_id):
+    path = f"{req_id[3:-5].lower()}/{req_id}.json"
+    return subprocess.run(["git", "log", "--reverse", "--format=%H", "--", path], cwd=repo_dir,
+                          capture_output=True, text=True, check=True).stdout.split()
+
+
+def test_versions_match_git_log(repo_dir, csv_versions):
+    for csv_path in csv_versions:
+        ingest_csv(csv_path, repo_dir, commit_mode='csv')
+
+    history = get_history(repo_dir)
+    for req_id in ("SYSAUTH00001", "SYSAUTH00002", "SYSNAV00001"):
+        assert [v['commit'] for v in history.versions(req_id)] == log_commits(repo_dir, req_id)
+
+    versions = history.versions("SYSAUTH00002")
+    assert versions[0]['change'] == 'added'
+    assert versions[-1]['change'] == 'modified'
+    assert versions[0]['subject'].startswith("Update ")
+    assert history.versions("SYSAUTH99999") == []
+
+
+def test_history_is_persisted_and_updated_incrementally(repo_dir, csv_versions, monkeypatch):
+    fast_import_csvs(csv_versions[:2], repo_dir)
+    assert HistoryIndex(repo_dir).path.exists()
+
+    # A fresh index loads the stored walk and only walks the new commit
+    fresh = HistoryIndex(repo_dir)
+    fresh.refresh()
+    walked = []
+    original = HistoryIndex._walk
+    monkeypatch.setattr(HistoryIndex, "_walk",
+                        lambda self, revisions: walked.append(revisions) or original(self, revisions))
+    ingest_csv(csv_versions[2], repo_dir, commit_mode='csv')
+    fresh.refresh()
+
+    assert len(walked) == 2  # the shared index after ingest, then the fresh one
+    assert all(".." in revisions[0] for revisions in walked)
+    assert [v['commit'] for v in fresh.versions("SYSAUTH00002")] == log_commits(repo_dir, "SYSAUTH00002")
+
+
+def test_versions_endpoint(repo_dir, csv_versions, monkeypatch):
+    fast_import_csvs(csv_versions, repo_dir)
+    monkeypatch.setattr(app_module, "REPO_DIR", repo_dir)
+    client = app_module.app.test_client()
+
+    versions = client.get("/requirements/SYSAUTH00002/versions").json
+    assert [v['commit'] for v in versions] == log_commits(repo_dir, "SYSAUTH00002")
+    first = versions[0]['commit']
+    assert client.get(f"/requirements/SYSAUTH00002/{first}").status_code == 200
+    assert client.get("/requirements/SYSAUTH99999/versions").status_code == 404
+    assert client.get("/requirements/BOGUS/versions").status_code == 400
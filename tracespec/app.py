@@ -1,15 +1,131 @@
 import os
-from flask import Flask, request, render_template, jsonify
+import re
+import tempfile
+import threading
+import time
+from flask import Flask, Response, request, render_template, jsonify, url_for, g, stream_with_context
 from pathlib import Path
 import json
 
-from .utils import git_diff, git_show_file, extract_subsystem
-from .ingest import ingest_csv, get_requirements_by_subsystem
+from .cache import DiffCache
+from .compare import compare_ndjson
+from .fragments import cached_fragment, fragment_cache_stats
+from .gitobjects import GitObjectMissing, get_object_reader
+from .graph import get_link_graph
+from .index import get_index
+from .metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, REGISTRY
+from .profiling import ProfilerMiddleware
+from .search import get_search_index
+from .snapshot import Snapshot, get_snapshot, snapshot_cache_stats
+from .versions import get_history
+from .utils import git_diff, extract_subsystem, read_head
+from .jobs import IngestQueue
 
 app = Flask(__name__)
+# Profile requests: "off", "header" (only those sending X-TraceSpec-Profile) or "all"
+app.wsgi_app = ProfilerMiddleware(app.wsgi_app, mode=os.environ.get("TRACESPEC_PROFILE", "off"))
 # Use absolute path relative to the project root
 REPO_DIR = Path(__file__).parent.parent / "requirements_repo" / "requirements"
 
+# Diffs between two blobs never change; keep them in memory and optionally on disk
+DIFF_CACHE = DiffCache(
+    max_bytes=int(os.environ.get("TRACESPEC_DIFF_CACHE_BYTES", 32 * 1024 * 1024)),
+    directory=os.environ.get("TRACESPEC_DIFF_CACHE_DIR"),
+)
+
+# Uploaded CSVs wait here for the background ingest worker
+SPOOL_DIR = Path(os.environ.get("TRACESPEC_SPOOL_DIR",
+                                Path(tempfile.gettempdir()) / "tracespec-spool"))
+
+_ingest_queue = None
+_ingest_queue_lock = threading.Lock()
+
+def get_ingest_queue() -> IngestQueue:
+    """Return the queue that serializes uploads into the repository."""
+    global _ingest_queue
+    with _ingest_queue_lock:
+        if _ingest_queue is None:
+            _ingest_queue = IngestQueue(REPO_DIR, SPOOL_DIR)
+        return _ingest_queue
+
+@REGISTRY.add_collector
+def _collect_app_metrics():
+    """Report cache and index state; only runs when /metrics is scraped."""
+    stats = DIFF_CACHE.stats()
+    memory = stats['memory']
+    snapshots = snapshot_cache_stats()
+    fragments = fragment_cache_stats()
+    yield ("tracespec_cache_hits_total", "counter", "Cache lookups that found a value.",
+           [({'cache': 'diff'}, stats['hits']), ({'cache': 'diff_disk'}, stats['disk_hits']),
+            ({'cache': 'snapshot'}, snapshots['hits']), ({'cache': 'fragment'}, fragments['hits'])])
+    yield ("tracespec_cache_misses_total", "counter", "Cache lookups that found nothing.",
+           [({'cache': 'diff'}, stats['misses']), ({'cache': 'snapshot'}, snapshots['misses']),
+            ({'cache': 'fragment'}, fragments['misses'])])
+    yield ("tracespec_cache_evictions_total", "counter", "Entries evicted to stay within the memory bound.",
+           [({'cache': 'diff'}, memory['evictions']), ({'cache': 'snapshot'}, snapshots['evictions']),
+            ({'cache': 'fragment'}, fragments['evictions'])])
+    yield ("tracespec_cache_bytes", "gauge", "Bytes held in memory by a cache.",
+           [({'cache': 'diff'}, memory['bytes']), ({'cache': 'snapshot'}, snapshots['bytes']),
+            ({'cache': 'fragment'}, fragments['bytes'])])
+    yield ("tracespec_cache_entries", "gauge", "Entries held in memory by a cache.",
+           [({'cache': 'diff'}, memory['entries']), ({'cache': 'snapshot'}, snapshots['entries']),
+            ({'cache': 'fragment'}, fragments['entries'])])
+    if _ingest_queue is not None:
+        jobs = _ingest_queue.jobs()
+        yield ("tracespec_ingest_jobs", "gauge", "Known ingest jobs, by status.",
+               [({'status': status}, sum(job.status == status for job in jobs))
+                for status in ('queued', 'running', 'done', 'failed')])
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route,
+                                     method=request.method, status=response.status_code)
+    return response
+
+# Upper bound on the IDs accepted by one bulk request
+MAX_BULK_IDS = 10000
+# Upper bound on the results returned by one search
+MAX_SEARCH_RESULTS = 1000
+
+# A full object id names content that can never change
+_FULL_OID = re.compile(r'^(?:[0-9a-f]{40}|[0-9a-f]{64})$')
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def conditional(etag, build, immutable=False):
+    """
+    Answer a GET with a strong ETag, or with 304 if the client already holds it.
+    
+    Args:
+        etag (Optional[str]): Validator for the response; None sends none.
+        build (callable): Returns the response, only called when the body is needed.
+        immutable (bool): The URL names a fixed commit, so caches may keep
+            the response for good instead of revalidating it.
+    """
+    if etag is None:
+        return build()
+    headers = {'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else "no-cache"}
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
+    else:
+        response = app.make_response(build())
+        if response.status_code != 200:
+            return response
+        response.headers.update(headers)
+    response.set_etag(etag)
+    return response
+
+def source_conditional(source, build):
+    """``conditional`` for pages rendered from ``requirements_source()``, keyed on its commit."""
+    return conditional(source.commit, build,
+                       immutable=bool(_FULL_OID.match(request.args.get('at') or '')))
+
 def resolve_filepath(req_id: str) -> Path:
     """Derive subsystem from req_id and construct file path."""
     subsystem = extract_subsystem(req_id)
@@ -18,73 +134,253 @@ def resolve_filepath(req_id: str) -> Path:
     return REPO_DIR / subsystem.lower() / f"{req_id}.json"
 
 def load_requirements_from_repo():
-    """Load requirements from the git repository structure."""
-    return get_requirements_by_subsystem(REPO_DIR)
+    """Return requirements grouped by subsystem from the shared repository index."""
+    return get_index(REPO_DIR).by_subsystem()
+
+def requirements_source():
+    """
+    Return what the navigator views read from: the snapshot of the commit
+    the request asks for with ``?at=<commit or tag>``, else of HEAD.
+    
+    Pages are validated by the commit they were read from, so they read the
+    object store rather than the working tree, which may hold files an
+    ingest has written but not committed.  Only before the first commit do
+    they fall back to the index, without a validator.
+    
+    Raises:
+        GitObjectMissing: If ``at`` does not name a commit.
+    """
+    at = request.args.get('at')
+    if at:
+        return get_snapshot(at, REPO_DIR)
+    head = read_head(REPO_DIR)
+    if head:
+        return get_snapshot(head, REPO_DIR)
+    return get_index(REPO_DIR)
+
+def fragment_snapshot(source):
+    """
+    Return ``source`` when it is a commit snapshot, whose object ids key the
+    fragments rendered from it, or None (the index before the first commit)
+    so that nothing is cached.
+    """
+    return source if isinstance(source, Snapshot) else None
+
+@app.errorhandler(GitObjectMissing)
+def unknown_commit(e):
+    return "Not found", 404
 
 @app.route("/")
 def index():
     """Main requirements navigator page."""
-    requirements = load_requirements_from_repo()
-    subsystems = {k: len(v) for k, v in requirements.items()}
-    return render_template('index.html',
-                         subsystems=subsystems,
-                         selected_subsystem=None)
+    source = requirements_source()
+    return source_conditional(source, lambda: render_template('index.html',
+                         subsystems=source.counts(),
+                         selected_subsystem=None,
+                         at=request.args.get('at')))
 
 @app.route("/subsystem/<subsystem>")
 def view_subsystem(subsystem):
     """View requirements for a specific subsystem."""
-    requirements = load_requirements_from_repo()
-    subsystem_reqs = requirements.get(subsystem.lower(), [])
-    return render_template('requirements_list.html',
-                         subsystem=subsystem,
-                         requirements=subsystem_reqs)
+    source = requirements_source()
+    at = request.args.get('at')
+
+    def render():
+        snapshot = fragment_snapshot(source)
+        return cached_fragment(
+            REPO_DIR, snapshot.tree_id(subsystem) if snapshot else None,
+            ('requirements_list', subsystem, at),
+            lambda: render_template('requirements_list.html',
+                                    subsystem=subsystem,
+                                    requirements=source.subsystem(subsystem),
+                                    at=at))
+    return source_conditional(source, render)
 
 @app.route("/requirement/<req_id>")
 def view_requirement_detail(req_id):
     """View detailed information for a specific requirement."""
-    requirements = load_requirements_from_repo()
-
-    # Find the requirement across all subsystems
-    for subsystem_reqs in requirements.values():
-        for req in subsystem_reqs:
-            if req['requirement_id'] == req_id:
-                return f"""
-                <div class="card bg-base-100 border-2 border-primary">
-                    <div class="card-body">
-                        <h3 class="card-title text-primary">{req['requirement_id']} Details</h3>
-                        <div class="space-y-3">
-                            <div>
-                                <strong>Record ID:</strong> {req['record_id']}
-                            </div>
-                            <div>
-                                <strong>Requirement Text:</strong>
-                                <p class="mt-1 p-3 bg-base-200 rounded">{req['requirement_text']}</p>
-                            </div>
-                            {f'<div><strong>Notes:</strong><p class="mt-1 p-3 bg-base-200 rounded">{req["notes"]}</p></div>' if req['notes'] else ''}
-                        </div>
+    source = requirements_source()
+    at = request.args.get('at')
+
+    def render():
+        snapshot = fragment_snapshot(source)
+        return cached_fragment(REPO_DIR, snapshot.blob_id(req_id) if snapshot else None,
+                               ('detail_card', at), lambda: requirement_detail_card(source.get(req_id)))
+    return source_conditional(source, render)
+
+def requirement_detail_card(req):
+    """Render the detail card HTML for one requirement (or None)."""
+    if req is not None:
+        return f"""
+        <div class="card bg-base-100 border-2 border-primary">
+            <div class="card-body">
+                <h3 class="card-title text-primary">{req['requirement_id']} Details</h3>
+                <div class="space-y-3">
+                    <div>
+                        <strong>Record ID:</strong> {req['record_id']}
+                    </div>
+                    <div>
+                        <strong>Requirement Text:</strong>
+                        <p class="mt-1 p-3 bg-base-200 rounded">{req['requirement_text']}</p>
                     </div>
+                    {f'<div><strong>Notes:</strong><p class="mt-1 p-3 bg-base-200 rounded">{req["notes"]}</p></div>' if req['notes'] else ''}
                 </div>
-                """
+            </div>
+        </div>
+        """
 
     return "<div class='alert alert-error'>Requirement not found</div>"
 
 @app.route("/requirements/<req_id>")
 def view_latest(req_id):
     """Return the latest version of the requirement."""
-    path = resolve_filepath(req_id)
-    if not path.exists():
+    try:
+        path = resolve_filepath(req_id)
+    except ValueError:
+        return "Invalid requirement ID format", 400
+    # Serve the blob HEAD holds, so the body always matches its ETag even
+    # while an ingest has written files it has not committed yet
+    head = read_head(REPO_DIR)
+    reader = get_object_reader(REPO_DIR)
+    committed = reader.info(f"{head}:./{path.parent.name}/{path.name}") if head else None
+    if committed is not None:
+        return conditional(
+            committed.oid,
+            lambda: (reader.read(committed.oid).data.decode("utf-8"), 200,
+                     {"Content-Type": "application/json"}))
+    # Not committed yet: serve the working file, without a validator
+    try:
+        return path.read_text(), 200, {"Content-Type": "application/json"}
+    except FileNotFoundError:
         return "Not found", 404
-    return path.read_text(), 200, {"Content-Type": "application/json"}
+
+@app.route("/requirements/bulk", methods=["POST"])
+def bulk_requirements():
+    """
+    Return many requirements in one response.
+
+    The JSON body holds ``ids`` (a list of requirement IDs) and optionally
+    ``commit`` to read them as of a commit or tag.
+    """
+    body = request.get_json(silent=True)
+    ids = body.get('ids') if isinstance(body, dict) else None
+    if not isinstance(ids, list) or not all(isinstance(req_id, str) for req_id in ids):
+        return jsonify({'error': "Expected a JSON body with an 'ids' list of strings"}), 400
+    if len(ids) > MAX_BULK_IDS:
+        return jsonify({'error': f"At most {MAX_BULK_IDS} IDs per request"}), 413
+
+    commit = body.get('commit')
+    if commit is not None and not isinstance(commit, str):
+        return jsonify({'error': "Expected 'commit' to be a string"}), 400
+    source = get_snapshot(commit, REPO_DIR) if commit else get_index(REPO_DIR)
+    found = source.get_many(ids)
+    return jsonify({
+        'requirements': {req_id: record.to_dict() for req_id, record in found.items()},
+        'missing': [req_id for req_id in ids if req_id not in found],
+    })
+
+@app.route("/export")
+@app.route("/export/<subsystem>")
+def export_requirements(subsystem=None):
+    """Stream every requirement, or one subsystem's, as NDJSON; ``?at=`` reads a commit."""
+    at = request.args.get('at')
+    if at:
+        snapshot = get_snapshot(at, REPO_DIR)
+        names = [subsystem.lower()] if subsystem else snapshot.subsystems()
+        records = (record for name in names for record in snapshot.iter_subsystem(name))
+    else:
+        index = get_index(REPO_DIR)
+        if subsystem:
+            records = iter(index.subsystem(subsystem))
+        else:
+            records = (record for reqs in index.by_subsystem().values() for record in reqs)
+    lines = (json.dumps(record.to_dict()) + "\n" for record in records)
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+@app.route("/search")
+def search_requirements():
+    """
+    Full-text search over requirement text, notes and IDs.
+
+    ``q`` holds the query (words, ``prefix*`` words and ``"quoted
+    phrases"``) and ``limit`` the number of ranked results (default 20).
+    """
+    query = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': "limit must be an integer"}), 400
+    if not 0 < limit <= MAX_SEARCH_RESULTS:
+        return jsonify({'error': f"limit must be between 1 and {MAX_SEARCH_RESULTS}"}), 400
+
+    found = get_search_index(REPO_DIR).search(query, limit=limit)
+    records = get_index(REPO_DIR).get_many([result['requirement_id'] for result in found['results']])
+    return jsonify({
+        'query': query,
+        'total': found['total'],
+        'results': [dict(result, requirement=records[result['requirement_id']].to_dict())
+                    for result in found['results'] if result['requirement_id'] in records],
+    })
+
+@app.route("/requirements/<req_id>/versions")
+def list_versions(req_id):
+    """List the commits that added, modified or removed a requirement, oldest first."""
+    if not extract_subsystem(req_id):
+        return "Invalid requirement ID format", 400
+    versions = get_history(REPO_DIR).versions(req_id)
+    if not versions:
+        return jsonify({'error': "Requirement not found"}), 404
+    return jsonify(versions)
+
+# Under links/ so that no tag or branch name is shadowed by /requirements/<req_id>/<commit>
+@app.route("/requirements/<req_id>/links/upstream", defaults={'direction': 'upstream'})
+@app.route("/requirements/<req_id>/links/downstream", defaults={'direction': 'downstream'})
+def trace_links(req_id, direction):
+    """
+    List what a requirement traces back to (upstream) or what traces back
+    to it (downstream), transitively; ``?depth=`` limits the number of links.
+    """
+    depth = request.args.get('depth')
+    if depth is not None and (not depth.isdigit() or int(depth) < 1):
+        return jsonify({'error': "depth must be a positive integer"}), 400
+    graph = get_link_graph(REPO_DIR)
+    if req_id not in graph:
+        return jsonify({'error': "Requirement not found"}), 404
+    walk = graph.upstream if direction == 'upstream' else graph.downstream
+    linked = walk(req_id, max_depth=int(depth) if depth else None)
+    return jsonify({'requirement_id': req_id, direction: linked, 'count': len(linked)})
+
+@app.route("/graph/orphans")
+def graph_orphans():
+    """List requirements without links, and linked IDs that are not requirements."""
+    return jsonify(get_link_graph(REPO_DIR).orphans())
+
+@app.route("/graph/cycles")
+def graph_cycles():
+    """List groups of requirements whose links lead back to themselves."""
+    return jsonify({'cycles': get_link_graph(REPO_DIR).cycles()})
 
 @app.route("/requirements/<req_id>/<commit>")
 def view_version(req_id, commit):
-    """Return the specified version of the requirement from Git."""
+    """
+    Return the specified version of the requirement from Git.
+
+    ``versions`` is taken by the history route, so a tag or branch of that
+    name must be asked for by its commit id.
+    """
     subsystem = extract_subsystem(req_id)
     if not subsystem:
         return "Invalid requirement ID format", 400
     filepath = f"requirements/{subsystem.lower()}/{req_id}.json"
-    content = git_show_file(filepath, commit, REPO_DIR)
-    return content, 200, {"Content-Type": "application/json"}
+    reader = get_object_reader(REPO_DIR)
+    blob = reader.info(f"{commit}:{filepath}")
+    if blob is None:
+        return "Not found", 404
+    return conditional(
+        blob.oid,
+        lambda: (reader.read(blob.oid).data.decode("utf-8"), 200, {"Content-Type": "application/json"}),
+        immutable=bool(_FULL_OID.match(commit)),
+    )
 
 @app.route("/requirements/<req_id>/diff/<commit1>/<commit2>")
 def diff_view(req_id, commit1, commit2):
@@ -93,14 +389,44 @@ def diff_view(req_id, commit1, commit2):
     if not subsystem:
         return "Invalid requirement ID format", 400
     filepath = f"requirements/{subsystem.lower()}/{req_id}.json"
-    diff = git_diff(filepath, commit1, commit2, REPO_DIR)
+    try:
+        diff = git_diff(filepath, commit1, commit2, REPO_DIR, cache=DIFF_CACHE)
+    except GitObjectMissing:
+        return "Not found", 404
     return f"<pre>{diff}</pre>"
 
+@app.route("/compare/<commit1>/<commit2>")
+def compare_view(commit1, commit2):
+    """Stream the requirements added, removed and modified between two commits as NDJSON."""
+    try:
+        lines = compare_ndjson(commit1, commit2, REPO_DIR)
+    except GitObjectMissing:
+        return "Not found", 404
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
 @app.route("/upload", methods=["POST"])
 def upload_csv():
-    """Handle CSV upload and ingest requirements into the repo."""
-    file = request.files['file']
-    path = "uploaded.csv"
-    file.save(path)
-    ingest_csv(path, REPO_DIR)
-    return "Uploaded and committed"
+    """Spool an uploaded CSV and queue it for ingest, returning the job ID."""
+    file = request.files.get('file')
+    if file is None:
+        return jsonify({'error': "No file uploaded"}), 400
+    job = get_ingest_queue().submit(file)
+    return jsonify(job.to_dict()), 202, {"Location": url_for('job_status', job_id=job.id)}
+
+@app.route("/jobs")
+def list_jobs():
+    """List known ingest jobs, oldest first."""
+    return jsonify([job.to_dict() for job in get_ingest_queue().jobs()])
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """Report the progress, and once finished the result, of an ingest job."""
+    job = get_ingest_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/metrics")
+def metrics():
+    """Expose counters and latency histograms in the Prometheus text format."""
+    return REGISTRY.render(), 200, {"Content-Type": CONTENT_TYPE}
@@ -0,0 +1,163 @@
+"""
+Size-bounded caches for values derived from immutable Git objects.
+
+Anything computed from a set of object ids (diffs, parsed snapshots,
+rendered fragments) never goes stale, so these caches only need an upper
+bound on memory and an eviction order.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+def _default_sizeof(value):
+    return len(value)
+
+
+class LRUCache:
+    """
+    A thread-safe least-recently-used cache bounded by total size in bytes.
+
+    Args:
+        max_bytes (int): Upper bound on the summed size of cached values.
+        sizeof (callable): Returns the size charged for a value; defaults
+            to ``len``, which suits ``str`` and ``bytes`` values.
+    """
+
+    def __init__(self, max_bytes, sizeof=_default_sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, _size = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._items[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _key, (_value, evicted) = self._items.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def discard_where(self, predicate):
+        """Drop every entry whose key satisfies ``predicate``; returns how many."""
+        with self._lock:
+            stale = [key for key in self._items if predicate(key)]
+            for key in stale:
+                self.bytes -= self._items.pop(key)[1]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        """Return counters describing the cache."""
+        with self._lock:
+            return {
+                'entries': len(self._items),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class DiffCache:
+    """
+    Diffs keyed by the pair of blob ids they compare.
+
+    Lookups go to an in-memory ``LRUCache`` first and then, if a directory
+    is configured, to files on disk that survive restarts.
+
+    Args:
+        max_bytes (int): Memory bound for the in-memory tier.
+        directory (Path, optional): Folder for the on-disk tier.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, directory=None):
+        self.memory = LRUCache(max_bytes)
+        self.directory = Path(directory) if directory else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    @staticmethod
+    def key(old_oid, new_oid):
+        return f"{old_oid or '0'}..{new_oid or '0'}"
+
+    def _disk_path(self, key):
+        name = key.replace("..", "-")
+        return self.directory / name[:2] / f"{name}.diff"
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.directory is not None:
+            try:
+                value = self._disk_path(key).read_bytes().decode("utf-8")
+            except FileNotFoundError:
+                pass
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                self.memory.put(key, value)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.directory is None:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(value.encode("utf-8"))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Warning: could not write diff cache entry {path}: {e}")
+
+    def stats(self):
+        """Return overall hit/miss counters plus those of the memory tier."""
+        with self._lock:
+            stats = {'hits': self.hits, 'misses': self.misses, 'disk_hits': self.disk_hits}
+        stats['memory'] = self.memory.stats()
+        return stats
@@ -0,0 +1,129 @@
+"""
+Whole-baseline comparison between two commits.
+
+The changed files come from a single ``git diff-tree`` between the two
+trees, and the old and new contents of modified requirements are read in
+pipelined batches through the shared ``git cat-file`` pool.  Results are
+yielded as they are computed, so a caller can stream them out without
+holding the whole report in memory.
+"""
+
+import json
+from pathlib import Path
+
+from .gitobjects import BATCH_SIZE, GitObjectMissing, get_object_reader
+from .utils import run_git
+
+# diff-tree status letters for the three kinds of change reported
+_STATUS = {'A': 'added', 'D': 'removed', 'M': 'modified'}
+
+
+def tree_changes(commit1: str, commit2: str, repo_dir: Path):
+    """
+    List the requirement files that differ between two commits.
+
+    Args:
+        commit1 (str): Older commit, tag or other revision.
+        commit2 (str): Newer commit, tag or other revision.
+        repo_dir (Path): Requirements folder inside the Git working tree.
+
+    Returns:
+        generator: ``(change, subsystem, req_id, old_oid, new_oid)`` in path
+        order, where ``change`` is 'added', 'removed' or 'modified'.  The
+        missing side of an added or removed file is Git's all-zero id.
+
+    Raises:
+        subprocess.CalledProcessError: If either revision is unknown.
+    """
+    result = run_git(
+        ["diff-tree", "-r", "-z", "--raw", "--no-abbrev", "--no-renames", "--relative",
+         commit1, commit2],
+        cwd=repo_dir, capture_output=True, check=True
+    )
+    fields = result.stdout.split(b"\0")
+    # Each entry is ":<modes> <old> <new> <status>" followed by its path
+    for meta, path in zip(fields[0::2], fields[1::2]):
+        if not meta:
+            continue
+        _old_mode, _new_mode, old_oid, new_oid, status = meta[1:].decode("ascii").split(" ")
+        change = _STATUS.get(status[0])
+        parts = Path(path.decode("utf-8")).parts
+        if change is None or len(parts) != 2 or not parts[1].endswith(".json"):
+            continue
+        if change == 'modified' and old_oid == new_oid:
+            continue
+        yield change, parts[0], parts[1][:-len(".json")], old_oid, new_oid
+
+
+def field_changes(old: dict, new: dict) -> dict:
+    """
+    Return ``{field: {'old': ..., 'new': ...}}`` for every field that differs.
+
+    Fields present on only one side are reported with None on the other.
+    """
+    changes = {}
+    for field in list(old) + [f for f in new if f not in old]:
+        if old.get(field) != new.get(field):
+            changes[field] = {'old': old.get(field), 'new': new.get(field)}
+    return changes
+
+
+def compare_commits(commit1: str, commit2: str, repo_dir: Path):
+    """
+    Compare the requirements of two commits or tags.
+
+    Args:
+        commit1 (str): Older commit, tag or other revision.
+        commit2 (str): Newer commit, tag or other revision.
+        repo_dir (Path): Requirements folder inside the Git working tree.
+
+    Returns:
+        generator: One dict per changed requirement, grouped by subsystem in
+        path order, each with 'subsystem', 'requirement_id' and 'change'
+        ('added', 'removed' or 'modified'; modified ones also carry
+        'fields').  The last dict holds a 'summary' of counts per subsystem.
+
+    Raises:
+        GitObjectMissing: If either revision does not name a commit.
+    """
+    reader = get_object_reader(repo_dir)
+    for commit in (commit1, commit2):
+        if reader.info(f"{commit}^{{commit}}") is None:
+            raise GitObjectMissing(f"Unknown commit: {commit}")
+    return _compare(reader, commit1, commit2, Path(repo_dir))
+
+
+def _compare(reader, commit1, commit2, repo_dir):
+    totals = {'added': 0, 'removed': 0, 'modified': 0}
+    subsystems = {}
+    batch = []
+
+    def flush():
+        modified = [entry for entry in batch if entry[0] == 'modified']
+        blobs = reader.read_many(oid for entry in modified for oid in entry[3:5])
+        contents = iter(blobs)
+        for change, subsystem, req_id, _old_oid, _new_oid in batch:
+            record = {'subsystem': subsystem, 'requirement_id': req_id, 'change': change}
+            if change == 'modified':
+                old, new = next(contents), next(contents)
+                record['fields'] = field_changes(json.loads(old.data), json.loads(new.data))
+            yield record
+        batch.clear()
+
+    for entry in tree_changes(commit1, commit2, repo_dir):
+        change, subsystem = entry[0], entry[1]
+        totals[change] += 1
+        counts = subsystems.setdefault(subsystem, {'added': 0, 'removed': 0, 'modified': 0})
+        counts[change] += 1
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE // 2:
+            yield from flush()
+    yield from flush()
+
+    yield {'summary': dict(totals, subsystems=subsystems)}
+
+
+def compare_ndjson(commit1: str, commit2: str, repo_dir: Path):
+    """Return ``compare_commits`` as a generator of newline-delimited JSON lines."""
+    records = compare_commits(commit1, commit2, repo_dir)
+    return (json.dumps(record) + "\n" for record in records)
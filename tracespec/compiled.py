@@ -0,0 +1,278 @@
+"""
+Compiled binary snapshot of the requirements at one commit.
+
+Decoding every JSON file is most of the cost of a cold start.  The
+snapshot file stores the same records as a deduplicated string table plus
+integer offsets, so loading it is a handful of array casts over a
+memory-mapped file followed by one decode per distinct string.  The
+records are decoded into ordinary objects and the map is closed, so the
+file only shortens cold starts; nothing in it is shared between processes,
+which share the decoded records only by forking after the load (see
+``server.py``).  ``tracespec build-cache`` writes the file; once it exists,
+the first cold load that finds it compiled from another commit rebuilds
+it, so ingest never pays for it.
+
+Layout (all integers unsigned 32-bit in the byte order named in the
+header)::
+
+    header      MAGIC, format version, byte order, commit id length
+    commit id   ASCII
+    counts      strings, subsystems, records, fields
+    strings     (strings + 1) offsets into the UTF-8 string data
+    subsystems  (name, first record, record count) per subsystem
+    records     (records + 1) offsets into the field pairs
+    fields      (key, value) string ids; a value id with the top bit set
+                holds JSON text for a non-string value
+    string data
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from .gitobjects import GitObjectMissing
+from .model import Requirement
+from .snapshot import get_snapshot
+from .utils import git_dir
+
+MAGIC = b"TSPC"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHcB")
+_COUNTS = struct.Struct("<IIII")
+_JSON_VALUE = 0x80000000
+_BYTE_ORDERS = {b"L": "little", b"B": "big"}
+
+
+def snapshot_path(repo_dir) -> Path:
+    """Where the compiled snapshot for ``repo_dir`` is stored."""
+    return git_dir(repo_dir) / "tracespec" / "snapshot.bin"
+
+
+def _u32(values):
+    return array("I", values).tobytes()
+
+
+def build_snapshot_file(repo_dir, commit="HEAD", path=None):
+    """
+    Compile the requirements at ``commit`` into a snapshot file.
+
+    The records are read from the object store, so the file describes the
+    commit exactly, whatever the state of the working tree.
+
+    Args:
+        repo_dir (Path): Requirements folder inside the Git working tree.
+        commit (str): Commit or tag to compile (defaults to HEAD).
+        path (Path, optional): Output file; defaults to ``snapshot_path``.
+
+    Returns:
+        dict: 'path', 'commit', 'requirements', 'strings' and 'bytes'.
+    """
+    if array("I").itemsize != 4:
+        raise RuntimeError("Compiled snapshots need a platform with 32-bit unsigned ints")
+    snapshot = get_snapshot(commit, repo_dir)
+    path = Path(path) if path else snapshot_path(repo_dir)
+
+    strings = {}
+
+    def string_id(text):
+        sid = strings.get(text)
+        if sid is None:
+            sid = strings[text] = len(strings)
+        return sid
+
+    subsystems, record_offsets, fields = [], [0], []
+    for name in snapshot.subsystems():
+        first = len(record_offsets) - 1
+        for record in snapshot.iter_subsystem(name):
+            for key, value in record.items():
+                if isinstance(value, str):
+                    value_id = string_id(value)
+                else:
+                    value_id = string_id(json.dumps(value)) | _JSON_VALUE
+                fields.extend((string_id(key), value_id))
+            record_offsets.append(len(fields) // 2)
+        subsystems.extend((string_id(name), first, len(record_offsets) - 1 - first))
+
+    encoded = [text.encode("utf-8") for text in strings]
+    string_offsets = [0]
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+
+    commit_id = snapshot.commit.encode("ascii")
+    byte_order = b"L" if sys.byteorder == "little" else b"B"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, byte_order, len(commit_id)))
+        f.write(commit_id)
+        # Pad so the integer arrays that follow are 4-byte aligned
+        f.write(b"\0" * (-f.tell() % 4))
+        f.write(_COUNTS.pack(len(encoded), len(subsystems) // 3,
+                             len(record_offsets) - 1, len(fields) // 2))
+        f.write(_u32(string_offsets))
+        f.write(_u32(subsystems))
+        f.write(_u32(record_offsets))
+        f.write(_u32(fields))
+        f.write(b"".join(encoded))
+    os.replace(tmp, path)
+
+    return {
+        'path': path,
+        'commit': snapshot.commit,
+        'requirements': len(record_offsets) - 1,
+        'strings': len(encoded),
+        'bytes': path.stat().st_size,
+    }
+
+
+def refresh_snapshot_file(repo_dir):
+    """
+    Rebuild the snapshot file at HEAD, if one has been built before.
+
+    A file compiled from an older commit is never loaded, so without this
+    every cold start after an ingest would decode the JSON files again.
+    ``RequirementIndex`` calls it after a cold load that could not use the
+    file.
+
+    Returns:
+        Optional[dict]: What ``build_snapshot_file`` returns, or None when
+            there is no snapshot file or it could not be rebuilt.
+    """
+    if git_dir(repo_dir) is None or not snapshot_path(repo_dir).exists():
+        return None
+    try:
+        return build_snapshot_file(repo_dir)
+    except (OSError, GitObjectMissing) as e:
+        print(f"Warning: could not rebuild snapshot file {snapshot_path(repo_dir)}: {e}")
+        return None
+
+
+class CompiledSnapshot:
+    """
+    A snapshot file, memory-mapped while it is open.
+
+    Args:
+        path (Path): The snapshot file.
+
+    Raises:
+        ValueError: If the file is not a snapshot this version can read.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self):
+        view = self._view = memoryview(self._map)
+        try:
+            magic, version, byte_order, commit_len = _HEADER.unpack_from(view, 0)
+        except struct.error:
+            raise ValueError(f"{self.path} is not a TraceSpec snapshot")
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} TraceSpec snapshot")
+        if _BYTE_ORDERS.get(byte_order) != sys.byteorder:
+            raise ValueError(f"{self.path} was built on a machine with a different byte order")
+
+        pos = _HEADER.size
+        self.commit = bytes(view[pos:pos + commit_len]).decode("ascii")
+        pos += commit_len
+        pos += -pos % 4
+        n_strings, n_subsystems, n_records, n_fields = _COUNTS.unpack_from(view, pos)
+        pos += _COUNTS.size
+        tables = 4 * (n_strings + 1 + 3 * n_subsystems + n_records + 1 + 2 * n_fields)
+        if pos + tables > len(view):
+            raise ValueError(f"{self.path} is truncated")
+
+        def u32(count):
+            nonlocal pos
+            values = view[pos:pos + 4 * count].cast("I")
+            pos += 4 * count
+            return values
+
+        self._string_offsets = u32(n_strings + 1)
+        self._subsystems = u32(3 * n_subsystems)
+        self._record_offsets = u32(n_records + 1)
+        self._fields = u32(2 * n_fields)
+        self._string_data = view[pos:pos + self._string_offsets[n_strings]]
+
+    def strings(self):
+        """Decode the string table, once per distinct string."""
+        offsets, data = self._string_offsets, self._string_data
+        return [str(data[offsets[i]:offsets[i + 1]], "utf-8") for i in range(len(offsets) - 1)]
+
+    def by_subsystem(self):
+        """
+        Decode every record.
+
+        Returns:
+            dict: Subsystem name -> {requirement_id: Requirement}.  Equal
+                strings are shared between records.
+        """
+        strings = self.strings()
+        record_offsets, fields, subsystems = self._record_offsets, self._fields, self._subsystems
+        result = {}
+        for i in range(0, len(subsystems), 3):
+            name, first, count = strings[subsystems[i]], subsystems[i + 1], subsystems[i + 2]
+            records = {}
+            for r in range(first, first + count):
+                record = {}
+                for f in range(2 * record_offsets[r], 2 * record_offsets[r + 1], 2):
+                    key, value_id = strings[fields[f]], fields[f + 1]
+                    if key == 'parsed':
+                        # Derived from the ID again by Requirement; only its presence matters
+                        value = None
+                    elif value_id & _JSON_VALUE:
+                        value = json.loads(strings[value_id & ~_JSON_VALUE])
+                    else:
+                        value = strings[value_id]
+                    record[key] = value
+                record = Requirement.from_dict(record)
+                records[record.get('requirement_id', '')] = record
+            result[name] = records
+        return result
+
+    def close(self):
+        for name in ("_string_offsets", "_subsystems", "_record_offsets", "_fields",
+                     "_string_data", "_view"):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._map.close()
+
+
+def load_snapshot_file(repo_dir, head):
+    """
+    Return the compiled records for ``head``, or None if there is no usable
+    snapshot file for that commit.
+
+    Returns:
+        Optional[dict]: Subsystem name -> {requirement_id: record}.
+    """
+    if head is None or git_dir(repo_dir) is None:
+        return None
+    path = snapshot_path(repo_dir)
+    try:
+        snapshot = CompiledSnapshot(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring snapshot file {path}: {e}")
+        return None
+    try:
+        if snapshot.commit != head:
+            return None
+        return snapshot.by_subsystem()
+    finally:
+        snapshot.close()
+
@@ -0,0 +1,160 @@
+"""
+Bulk import of historical baselines through ``git fast-import``.
+
+Replaying old CSV exports through ``ingest_csv`` costs at least two ``git``
+processes per commit.  ``fast_import_csvs`` instead turns an ordered list of
+baselines into a single fast-import stream: one commit and one annotated tag
+per CSV, with each distinct blob written only once.
+"""
+
+import subprocess
+import time
+from pathlib import Path
+
+from . import fragments
+from .ingest import _prepare_rows, _read_rows
+from .manifest import Manifest
+from .metrics import GIT_COMMAND_SECONDS
+from .utils import git_dir, read_head, run_git
+from .versions import get_history
+
+DEFAULT_TAG_FORMAT = "v{n}.0"
+
+
+def _git_output(args, cwd):
+    return run_git(args, cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+
+def _current_branch(repo_dir):
+    head = (git_dir(repo_dir) / "HEAD").read_text(encoding="utf-8").strip()
+    if not head.startswith("ref:"):
+        raise ValueError("Cannot bulk import onto a detached HEAD")
+    return head[4:].strip()
+
+
+def _data(payload: bytes) -> bytes:
+    return b"data %d\n%s\n" % (len(payload), payload)
+
+
+def fast_import_csvs(csv_paths, repo_dir, tag_format=DEFAULT_TAG_FORMAT, workers=1):
+    """
+    Import an ordered list of CSV baselines with a single ``git fast-import``.
+
+    Each CSV becomes one commit on the current branch holding every
+    requirement that changed since the previous baseline, and one annotated
+    tag named by ``tag_format`` (``{n}`` is the 1-based position and
+    ``{name}`` the CSV file stem).  Blobs already in the repository or earlier
+    in the stream are referenced rather than written again.
+
+    Args:
+        csv_paths (list): CSV file paths, oldest baseline first.
+        repo_dir (Path): Requirements folder inside the Git working tree.
+        tag_format (str): Format string for the tag of each baseline.
+        workers (int): Processes used to parse and serialize rows.
+
+    Returns:
+        list: One summary dict per CSV with 'csv_path', 'tag', 'processed',
+            'updated' and 'errors'.
+    """
+    repo_dir = Path(repo_dir)
+    csv_paths = [Path(p) for p in csv_paths]
+    tags = [tag_format.format(n=n, name=p.stem) for n, p in enumerate(csv_paths, 1)]
+
+    existing_tags = set(_git_output(["for-each-ref", "--format=%(refname:short)", "refs/tags"],
+                                    repo_dir).split())
+    clashes = [t for t in tags if t in existing_tags] + [t for t in set(tags) if tags.count(t) > 1]
+    if clashes:
+        raise ValueError(f"Tags already exist or repeat: {sorted(set(clashes))}")
+
+    prefix = _git_output(["rev-parse", "--show-prefix"], repo_dir).strip()
+    branch = _current_branch(repo_dir)
+    ident = _git_output(["var", "GIT_COMMITTER_IDENT"], repo_dir).strip().encode("utf-8")
+    manifest = Manifest.load(repo_dir)
+    head_before = manifest.head
+
+    # Blob ids known to the object store, either already or via this stream
+    known_blobs = set(manifest.entries.values())
+    marks = {}
+    next_mark = 1
+    parent = head_before.encode("ascii") if head_before else None
+    results = []
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(["git", "fast-import", "--quiet", "--done"],
+                            cwd=repo_dir, stdin=subprocess.PIPE)
+    stream = proc.stdin
+    try:
+        for csv_path, tag in zip(csv_paths, tags):
+            print(f"Importing {csv_path} as {tag}")
+            summary = {'csv_path': str(csv_path), 'tag': tag,
+                       'processed': 0, 'updated': 0, 'errors': 0}
+            file_changes = []
+
+            with open(csv_path, newline='', encoding='utf-8') as csvfile:
+                for row_num, req_id, status, payload in _prepare_rows(
+                        _read_rows(csvfile), manifest.algorithm, workers):
+                    summary['processed'] += 1
+                    if status != 'ok':
+                        summary['errors'] += 1
+                        print(payload)
+                        continue
+
+                    subsystem_lower, _data_dict, content, oid = payload
+                    if manifest.matches(req_id, oid):
+                        continue
+
+                    if oid in known_blobs:
+                        dataref = marks.get(oid, oid.encode("ascii"))
+                    else:
+                        dataref = b":%d" % next_mark
+                        stream.write(b"blob\nmark %s\n" % dataref + _data(content.encode("utf-8")))
+                        marks[oid] = dataref
+                        known_blobs.add(oid)
+                        next_mark += 1
+
+                    path = f"{prefix}{subsystem_lower}/{req_id}.json".encode("utf-8")
+                    file_changes.append(b"M 100644 %s %s\n" % (dataref, path))
+                    manifest.entries[req_id] = oid
+                    summary['updated'] += 1
+
+            if file_changes:
+                commit_mark = b":%d" % next_mark
+                next_mark += 1
+                stream.write(b"commit %s\nmark %s\ncommitter %s\n" % (branch.encode("utf-8"), commit_mark, ident))
+                stream.write(_data(f"Import baseline {csv_path.name} ({summary['updated']} requirements)".encode("utf-8")))
+                if parent:
+                    stream.write(b"from %s\n" % parent)
+                stream.writelines(file_changes)
+                stream.write(b"\n")
+                parent = commit_mark
+
+            if parent is None:
+                print(f"Warning: {csv_path} produced no requirements; not tagging {tag}")
+                summary['tag'] = None
+            else:
+                stream.write(b"tag %s\nfrom %s\ntagger %s\n" % (tag.encode("utf-8"), parent, ident))
+                stream.write(_data(f"Requirements baseline {csv_path.name}".encode("utf-8")))
+            results.append(summary)
+
+        stream.write(b"done\n")
+    finally:
+        stream.close()
+        returncode = proc.wait()
+        GIT_COMMAND_SECONDS.observe(time.perf_counter() - started, command="fast-import")
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, "git fast-import")
+
+    # fast-import moved the branch ref; bring the index and files along
+    head_after = read_head(repo_dir)
+    if head_after != head_before:
+        if head_before:
+            _git_output(["read-tree", "-u", "-m", head_before, head_after], repo_dir)
+        else:
+            _git_output(["read-tree", "-u", "-m", head_after], repo_dir)
+        manifest.save(head_after)
+        get_history(repo_dir).refresh()
+        fragments.invalidate(repo_dir, head_before, head_after)
+
+    total = sum(r['updated'] for r in results)
+    print(f"\nImported {len(results)} baselines, {total} requirement versions")
+    return results
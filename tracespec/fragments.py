@@ -0,0 +1,103 @@
+"""
+Rendered HTML fragments keyed by the Git objects they were rendered from.
+
+A requirement card depends only on its blob and a subsystem list only on
+its tree, so a fragment is stored under that object id (plus whatever
+else varies the output, such as the ``?at=`` links) and is valid for as
+long as it is kept.  Hot pages are served as the stored bytes.  After an
+ingest commit, ``invalidate`` drops the fragments of exactly the blobs
+and trees the commit replaced, instead of waiting for them to age out.
+
+A fragment larger than ``FRAGMENT_CACHE_BYTES`` is never stored and is
+rendered on every request.  A subsystem list takes about 1 KB per
+requirement, so the default bound caches lists of up to about 60,000
+requirements; set ``TRACESPEC_FRAGMENT_CACHE_BYTES`` higher for larger
+subsystems.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from .cache import LRUCache
+from .compare import tree_changes
+from .gitobjects import get_object_reader
+
+FRAGMENT_CACHE_BYTES = int(os.environ.get("TRACESPEC_FRAGMENT_CACHE_BYTES", 64 * 1024 * 1024))
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_fragment_cache(repo_dir) -> LRUCache:
+    """Return the fragment cache for ``repo_dir``, creating it on first use."""
+    key = Path(repo_dir).resolve()
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = LRUCache(FRAGMENT_CACHE_BYTES)
+        return cache
+
+
+def fragment_cache_stats():
+    """Return the summed counters of every repository's fragment cache."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    totals = {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+    for cache in caches:
+        stats = cache.stats()
+        for field in totals:
+            totals[field] += stats[field]
+    return totals
+
+
+def cached_fragment(repo_dir, oid, variant, render) -> bytes:
+    """
+    Return the fragment rendered from object ``oid``, rendering it on a miss.
+
+    Args:
+        repo_dir (Path): Requirements folder inside the Git working tree.
+        oid (str): Blob or tree the fragment shows; None skips the cache.
+        variant (tuple): Everything else the output depends on.
+        render (callable): Returns the fragment as a string.
+
+    Returns:
+        bytes: The UTF-8 encoded fragment.
+    """
+    if oid is None:
+        return render().encode("utf-8")
+    cache = get_fragment_cache(repo_dir)
+    key = (oid, variant)
+    data = cache.get(key)
+    if data is None:
+        data = render().encode("utf-8")
+        cache.put(key, data)
+    return data
+
+
+def invalidate(repo_dir, head_before, head_after):
+    """
+    Drop the fragments of the blobs and subsystem trees that ``head_after``
+    replaced or removed.
+
+    Does nothing when no fragment was ever cached for ``repo_dir``.
+
+    Returns:
+        int: The number of fragments dropped.
+    """
+    with _caches_lock:
+        cache = _caches.get(Path(repo_dir).resolve())
+    if cache is None or not len(cache) or not head_before or head_before == head_after:
+        return 0
+
+    stale, subsystems = set(), set()
+    for change, subsystem, _req_id, old_oid, _new_oid in tree_changes(head_before, head_after, repo_dir):
+        if change != 'added':
+            stale.add(old_oid)
+        subsystems.add(subsystem)
+    reader = get_object_reader(repo_dir)
+    for subsystem in subsystems:
+        tree = reader.info(f"{head_before}:./{subsystem}")
+        if tree is not None:
+            stale.add(tree.oid)
+    return cache.discard_where(lambda key: key[0] in stale)
@@ -0,0 +1,275 @@
+"""
+Long-lived readers for the Git object store.
+
+Starting ``git show`` for every blob costs far more than reading the blob
+itself.  The classes here keep a small pool of ``git cat-file --batch``
+processes alive per repository and talk to them over pipes, so a read is a
+single request/response round-trip.
+"""
+
+import atexit
+import os
+import queue
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from .metrics import GIT_OBJECT_REQUEST_SECONDS
+
+
+# Object names written to a worker before reading its replies; small enough
+# that the batch always fits in the pipe buffer, so writing never blocks
+BATCH_SIZE = 128
+
+
+class GitObjectMissing(LookupError):
+    """Raised when an object name does not resolve in the repository."""
+
+
+class GitObject(NamedTuple):
+    oid: str
+    type: str
+    size: int
+    data: Optional[bytes] = None
+
+
+class _CatFile:
+    """A single ``git cat-file --batch`` (or ``--batch-check``) process."""
+
+    def __init__(self, cwd, check=False):
+        self.cwd = cwd
+        self.check = check
+        self.proc = None
+        self._start()
+
+    def _start(self):
+        mode = "--batch-check" if self.check else "--batch"
+        self.proc = subprocess.Popen(
+            ["git", "cat-file", mode],
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    @property
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def restart(self):
+        self.close()
+        self._start()
+
+    def close(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        self.proc = None
+
+    def request(self, spec: str) -> Optional[GitObject]:
+        """Look up one object name, returning None if it does not exist."""
+        self.proc.stdin.write(spec.encode("utf-8") + b"\n")
+        self.proc.stdin.flush()
+        return self._read_response()
+
+    def request_many(self, specs) -> list:
+        """Pipeline a batch of object names, returning results in order."""
+        self.proc.stdin.write(b"".join(spec.encode("utf-8") + b"\n" for spec in specs))
+        self.proc.stdin.flush()
+        return [self._read_response() for _ in specs]
+
+    def _read_response(self) -> Optional[GitObject]:
+        header = self.proc.stdout.readline()
+        if not header:
+            raise BrokenPipeError("git cat-file exited unexpectedly")
+
+        fields = header.rstrip(b"\n").decode("utf-8").split(" ")
+        if fields[-1] in ("missing", "ambiguous"):
+            return None
+
+        oid, obj_type, size = fields[0], fields[1], int(fields[2])
+        if self.check:
+            return GitObject(oid, obj_type, size)
+
+        data = self.proc.stdout.read(size)
+        self.proc.stdout.read(1)  # trailing newline
+        if len(data) != size:
+            raise BrokenPipeError("git cat-file exited unexpectedly")
+        return GitObject(oid, obj_type, size, data)
+
+
+class _CatFilePool:
+    """A bounded, thread-safe pool of ``_CatFile`` workers."""
+
+    def __init__(self, cwd, size, check=False):
+        self.cwd = cwd
+        self.size = size
+        self.check = check
+        self._mode = "batch-check" if check else "batch"
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                spawn = True
+            else:
+                spawn = False
+
+        if spawn:
+            try:
+                return _CatFile(self.cwd, self.check)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def _release(self, worker):
+        self._idle.put(worker)
+
+    def request(self, spec: str) -> Optional[GitObject]:
+        return self._call("request", spec)
+
+    def request_many(self, specs) -> list:
+        return self._call("request_many", specs)
+
+    def _call(self, method, arg):
+        start = time.perf_counter()
+        worker = self._acquire()
+        try:
+            if not worker.alive:
+                worker.restart()
+            try:
+                return getattr(worker, method)(arg)
+            except (BrokenPipeError, ValueError, OSError):
+                # The process died mid-request; replace it and retry once
+                worker.restart()
+                return getattr(worker, method)(arg)
+        finally:
+            self._release(worker)
+            GIT_OBJECT_REQUEST_SECONDS.observe(time.perf_counter() - start, mode=self._mode)
+
+    def close(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.close()
+        self._created = 0
+
+
+class GitObjectReader:
+    """
+    Read objects from one repository through pooled ``git cat-file`` workers.
+
+    Args:
+        cwd (Path): Any directory inside the Git working tree.
+        size (int): Maximum number of worker processes per mode.
+    """
+
+    def __init__(self, cwd: Path, size: int = 4):
+        self.cwd = Path(cwd)
+        self._contents = _CatFilePool(self.cwd, size)
+        self._info = _CatFilePool(self.cwd, size, check=True)
+
+    @staticmethod
+    def _validate(spec: str):
+        if not spec or "\n" in spec:
+            raise GitObjectMissing(f"Invalid object name: {spec!r}")
+
+    def read(self, spec: str) -> GitObject:
+        """
+        Return the object named by ``spec`` (e.g. ``"<commit>:<path>"``).
+
+        Raises:
+            GitObjectMissing: If the name does not resolve.
+        """
+        self._validate(spec)
+        obj = self._contents.request(spec)
+        if obj is None:
+            raise GitObjectMissing(f"Object not found: {spec}")
+        return obj
+
+    def info(self, spec: str) -> Optional[GitObject]:
+        """
+        Return the id, type and size of ``spec`` without reading its data.
+
+        Returns:
+            Optional[GitObject]: The object header, or None if it does not exist.
+        """
+        self._validate(spec)
+        return self._info.request(spec)
+
+    def read_many(self, specs) -> list:
+        """
+        Read many objects with pipelined requests to one worker.
+
+        Args:
+            specs (list): Object names, as for ``read``.
+
+        Returns:
+            list: A ``GitObject`` or None (if missing) per name, in order.
+        """
+        specs = list(specs)
+        for spec in specs:
+            self._validate(spec)
+        objects = []
+        for i in range(0, len(specs), BATCH_SIZE):
+            objects.extend(self._contents.request_many(specs[i:i + BATCH_SIZE]))
+        return objects
+
+    def close(self):
+        self._contents.close()
+        self._info.close()
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_object_reader(cwd: Path) -> GitObjectReader:
+    """Return the shared reader for the repository containing ``cwd``."""
+    key = Path(cwd).resolve()
+    with _readers_lock:
+        reader = _readers.get(key)
+        if reader is None:
+            reader = _readers[key] = GitObjectReader(key)
+        return reader
+
+
+@atexit.register
+def close_object_readers():
+    """Shut down every pooled ``git cat-file`` process."""
+    with _readers_lock:
+        for reader in _readers.values():
+            reader.close()
+        _readers.clear()
+
+
+def _forget_readers_in_child():
+    # A forked child must not share pipes with its parent's workers
+    global _readers_lock
+    _readers_lock = threading.Lock()
+    _readers.clear()
+
+
+os.register_at_fork(after_in_child=_forget_readers_in_child)
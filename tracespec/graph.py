@@ -0,0 +1,270 @@
+"""
+Traceability links between requirements.
+
+A requirement may list ``parents``, ``children`` and ``derived_from``
+requirements under ``links``.  ``LinkGraph`` turns those into edges that
+point downstream (from a parent or source to the requirement that
+refines or derives from it) and keeps forward and reverse adjacency
+lists over integer node numbers, so impact queries walk memory instead
+of files.  Like ``SearchIndex`` it follows HEAD, re-reading only the
+links of requirements changed by each commit.
+"""
+
+import subprocess
+import threading
+from pathlib import Path
+
+from .index import get_index
+from .utils import git_changed_files
+
+LINK_KINDS = ('parents', 'children', 'derived_from')
+
+
+def record_edges(record):
+    """
+    Return the downstream edges a requirement declares.
+
+    Returns:
+        list: ``(upstream_id, downstream_id)`` pairs.
+    """
+    req_id = record.get('requirement_id')
+    links = record.get('links') or {}
+    edges = [(parent, req_id) for parent in links.get('parents', ())]
+    edges += [(req_id, child) for child in links.get('children', ())]
+    edges += [(source, req_id) for source in links.get('derived_from', ())]
+    return edges
+
+
+class LinkGraph:
+    """
+    Forward and reverse adjacency of the links in one repository.
+
+    Args:
+        repo_dir (Path): Requirements folder inside the Git working tree.
+    """
+
+    def __init__(self, repo_dir):
+        self.repo_dir = Path(repo_dir)
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.head = None
+        self._built = False
+        # requirement_id -> node number, and back
+        self._nodes = {}
+        self._names = []
+        # node -> downstream / upstream nodes; an edge declared from both
+        # ends appears twice, so removing one declaration keeps the other
+        self._forward = []
+        self._reverse = []
+        # requirement_id -> edges it declared, as node pairs
+        self._declared = {}
+        # Nodes that are requirements, rather than only link targets
+        self._present = set()
+        self._cycles = None
+
+    def _node(self, req_id):
+        node = self._nodes.get(req_id)
+        if node is None:
+            node = self._nodes[req_id] = len(self._names)
+            self._names.append(req_id)
+            self._forward.append([])
+            self._reverse.append([])
+        return node
+
+    def _remove(self, req_id):
+        for upstream, downstream in self._declared.pop(req_id, ()):
+            self._forward[upstream].remove(downstream)
+            self._reverse[downstream].remove(upstream)
+        node = self._nodes.get(req_id)
+        if node is not None:
+            self._present.discard(node)
+
+    def _add(self, record):
+        req_id = record.get('requirement_id')
+        if not req_id:
+            return
+        self._remove(req_id)
+        self._present.add(self._node(req_id))
+        declared = []
+        for upstream_id, downstream_id in record_edges(record):
+            upstream, downstream = self._node(upstream_id), self._node(downstream_id)
+            self._forward[upstream].append(downstream)
+            self._reverse[downstream].append(upstream)
+            declared.append((upstream, downstream))
+        if declared:
+            self._declared[req_id] = declared
+
+    def refresh(self):
+        """Bring the graph up to HEAD, re-reading only the requirements that changed."""
+        with self._lock:
+            index = get_index(self.repo_dir)
+            head = index.commit
+            if self._built and head == self.head:
+                return
+            changed = None
+            if self._built and self.head is not None and head is not None:
+                try:
+                    changed = git_changed_files(self.head, head, self.repo_dir)
+                except subprocess.CalledProcessError:
+                    # The graphed commit is gone, e.g. after a history rewrite
+                    print(f"Warning: link graph commit {self.head[:12]} not found, rebuilding")
+            if changed is None:
+                self._clear()
+                for records in index.by_subsystem().values():
+                    for record in records:
+                        self._add(record)
+                self._built = True
+            else:
+                req_ids = [Path(path).stem for path in changed
+                           if len(Path(path).parts) == 2 and path.endswith(".json")]
+                found = index.get_many(req_ids)
+                for req_id in req_ids:
+                    if req_id in found:
+                        self._add(found[req_id])
+                    else:
+                        self._remove(req_id)
+            self.head = head
+            self._cycles = None
+
+    def _walk(self, req_id, adjacency, max_depth):
+        start = self._nodes.get(req_id)
+        if start is None:
+            return []
+        depths = {start: 0}
+        frontier = [start]
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            following = []
+            for node in frontier:
+                for neighbour in adjacency[node]:
+                    if neighbour not in depths:
+                        depths[neighbour] = depth
+                        following.append(neighbour)
+            frontier = following
+        del depths[start]
+        return sorted(({'requirement_id': self._names[node], 'depth': depth,
+                        'exists': node in self._present}
+                       for node, depth in depths.items()),
+                      key=lambda item: (item['depth'], item['requirement_id']))
+
+    def __contains__(self, req_id):
+        self.refresh()
+        with self._lock:
+            node = self._nodes.get(req_id)
+            return node is not None and node in self._present
+
+    def downstream(self, req_id, max_depth=None):
+        """
+        Return everything that traces back to ``req_id``: its children,
+        their children and so on.
+
+        Args:
+            req_id (str): Requirement to start from.
+            max_depth (int, optional): Stop after this many links.
+
+        Returns:
+            list: Dicts with 'requirement_id', 'depth' (links away) and
+                'exists' (False for IDs only named by a link), nearest first.
+        """
+        self.refresh()
+        with self._lock:
+            return self._walk(req_id, self._forward, max_depth)
+
+    def upstream(self, req_id, max_depth=None):
+        """Return everything ``req_id`` traces back to, like ``downstream`` in reverse."""
+        self.refresh()
+        with self._lock:
+            return self._walk(req_id, self._reverse, max_depth)
+
+    def orphans(self):
+        """
+        Return requirements without any links, and link targets that are
+        not requirements.
+
+        Returns:
+            dict: 'orphans' and 'dangling', each a sorted list of IDs.
+        """
+        self.refresh()
+        with self._lock:
+            orphans = [self._names[node] for node in self._present
+                       if not self._forward[node] and not self._reverse[node]]
+            dangling = [name for node, name in enumerate(self._names)
+                        if node not in self._present and (self._forward[node] or self._reverse[node])]
+            return {'orphans': sorted(orphans), 'dangling': sorted(dangling)}
+
+    def cycles(self):
+        """
+        Return the groups of requirements that trace back to themselves.
+
+        Returns:
+            list: Sorted lists of IDs, one per strongly connected component
+                with more than one member or a self-link.
+        """
+        self.refresh()
+        with self._lock:
+            if self._cycles is None:
+                self._cycles = self._strongly_connected()
+            return self._cycles
+
+    def _strongly_connected(self):
+        """Tarjan's algorithm, iterative so deep chains do not hit the recursion limit."""
+        forward = self._forward
+        index_of, lowlink = {}, {}
+        stack, on_stack = [], set()
+        components = []
+        counter = 0
+        for root in range(len(forward)):
+            if root in index_of:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, i = work.pop()
+                if i == 0:
+                    index_of[node] = lowlink[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack.add(node)
+                elif i <= len(forward[node]):
+                    child = forward[node][i - 1]
+                    lowlink[node] = min(lowlink[node], lowlink[child])
+                recurse = False
+                while i < len(forward[node]):
+                    child = forward[node][i]
+                    i += 1
+                    if child not in index_of:
+                        work.append((node, i))
+                        work.append((child, 0))
+                        recurse = True
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[child])
+                if recurse:
+                    continue
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in forward[node]:
+                        components.append(sorted(self._names[member] for member in component))
+        return sorted(components)
+
+
+_graphs = {}
+_graphs_lock = threading.Lock()
+
+
+def get_link_graph(repo_dir) -> LinkGraph:
+    """Return the shared link graph for ``repo_dir``, creating it on first use."""
+    key = Path(repo_dir).resolve()
+    with _graphs_lock:
+        graph = _graphs.get(key)
+        if graph is None:
+            graph = _graphs[key] = LinkGraph(key)
+        return graph
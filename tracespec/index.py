@@ -0,0 +1,271 @@
+"""
+Shared in-memory index of the requirements in a repository.
+
+Scanning every subsystem folder and decoding every JSON file on each page
+view makes latency grow with the corpus.  ``RequirementIndex`` loads the
+tree once and afterwards only checks cheap freshness signals: the commit
+HEAD points at (read straight from the ref files) and the modification
+times of the subsystem folders.  When HEAD moves, only the files that
+differ between the two commits are re-read.  A cold load uses the compiled
+snapshot file (see ``compiled.py``) when it was built from the current HEAD,
+and otherwise rebuilds an existing file for the next cold start.
+"""
+
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+
+from .compiled import load_snapshot_file, refresh_snapshot_file
+from .metrics import INDEX_LOAD_SECONDS
+from .model import Requirement
+from .utils import extract_subsystem, git_changed_files, read_head
+
+
+def _read_requirement(json_file):
+    with open(json_file, 'r', encoding='utf-8') as f:
+        return Requirement.from_dict(json.load(f))
+
+
+def _subsystem_of(record):
+    subsystem = extract_subsystem(record.get('requirement_id', ''))
+    return subsystem.lower() if subsystem else None
+
+
+class RequirementIndex:
+    """
+    Requirements of one repository, grouped by subsystem.
+
+    Args:
+        repo_dir (Path): Requirements folder inside the Git working tree.
+    """
+
+    def __init__(self, repo_dir):
+        self.repo_dir = Path(repo_dir)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._head = None
+        self._mtimes = {}
+        # subsystem -> {requirement_id: record}
+        self._records = {}
+        # subsystem -> records sorted by requirement_id, rebuilt lazily
+        self._sorted = {}
+
+    def _stat_folders(self):
+        """Return {name: mtime} for the repo folder ('') and each subsystem folder."""
+        mtimes = {'': os.stat(self.repo_dir).st_mtime_ns}
+        with os.scandir(self.repo_dir) as entries:
+            for entry in entries:
+                if entry.is_dir() and entry.name != ".git":
+                    mtimes[entry.name] = entry.stat().st_mtime_ns
+        return mtimes
+
+    def _load_subsystem(self, name):
+        records = {}
+        for json_file in (self.repo_dir / name).glob("*.json"):
+            try:
+                record = _read_requirement(json_file)
+            except Exception as e:
+                print(f"Error loading {json_file}: {e}")
+                continue
+            records[record.get('requirement_id', json_file.stem)] = record
+        self._records[name] = records
+        self._sorted.pop(name, None)
+
+    def _load_file(self, relpath):
+        parts = Path(relpath).parts
+        if len(parts) != 2 or not parts[1].endswith(".json"):
+            return
+        name, req_id = parts[0], parts[1][:-len(".json")]
+        records = self._records.setdefault(name, {})
+        path = self.repo_dir / relpath
+        if path.exists():
+            try:
+                records[req_id] = _read_requirement(path)
+            except Exception as e:
+                print(f"Error loading {path}: {e}")
+                records.pop(req_id, None)
+        else:
+            records.pop(req_id, None)
+        self._sorted.pop(name, None)
+
+    def _full_load(self, head, mtimes):
+        self._records = {}
+        self._sorted = {}
+        # A snapshot file compiled from this very commit saves decoding JSON
+        compiled = load_snapshot_file(self.repo_dir, head)
+        if compiled is not None:
+            self._records = {name: compiled.get(name, {}) for name in mtimes if name}
+        else:
+            for name in mtimes:
+                if name:
+                    self._load_subsystem(name)
+        self._head = head
+        self._mtimes = mtimes
+        self._loaded = True
+        return compiled is not None
+
+    def refresh(self):
+        """Bring the index up to date with HEAD and the working tree folders."""
+        with self._lock:
+            if not self.repo_dir.exists():
+                self._records, self._sorted, self._loaded = {}, {}, False
+                return
+
+            head = read_head(self.repo_dir)
+            mtimes = self._stat_folders()
+            if not self._loaded:
+                with INDEX_LOAD_SECONDS.time(kind='full'):
+                    compiled = self._full_load(head, mtimes)
+                if not compiled and head is not None:
+                    # Only a cold start pays for this; ingest and reloads never do
+                    refresh_snapshot_file(self.repo_dir)
+                return
+
+            if head != self._head:
+                if self._head is None or head is None:
+                    with INDEX_LOAD_SECONDS.time(kind='full'):
+                        self._full_load(head, mtimes)
+                    return
+                try:
+                    changed = git_changed_files(self._head, head, self.repo_dir)
+                except subprocess.CalledProcessError:
+                    # The indexed commit is gone, e.g. after a history rewrite
+                    with INDEX_LOAD_SECONDS.time(kind='full'):
+                        self._full_load(head, mtimes)
+                    return
+                with INDEX_LOAD_SECONDS.time(kind='head'):
+                    for relpath in changed:
+                        self._load_file(relpath)
+                self._head = head
+
+            if mtimes != self._mtimes:
+                with INDEX_LOAD_SECONDS.time(kind='folders'):
+                    for name in set(self._records) - set(mtimes):
+                        del self._records[name]
+                        self._sorted.pop(name, None)
+                    for name, mtime in mtimes.items():
+                        if name and self._mtimes.get(name) != mtime:
+                            self._load_subsystem(name)
+                self._mtimes = mtimes
+
+    def apply(self, records, head_before, head_after):
+        """
+        Record requirements just written by ingest without re-reading them.
+
+        Args:
+            records (list): Requirement dicts that were written.
+            head_before (str): HEAD before the ingest started.
+            head_after (str): HEAD after the ingest committed.
+        """
+        with self._lock:
+            if not self._loaded:
+                return
+            for record in records:
+                name = _subsystem_of(record)
+                if name is None:
+                    continue
+                self._records.setdefault(name, {})[record['requirement_id']] = record
+                self._sorted.pop(name, None)
+            # Only skip the next diff-tree if nothing else moved HEAD meanwhile
+            if self._head == head_before:
+                self._head = head_after
+                self._mtimes = self._stat_folders()
+
+    @property
+    def commit(self):
+        """The commit HEAD points at after a refresh (None before the first commit)."""
+        with self._lock:
+            self.refresh()
+            return self._head
+
+    def _sorted_subsystem(self, name):
+        records = self._sorted.get(name)
+        if records is None:
+            records = sorted(self._records.get(name, {}).values(),
+                             key=lambda x: x.get('requirement_id', ''))
+            self._sorted[name] = records
+        return records
+
+    def by_subsystem(self):
+        """
+        Return all requirements grouped by subsystem.
+
+        Returns:
+            dict: Subsystem name -> list of requirements sorted by ID.  The
+                lists are shared and must not be modified.
+        """
+        with self._lock:
+            self.refresh()
+            return {name: self._sorted_subsystem(name) for name in sorted(self._records)}
+
+    def subsystem(self, name):
+        """Return the sorted requirements of one subsystem (empty if unknown)."""
+        with self._lock:
+            self.refresh()
+            return self._sorted_subsystem(name.lower())
+
+    def get(self, req_id):
+        """
+        Look up one requirement by ID.
+
+        The subsystem is derived from the ID, so this is a pair of dict hits.
+        If the index does not hold the requirement, its file is read directly.
+
+        Returns:
+            Optional[dict]: The requirement, or None if it does not exist.
+        """
+        return self.get_many([req_id]).get(req_id)
+
+    def get_many(self, req_ids):
+        """
+        Look up many requirements by ID with a single freshness check.
+
+        Returns:
+            dict: requirement_id -> requirement for every ID that exists.
+        """
+        found = {}
+        with self._lock:
+            self.refresh()
+            for req_id in req_ids:
+                subsystem = extract_subsystem(req_id)
+                if not subsystem:
+                    continue
+                name = subsystem.lower()
+                record = self._records.get(name, {}).get(req_id)
+                if record is None:
+                    record = self._read_fallback(name, req_id)
+                if record is not None:
+                    found[req_id] = record
+        return found
+
+    def _read_fallback(self, name, req_id):
+        path = self.repo_dir / name / f"{req_id}.json"
+        try:
+            return _read_requirement(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            return None
+
+    def counts(self):
+        """Return {subsystem: number of requirements}."""
+        with self._lock:
+            self.refresh()
+            return {name: len(self._records[name]) for name in sorted(self._records)}
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(repo_dir) -> RequirementIndex:
+    """Return the shared index for ``repo_dir``, creating it on first use."""
+    key = Path(repo_dir).resolve()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = RequirementIndex(key)
+        return index
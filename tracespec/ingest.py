@@ -1,10 +1,43 @@
 import csv
 import json
+import multiprocessing
+import queue
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-from .utils import git_commit, extract_subsystem, parse_requirement_id
+from . import fragments
+from .graph import LINK_KINDS
+from .index import get_index
+from .manifest import Manifest, blob_id
+from .metrics import INGEST_ROWS, INGEST_SECONDS
+from .model import Requirement
+from .snapshot import get_snapshot
+from .versions import get_history
+from .utils import git_commit, git_commit_files, git_tag, extract_subsystem, read_head
 
-def ingest_csv(csv_path, repo_dir):
+COMMIT_MODES = ('row', 'csv', 'subsystem')
+EXPECTED_COLUMNS = {'record_id', 'requirement_id', 'requirement_text', 'notes'}
+# Optional columns naming linked requirements, separated by ';', ',' or spaces
+LINK_COLUMNS = LINK_KINDS
+_LINK_SEPARATORS = re.compile(r"[;,\s]+")
+
+# Rows handed to a pipeline worker at a time, and how many chunks per
+# worker may be in flight before the reader waits for the writer
+CHUNK_SIZE = 500
+CHUNKS_PER_WORKER = 2
+
+# Rows between calls to an ingest progress callback
+PROGRESS_INTERVAL = 100
+
+# Prepared rows that may wait for the writer thread
+WRITE_QUEUE_ROWS = CHUNK_SIZE * 2
+_DONE = object()
+
+def ingest_csv(csv_path, repo_dir, commit_mode='row', dry_run=False, workers=1, progress=None):
     """
     Ingest requirements from a CSV file and store each as a versioned JSON file.
     
@@ -13,91 +46,309 @@ def ingest_csv(csv_path, repo_dir):
     - requirement_id: format like SYSAUTH00001 (DOC_ID + SUBSYSTEM + DIGITS)
     - requirement_text: the actual requirement text
     - notes: user provided notes
+    - parents, children, derived_from (optional): IDs of linked
+      requirements, stored under "links" when any are given
     
     Args:
         csv_path (str): Path to the CSV file to ingest
+        repo_dir (Path): Requirements folder inside the Git working tree
+        commit_mode (str): 'row' commits each changed requirement on its own,
+            'csv' writes a single commit for the whole file and 'subsystem'
+            writes one commit per subsystem touched
+        dry_run (bool): Only report what would change; nothing is written
+        workers (int): Processes used to parse, validate and serialize rows
+        progress (callable, optional): Called every PROGRESS_INTERVAL rows,
+            and once at the end, with the running processed/updated/errors
+            counts
+    
+    Rows are compared against the content-hash manifest of HEAD, so
+    unchanged requirements are skipped without touching their files.
+    
+    The CSV is processed as a pipeline: rows are streamed from the file in
+    chunks, prepared by ``workers`` processes, and consumed in order by a
+    writer thread that updates files and commits, so each stage overlaps
+    the others.  Only a bounded number of chunks and queued rows is in
+    flight, so memory stays flat however large the file is.
     """
+    if commit_mode not in COMMIT_MODES:
+        raise ValueError(f"Unknown commit mode '{commit_mode}', expected one of {COMMIT_MODES}")
+
+    started = time.perf_counter()
+    repo_dir = Path(repo_dir)
     processed_count = 0
     updated_count = 0
     error_count = 0
     
-    with open(csv_path, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
+    # Changed files awaiting a batched commit, grouped by subsystem
+    pending = {}
+    written = []
+    changes = {'added': [], 'modified': []}
+    manifest = Manifest.load(repo_dir)
+    head_before = manifest.head
+    
+    def write(prepared):
+        nonlocal processed_count, updated_count, error_count
+        row_num, req_id, status, payload = prepared
+        processed_count += 1
+        if progress is not None and processed_count % PROGRESS_INTERVAL == 0:
+            progress({'processed': processed_count, 'updated': updated_count,
+                      'errors': error_count})
         
-        # Validate expected columns exist
-        expected_columns = {'record_id', 'requirement_id', 'requirement_text', 'notes'}
-        if not expected_columns.issubset(reader.fieldnames):
-            missing = expected_columns - set(reader.fieldnames)
-            raise ValueError(f"CSV missing required columns: {missing}")
+        if status != 'ok':
+            error_count += 1
+            INGEST_ROWS.inc(outcome='error')
+            print(payload)
+            return
         
-        for row_num, row in enumerate(reader, start=2):  # Start at 2 for header row
-            try:
-                processed_count += 1
-                
-                # Extract subsystem from requirement_id using our parser
-                subsystem = extract_subsystem(row['requirement_id'])
-                if not subsystem:
-                    print(f"Warning: Could not parse subsystem from requirement_id '{row['requirement_id']}' at row {row_num}")
-                    error_count += 1
-                    continue
-                
-                # Use requirement_id as the primary identifier
-                req_id = row['requirement_id']
-                subsystem_lower = subsystem.lower()
-                
-                # Create folder for the subsystem if it doesn't exist
-                folder = repo_dir / subsystem_lower
-                folder.mkdir(parents=True, exist_ok=True)
-                
-                # Define the file path using requirement_id
-                filepath = folder / f"{req_id}.json"
-                
-                # Prepare the requirement data with additional parsed info
-                requirement_data = {
-                    'record_id': row['record_id'].strip(),
-                    'requirement_id': row['requirement_id'].strip(),
-                    'requirement_text': row['requirement_text'].strip(),
-                    'notes': row['notes'].strip(),
-                    # Add parsed components for easy access
-                    'parsed': parse_requirement_id(row['requirement_id'])
-                }
-                
-                # Serialize the requirement to JSON (preserving field order)
-                new_content = json.dumps(requirement_data, indent=2, ensure_ascii=False)
-                existing_content = filepath.read_text(encoding='utf-8') if filepath.exists() else None
-                
-                # Only commit if content has changed
-                if new_content != existing_content:
-                    filepath.write_text(new_content, encoding='utf-8')
-                    git_commit(str(filepath.relative_to(repo_dir)), f"Update {req_id}", cwd=repo_dir)
-                    updated_count += 1
-                    print(f"Updated: {req_id} in {subsystem_lower}/")
-                
-            except Exception as e:
-                error_count += 1
-                print(f"Error processing row {row_num} (requirement_id: {row.get('requirement_id', 'unknown')}): {e}")
-                continue
+        try:
+            subsystem_lower, requirement_data, new_content, oid = payload
+            
+            # Only commit if content differs from what HEAD holds
+            if manifest.matches(req_id, oid):
+                INGEST_ROWS.inc(outcome='unchanged')
+                return
+            
+            change = 'modified' if req_id in manifest.entries else 'added'
+            if dry_run:
+                manifest.entries[req_id] = oid
+                changes[change].append(req_id)
+                updated_count += 1
+                INGEST_ROWS.inc(outcome='dry_run')
+                print(f"Would update: {req_id} in {subsystem_lower}/ ({change})")
+                return
+            
+            # Create folder for the subsystem if it doesn't exist
+            folder = repo_dir / subsystem_lower
+            folder.mkdir(parents=True, exist_ok=True)
+            
+            # Define the file path using requirement_id
+            filepath = folder / f"{req_id}.json"
+            filepath.write_text(new_content, encoding='utf-8')
+            relpath = str(filepath.relative_to(repo_dir))
+            if commit_mode == 'row':
+                git_commit(relpath, f"Update {req_id}", cwd=repo_dir)
+            else:
+                pending.setdefault(subsystem_lower, []).append(relpath)
+            manifest.entries[req_id] = oid
+            changes[change].append(req_id)
+            written.append(requirement_data)
+            updated_count += 1
+            INGEST_ROWS.inc(outcome='updated')
+            print(f"Updated: {req_id} in {subsystem_lower}/")
+            
+        except Exception as e:
+            error_count += 1
+            INGEST_ROWS.inc(outcome='error')
+            print(f"Error processing row {row_num} (requirement_id: {req_id}): {e}")
+    
+    # The writer runs on its own thread behind a bounded queue, so reading
+    # and preparing the next rows overlaps with file writes and commits
+    prepared_rows = queue.Queue(maxsize=WRITE_QUEUE_ROWS)
+    writer = _Writer(prepared_rows, write)
+    writer.start()
+    try:
+        with open(csv_path, newline='', encoding='utf-8') as csvfile:
+            for prepared in _prepare_rows(_read_rows(csvfile), manifest.algorithm, workers):
+                if writer.error is not None:
+                    break
+                prepared_rows.put(prepared)
+    finally:
+        prepared_rows.put(_DONE)
+        writer.join()
+    if writer.error is not None:
+        raise writer.error
+    
+    if not dry_run:
+        _commit_pending(pending, Path(csv_path).name, commit_mode, repo_dir)
+        head_after = read_head(repo_dir)
+        manifest.save(head_after)
+        get_index(repo_dir).apply(written, head_before, head_after)
+        if head_after != head_before:
+            get_history(repo_dir).refresh()
+            fragments.invalidate(repo_dir, head_before, head_after)
+        INGEST_SECONDS.observe(time.perf_counter() - started)
     
     # Print summary
-    print(f"\nIngestion Summary:")
+    print(f"\nIngestion Summary{' (dry run)' if dry_run else ''}:")
     print(f"  Processed: {processed_count} requirements")
     print(f"  Updated: {updated_count} files")
     print(f"  Errors: {error_count}")
     
-    return {
+    summary = {
         'processed': processed_count,
         'updated': updated_count,
         'errors': error_count
     }
+    if dry_run:
+        summary['changes'] = changes
+    if progress is not None:
+        progress(dict(summary))
+    return summary
+
+
+class _Writer(threading.Thread):
+    """Apply prepared rows from a queue, in order, until ``_DONE``."""
 
+    def __init__(self, rows, write):
+        super().__init__(name="tracespec-ingest-writer", daemon=True)
+        self.rows = rows
+        self.write = write
+        self.error = None
 
-def ingest_multiple_csvs(csv_paths, create_version_tags=True):
+    def run(self):
+        while True:
+            prepared = self.rows.get()
+            if prepared is _DONE:
+                return
+            if self.error is None:
+                try:
+                    self.write(prepared)
+                except BaseException as e:
+                    # Keep draining so the reader never blocks on a full queue
+                    self.error = e
+
+
+def _read_rows(csvfile):
+    """Validate the CSV header and yield ``(row_num, row)`` lazily."""
+    reader = csv.DictReader(csvfile)
+    
+    # Validate expected columns exist
+    if not EXPECTED_COLUMNS.issubset(reader.fieldnames or ()):
+        missing = EXPECTED_COLUMNS - set(reader.fieldnames or ())
+        raise ValueError(f"CSV missing required columns: {missing}")
+    
+    # Start at 2 for header row
+    yield from enumerate(reader, start=2)
+
+
+def _prepare_row(row_num, row, algorithm):
+    """
+    Parse, validate and serialize one CSV row.
+    
+    Returns:
+        tuple: ``(row_num, req_id, 'ok', (subsystem, data, content, blob_id))``
+            or ``(row_num, req_id, 'error', message)``.
+    """
+    req_id = row.get('requirement_id')
+    try:
+        # Extract subsystem from requirement_id using our parser
+        subsystem = extract_subsystem(req_id)
+        if not subsystem:
+            return (row_num, req_id, 'error',
+                    f"Warning: Could not parse subsystem from requirement_id '{req_id}' at row {row_num}")
+        
+        links = _parse_links(row)
+        invalid = [link for ids in links.values() for link in ids if not extract_subsystem(link)]
+        if invalid:
+            return (row_num, req_id, 'error',
+                    f"Warning: Invalid linked requirement IDs {invalid} for '{req_id}' at row {row_num}")
+        
+        # The record carries the parsed ID components for easy access
+        requirement_data = Requirement(
+            row['record_id'].strip(),
+            row['requirement_id'].strip(),
+            row['requirement_text'].strip(),
+            row['notes'].strip(),
+            {'links': links} if links else None,
+        )
+        
+        # Serialize the requirement to JSON (preserving field order)
+        new_content = json.dumps(requirement_data.to_dict(), indent=2, ensure_ascii=False)
+        oid = blob_id(new_content.encode('utf-8'), algorithm)
+        return (row_num, req_id, 'ok', (subsystem.lower(), requirement_data, new_content, oid))
+    
+    except Exception as e:
+        return (row_num, req_id, 'error',
+                f"Error processing row {row_num} (requirement_id: {req_id or 'unknown'}): {e}")
+
+
+def _parse_links(row):
+    """Return ``{kind: [requirement IDs]}`` for the link columns a row fills in."""
+    links = {}
+    for kind in LINK_COLUMNS:
+        ids = [link for link in _LINK_SEPARATORS.split(row.get(kind) or '') if link]
+        if ids:
+            links[kind] = ids
+    return links
+
+
+def _prepare_chunk(chunk, algorithm):
+    return [_prepare_row(row_num, row, algorithm) for row_num, row in chunk]
+
+
+def _prepare_rows(rows, algorithm, workers=1):
+    """
+    Prepare rows in CSV order, optionally fanning out to worker processes.
+    
+    At most ``workers * CHUNKS_PER_WORKER`` chunks are submitted ahead of the
+    consumer, which bounds memory to a few chunks regardless of file size.
+    """
+    if workers <= 1:
+        for row_num, row in rows:
+            yield _prepare_row(row_num, row, algorithm)
+        return
+    
+    max_in_flight = workers * CHUNKS_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        in_flight = deque()
+        for chunk in _chunked(rows, CHUNK_SIZE):
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft().result()
+            in_flight.append(pool.submit(_prepare_chunk, chunk, algorithm))
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def _pool_context():
+    """
+    Start pool workers without forking this process: ingest also runs on
+    a background thread of the web server, and a forked child could
+    inherit a lock some other thread was holding.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _commit_pending(pending, source_name, commit_mode, repo_dir):
+    """Write the batched commits for files staged by a 'csv' or 'subsystem' ingest."""
+    if not pending:
+        return
+    
+    if commit_mode == 'subsystem':
+        for subsystem, relpaths in sorted(pending.items()):
+            git_commit_files(relpaths,
+                             f"Update {len(relpaths)} {subsystem} requirements from {source_name}",
+                             cwd=repo_dir)
+    else:
+        relpaths = [p for paths in pending.values() for p in paths]
+        git_commit_files(relpaths,
+                         f"Update {len(relpaths)} requirements from {source_name}",
+                         cwd=repo_dir)
+
+
+def ingest_multiple_csvs(csv_paths, repo_dir, create_version_tags=True, commit_mode='csv'):
     """
     Ingest multiple CSV files in sequence, optionally creating version tags.
     
+    For long histories prefer ``fastimport.fast_import_csvs``, which writes
+    all baselines through a single ``git fast-import`` stream.
+    
     Args:
         csv_paths (list): List of CSV file paths to process in order
+        repo_dir (Path): Requirements folder inside the Git working tree
         create_version_tags (bool): Whether to create git tags for each version
+        commit_mode (str): Commit granularity passed to ``ingest_csv``
     """
     results = []
     
@@ -107,7 +358,7 @@ def ingest_multiple_csvs(csv_paths, create_version_tags=True):
         print(f"{'='*50}")
         
         try:
-            result = ingest_csv(csv_path)
+            result = ingest_csv(csv_path, repo_dir, commit_mode=commit_mode)
             result['csv_path'] = csv_path
             results.append(result)
             
@@ -115,8 +366,7 @@ def ingest_multiple_csvs(csv_paths, create_version_tags=True):
             if create_version_tags:
                 version_tag = f"v{i}.0"
                 try:
-                    # This would need to be implemented in your git utils
-                    # git_tag(version_tag, f"Requirements version {version_tag}")
+                    git_tag(version_tag, f"Requirements version {version_tag}", cwd=repo_dir)
                     print(f"Created version tag: {version_tag}")
                 except Exception as e:
                     print(f"Warning: Could not create git tag {version_tag}: {e}")
@@ -134,18 +384,31 @@ def ingest_multiple_csvs(csv_paths, create_version_tags=True):
     return results
 
 
-def get_requirements_by_subsystem(repo_dir, subsystem=None):
+def get_requirements_by_subsystem(repo_dir, subsystem=None, commit=None):
     """
     Retrieve requirements from the repository, optionally filtered by subsystem.
     
     Args:
         subsystem (str, optional): Subsystem to filter by (e.g., 'auth', 'nav')
+        commit (str, optional): Read the requirements as of this commit or
+            tag from the object store instead of the working tree
     
     Returns:
         dict: Dictionary of requirements organized by subsystem
+    
+    Raises:
+        GitObjectMissing: If ``commit`` does not name a commit.
     """
     requirements = {}
     
+    if commit is not None:
+        snapshot = get_snapshot(commit, repo_dir)
+        if subsystem:
+            if subsystem.lower() in snapshot.subsystems():
+                requirements[subsystem.lower()] = snapshot.subsystem(subsystem)
+            return requirements
+        return snapshot.by_subsystem()
+    
     if subsystem:
         # Search specific subsystem folder
         subsystem_folder = repo_dir / subsystem.lower()
@@ -169,8 +432,7 @@ def _load_subsystem_requirements(subsystem_folder):
     for json_file in subsystem_folder.glob("*.json"):
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
-                requirement = json.load(f)
-                requirements.append(requirement)
+                requirements.append(Requirement.from_dict(json.load(f)))
         except Exception as e:
             print(f"Error loading {json_file}: {e}")
     
@@ -188,7 +450,8 @@ if __name__ == "__main__":
     ]
     
     # Process all CSV files
-    results = ingest_multiple_csvs(sample_csvs)
+    repo_dir = Path(__file__).parent.parent / "requirements_repo" / "requirements"
+    results = ingest_multiple_csvs(sample_csvs, repo_dir)
     
     # Print final summary
     total_processed = sum(r['processed'] for r in results)
@@ -0,0 +1,156 @@
+"""
+Background ingest jobs for uploaded CSV files.
+
+Uploads are spooled to uniquely named files and queued to a single worker
+thread, which runs ``ingest_csv`` for one job at a time.  Web requests only
+enqueue and poll, so they never wait on an ingest, and repository writes
+are serialized through the one worker.
+"""
+
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+from .ingest import ingest_csv
+
+# Finished jobs kept for status polling before the oldest are forgotten
+MAX_FINISHED_JOBS = 1000
+
+
+class IngestJob:
+    """State of one queued upload."""
+
+    def __init__(self, filename, csv_path):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.csv_path = csv_path
+        self.status = 'queued'
+        self.progress = {'processed': 0, 'updated': 0, 'errors': 0}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'progress': dict(self.progress),
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class IngestQueue:
+    """
+    A FIFO of ingest jobs drained by one background thread.
+
+    Args:
+        repo_dir (Path): Requirements folder the jobs ingest into.
+        spool_dir (Path): Folder for uploaded files awaiting ingest.
+        commit_mode (str): Commit granularity passed to ``ingest_csv``.
+    """
+
+    def __init__(self, repo_dir, spool_dir, commit_mode='csv'):
+        self.repo_dir = Path(repo_dir)
+        self.spool_dir = Path(spool_dir)
+        self.commit_mode = commit_mode
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, upload):
+        """
+        Spool an uploaded file and queue it for ingest.
+
+        Args:
+            upload: A ``werkzeug.datastructures.FileStorage`` (or any object
+                with ``filename`` and ``save(fileobj)``).
+
+        Returns:
+            IngestJob: The queued job.
+        """
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="upload-", suffix=".csv", dir=self.spool_dir)
+        try:
+            with os.fdopen(fd, 'wb') as spool:
+                upload.save(spool)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        job = IngestJob(upload.filename or Path(path).name, path)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="tracespec-ingest", daemon=True)
+                self._worker.start()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        """Return the job with this ID, or None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Return all known jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._ingest(job)
+            finally:
+                self._queue.task_done()
+
+    def _ingest(self, job):
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = ingest_csv(job.csv_path, self.repo_dir, commit_mode=self.commit_mode,
+                                    progress=self._progress_updater(job))
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+            print(f"Ingest job {job.id} ({job.filename}) failed: {e}")
+        finally:
+            job.finished_at = time.time()
+            try:
+                os.unlink(job.csv_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _progress_updater(job):
+        def update(counts):
+            job.progress = {k: counts[k] for k in ('processed', 'updated', 'errors')}
+        return update
+
+    def join(self):
+        """Block until every queued job has finished."""
+        self._queue.join()
@@ -2,13 +2,32 @@
 TraceSpec CLI
 
 Usage:
-  tracespec serve [--host=<host>] [--port=<port>] [--debug]
-  tracespec ingest <csvfile>
+  tracespec serve [--host=<host>] [--port=<port>] [--debug | --prefork=<n>]
+  tracespec ingest <csvfile> [--commit=<mode>] [--dry-run] [--workers=<n>]
+  tracespec import <csvfiles>... [--tag-format=<fmt>] [--workers=<n>]
+  tracespec compare <commit1> <commit2>
+  tracespec search <query>... [--limit=<n>]
+  tracespec build-cache
+  tracespec profile ingest <csvfile> [--commit=<mode>] [--dry-run] [--workers=<n>] [--out=<path>]
+  tracespec profile serve-request <path> [--method=<method>] [--warm] [--out=<path>]
 
 Options:
   --host=<host>     Host to bind [default: 127.0.0.1]
   --port=<port>     Port to bind [default: 5000]
   --debug           Enable debug mode
+  --prefork=<n>     Serve from n forked reader processes sharing one preloaded
+                    index, plus one writer process for uploads
+  --commit=<mode>   Commit granularity: row, csv or subsystem [default: row]
+  --dry-run         Report the changes an ingest would make without writing
+  --workers=<n>     Processes used to parse and serialize rows [default: 1]
+  --limit=<n>       Number of search results to show [default: 20]
+  --tag-format=<fmt>  Tag name per baseline; {n} is its position and {name}
+                    the CSV file stem [default: v{n}.0]
+  --out=<path>      Profile output path without extension; writes
+                    <path>.pstats and <path>.collapsed
+  --method=<method>  HTTP method of the profiled request [default: GET]
+  --warm            Send the request once unprofiled first, so caches and
+                    git processes are warm
 """
 
 import os
@@ -18,25 +37,93 @@ from pathlib import Path
 from docopt import docopt
 
 from .app import app
+from .compare import compare_ndjson
+from .compiled import build_snapshot_file
+from .fastimport import fast_import_csvs
+from .gitobjects import GitObjectMissing
 from .ingest import ingest_csv
+from .profiling import default_output, profile_call, summary
+from .search import get_search_index
+from .server import serve
 
 REPO_DIR = Path(__file__).parent.parent / "requirements_repo" / "requirements"
 
 def tracespec_main():
     args = docopt(__doc__)
 
-    if args['serve']:
+    if args['profile']:
+        profile_command(args)
+
+    elif args['serve']:
         host = args['--host'] or '127.0.0.1'
         port = int(args['--port'] or '5000')
         debug = args['--debug']
 
-        print(f"Starting TraceSpec server on {host}:{port}")
-        app.run(host=host, port=port, debug=debug)
+        if args['--prefork']:
+            print(f"Starting TraceSpec server on {host}:{port} with {args['--prefork']} workers")
+            serve(app, REPO_DIR, host=host, port=port, workers=int(args['--prefork']))
+        else:
+            print(f"Starting TraceSpec server on {host}:{port}")
+            app.run(host=host, port=port, debug=debug)
 
     elif args['ingest']:
         csvfile = args['<csvfile>']
         print(f"Ingesting requirements from {csvfile}")
-        ingest_csv(csvfile, REPO_DIR)
+        ingest_csv(csvfile, REPO_DIR, commit_mode=args['--commit'], dry_run=args['--dry-run'],
+                   workers=int(args['--workers']))
+
+    elif args['import']:
+        csvfiles = args['<csvfiles>']
+        print(f"Bulk importing {len(csvfiles)} baselines")
+        fast_import_csvs(csvfiles, REPO_DIR, tag_format=args['--tag-format'],
+                         workers=int(args['--workers']))
+
+    elif args['compare']:
+        try:
+            lines = compare_ndjson(args['<commit1>'], args['<commit2>'], REPO_DIR)
+        except GitObjectMissing as e:
+            sys.exit(str(e))
+        for line in lines:
+            sys.stdout.write(line)
+
+    elif args['search']:
+        found = get_search_index(REPO_DIR).search(" ".join(args['<query>']), limit=int(args['--limit']))
+        for result in found['results']:
+            print(f"{result['score']:8.3f}  {result['requirement_id']}")
+        print(f"{found['total']} matching requirements")
+
+    elif args['build-cache']:
+        info = build_snapshot_file(REPO_DIR)
+        print(f"Wrote {info['path']}: {info['requirements']} requirements, "
+              f"{info['strings']} strings, {info['bytes']} bytes at {info['commit'][:12]}")
+        search = get_search_index(REPO_DIR)
+        path = search.save()
+        stats = search.stats()
+        print(f"Wrote {path}: {stats['requirements']} requirements, {stats['tokens']} tokens, "
+              f"{stats['positions']} positions")
+
+def profile_command(args):
+    """Run one ingest or one request under cProfile and report where time went."""
+    if args['ingest']:
+        csvfile = args['<csvfile>']
+        out = Path(args['--out']) if args['--out'] else default_output(f"ingest-{Path(csvfile).stem}")
+        print(f"Profiling ingest of {csvfile}")
+        _result, (pstats_path, collapsed_path) = profile_call(
+            out, ingest_csv, csvfile, REPO_DIR, commit_mode=args['--commit'],
+            dry_run=args['--dry-run'], workers=int(args['--workers']))
+    else:
+        path = args['<path>']
+        method = args['--method'].upper()
+        out = Path(args['--out']) if args['--out'] else default_output(f"{method}{path}")
+        client = app.test_client()
+        if args['--warm']:
+            client.open(path, method=method)
+        response, (pstats_path, collapsed_path) = profile_call(out, client.open, path, method=method)
+        print(f"{method} {path} -> {response.status}")
+
+    print(summary(pstats_path))
+    print(f"Wrote {pstats_path}")
+    print(f"Wrote {collapsed_path}")
 
 if __name__ == '__main__':
     tracespec_main()
@@ -0,0 +1,116 @@
+"""
+Content-hash manifest of the requirements committed at HEAD.
+
+Ingest compares each serialized row against this manifest instead of
+reading the existing file back from disk.  Hashes are Git blob ids, so the
+manifest can be rebuilt from a single ``git ls-tree`` without reading any
+blob, and is stored inside the Git directory where it is never committed.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from .utils import git_dir, read_head, run_git
+
+MANIFEST_VERSION = 1
+
+
+def blob_id(content: bytes, algorithm: str = "sha1") -> str:
+    """Return the Git blob id Git would assign to ``content``."""
+    digest = hashlib.new(algorithm)
+    digest.update(b"blob %d\0" % len(content))
+    digest.update(content)
+    return digest.hexdigest()
+
+
+def _algorithm_for(head):
+    return "sha256" if head and len(head) == 64 else "sha1"
+
+
+class Manifest:
+    """
+    requirement_id -> blob id for every requirement file at a given HEAD.
+
+    Args:
+        repo_dir (Path): Requirements folder inside the Git working tree.
+    """
+
+    def __init__(self, repo_dir):
+        self.repo_dir = Path(repo_dir)
+        self.head = None
+        self.entries = {}
+
+    @property
+    def path(self) -> Path:
+        return git_dir(self.repo_dir) / "tracespec" / "manifest.json"
+
+    @property
+    def algorithm(self) -> str:
+        return _algorithm_for(self.head)
+
+    @classmethod
+    def load(cls, repo_dir):
+        """
+        Load the stored manifest, rebuilding it if it does not match HEAD.
+
+        Returns:
+            Manifest: A manifest describing the tree at the current HEAD.
+        """
+        manifest = cls(repo_dir)
+        head = read_head(manifest.repo_dir)
+        try:
+            data = json.loads(manifest.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            data = {}
+
+        if data.get("version") == MANIFEST_VERSION and data.get("head") == head:
+            manifest.head = head
+            manifest.entries = data["entries"]
+        else:
+            manifest.rebuild(head)
+        return manifest
+
+    def rebuild(self, head):
+        """Recreate the entries from the tree at ``head`` with one ``git ls-tree``."""
+        self.head = head
+        self.entries = {}
+        if head is None:
+            return
+
+        result = run_git(
+            ["ls-tree", "-r", "-z", head],
+            cwd=self.repo_dir,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        for entry in result.stdout.split("\0"):
+            if not entry:
+                continue
+            meta, path = entry.split("\t", 1)
+            _mode, obj_type, oid = meta.split(" ")
+            if obj_type == "blob" and path.endswith(".json"):
+                self.entries[Path(path).stem] = oid
+
+    def matches(self, req_id: str, oid: str) -> bool:
+        """True if HEAD already holds exactly this content for ``req_id``."""
+        return self.entries.get(req_id) == oid
+
+    def save(self, head):
+        """Persist the entries as describing the tree at ``head``."""
+        if _algorithm_for(head) != self.algorithm and self.entries:
+            # The hash algorithm was only discovered with the first commit;
+            # let the next load rebuild from the tree instead.
+            return
+        self.head = head
+        path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "version": MANIFEST_VERSION,
+            "head": head,
+            "entries": self.entries,
+        }), encoding="utf-8")
+        os.replace(tmp, path)
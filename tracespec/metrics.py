@@ -0,0 +1,232 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are updated on the hot paths (requests, ``git``
+invocations, ingest rows) and only cost a lock and an addition each.
+Values that already live elsewhere, such as cache statistics, are read by
+collector functions when ``/metrics`` is scraped, so they cost nothing
+otherwise.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans a cat-file round-trip up to a large ingest
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """Yield ``(suffix, labels, value)`` for every series."""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, optionally split by labels."""
+
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in sorted(values):
+            yield "", list(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    """
+    Observations counted into cumulative buckets, plus their sum and count.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): Help text.
+        labelnames (tuple): Names of the labels every observation carries.
+        buckets (tuple): Ascending upper bounds; ``+Inf`` is implied.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of a ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), total, count)
+                      for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in sorted(values):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield "_bucket", labels + [("le", _format_value(float(bound)))], cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, count
+
+
+class Registry:
+    """The metrics and scrape-time collectors exposed at ``/metrics``."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """
+        Register a function called on every scrape.
+
+        It returns an iterable of ``(name, type, documentation, samples)``
+        where ``samples`` is a list of ``(labels dict, value)`` pairs.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                print(f"Warning: metrics collector {collector.__name__} failed: {e}")
+                continue
+            for name, metric_type, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "tracespec_http_request_duration_seconds",
+    "Time spent handling HTTP requests, by route template.",
+    ("route", "method", "status"))
+
+GIT_COMMAND_SECONDS = REGISTRY.histogram(
+    "tracespec_git_command_duration_seconds",
+    "Wall-clock time of git subprocesses, by git subcommand.",
+    ("command",))
+
+GIT_OBJECT_REQUEST_SECONDS = REGISTRY.histogram(
+    "tracespec_git_object_request_duration_seconds",
+    "Round-trip time of requests to pooled git cat-file processes.",
+    ("mode",))
+
+INDEX_LOAD_SECONDS = REGISTRY.histogram(
+    "tracespec_index_load_duration_seconds",
+    "Time spent (re)loading the requirement index, by kind of refresh.",
+    ("kind",))
+
+INGEST_ROWS = REGISTRY.counter(
+    "tracespec_ingest_rows_total",
+    "CSV rows processed by ingest, by outcome.",
+    ("outcome",))
+
+INGEST_SECONDS = REGISTRY.histogram(
+    "tracespec_ingest_duration_seconds",
+    "Wall-clock time of whole CSV ingests.")
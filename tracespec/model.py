@@ -0,0 +1,112 @@
+"""
+Compact in-memory representation of one requirement.
+
+A requirement loaded as a plain dict costs a dict for the record, another
+for its ``parsed`` ID components, and fresh copies of every key and of the
+document and subsystem codes.  ``Requirement`` keeps the same data in
+fixed slots, interns the codes, and parses the ID once when it is built.
+It is a read-only ``Mapping`` with the same keys in the same order as the
+JSON files, so templates and callers that index it like a dict keep
+working; ``to_dict`` gives back the exact dict that ingest serializes.
+"""
+
+import re
+import sys
+from collections.abc import Mapping
+
+FIELDS = ('record_id', 'requirement_id', 'requirement_text', 'notes')
+
+# Same shape as utils.parse_requirement_id, matched in one pass
+_ID_PATTERN = re.compile(r'^([A-Za-z]{3})([A-Za-z]{3,4})(\d{5})$')
+_NONE_ABSENT = ()
+
+
+class Requirement(Mapping):
+    """
+    One requirement record.
+
+    Args:
+        record_id (str): Source record ID.
+        requirement_id (str): Requirement ID, e.g. "SYSAUTH00001".
+        requirement_text (str): The requirement text.
+        notes (str): Free-form notes.
+        extra (dict, optional): Any further fields, kept in order after
+            the standard ones.
+    """
+
+    __slots__ = ('record_id', 'requirement_id', 'requirement_text', 'notes',
+                 'document_id', 'subsystem', 'sequence', '_has_parsed', '_absent', 'extra')
+
+    def __init__(self, record_id, requirement_id, requirement_text, notes, extra=None,
+                 *, has_parsed=True, absent=_NONE_ABSENT):
+        self.record_id = record_id
+        self.requirement_id = requirement_id
+        self.requirement_text = requirement_text
+        self.notes = notes
+        match = _ID_PATTERN.match(requirement_id) if isinstance(requirement_id, str) else None
+        if match:
+            self.document_id = sys.intern(match.group(1))
+            self.subsystem = sys.intern(match.group(2))
+            self.sequence = int(match.group(3))
+        else:
+            self.document_id = self.subsystem = self.sequence = None
+        self._has_parsed = has_parsed
+        # Standard fields missing from the source record, hidden from the mapping
+        self._absent = absent
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a requirement from a decoded JSON record."""
+        absent = tuple(field for field in FIELDS if field not in data) or _NONE_ABSENT
+        extra = {key: value for key, value in data.items()
+                 if key not in FIELDS and key != 'parsed'}
+        return cls(data.get('record_id'), data.get('requirement_id'),
+                   data.get('requirement_text'), data.get('notes'), extra,
+                   has_parsed='parsed' in data, absent=absent)
+
+    @property
+    def parsed(self):
+        """The ID components, as ``utils.parse_requirement_id`` returns them."""
+        if self.sequence is None:
+            return None
+        return {'document_id': self.document_id, 'subsystem': self.subsystem,
+                'sequence': self.sequence}
+
+    def to_dict(self):
+        """Return the record as a plain dict in JSON field order."""
+        return {key: self[key] for key in self}
+
+    def __getitem__(self, key):
+        if key in FIELDS and key not in self._absent:
+            return getattr(self, key)
+        if key == 'parsed' and self._has_parsed:
+            return self.parsed
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        for field in FIELDS:
+            if field not in self._absent:
+                yield field
+        if self._has_parsed:
+            yield 'parsed'
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return (len(FIELDS) - len(self._absent) + self._has_parsed
+                + (len(self.extra) if self.extra is not None else 0))
+
+    def __reduce__(self):
+        return (self.__class__.from_dict, (self.to_dict(),))
+
+    def __repr__(self):
+        return f"Requirement({self.to_dict()!r})"
@@ -0,0 +1,191 @@
+"""
+Opt-in cProfile hooks for the CLI and for individual web requests.
+
+Every profile is written twice: as a ``.pstats`` file for ``pstats`` and
+snakeviz, and as ``.collapsed`` folded stacks (``frame;frame;frame count``)
+that flamegraph.pl, speedscope and inferno read directly.
+"""
+
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import re
+import tempfile
+import time
+from pathlib import Path
+
+# Where profiles go when no explicit output path is given
+PROFILE_DIR = Path(os.environ.get("TRACESPEC_PROFILE_DIR",
+                                  Path(tempfile.gettempdir()) / "tracespec-profiles"))
+
+# Request header that asks for a profile when profiling mode is "header"
+PROFILE_HEADER = "X-TraceSpec-Profile"
+PROFILE_MODES = ('off', 'header', 'all')
+
+# Collapsed stacks are in microseconds; deeper or smaller paths are dropped
+_MAX_STACK_DEPTH = 200
+_MIN_SAMPLE_SECONDS = 1e-6
+
+_sequence = itertools.count(1)
+
+
+def _frame_name(func):
+    filename, line, name = func
+    if filename == "~":
+        # Built-ins are recorded as ("~", 0, "<built-in method ...>")
+        label = name
+    else:
+        label = f"{name} ({Path(filename).name}:{line})"
+    return label.replace(";", ":")
+
+
+def collapsed_stacks(stats: pstats.Stats) -> dict:
+    """
+    Approximate folded stacks from a profile's caller/callee graph.
+
+    cProfile records edges, not whole stacks, so each function's own time is
+    split between its callers in proportion to the cumulative time of each
+    edge, walking down from the functions nobody called.
+
+    Returns:
+        dict: ``{"root;child;leaf": microseconds}``.
+    """
+    callees = {}
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+
+    folded = {}
+
+    def walk(func, stack, share):
+        _cc, _nc, tottime, cumtime, _callers = stats.stats[func]
+        stack = stack + [_frame_name(func)]
+        own = tottime * share
+        if own >= _MIN_SAMPLE_SECONDS:
+            key = ";".join(stack)
+            folded[key] = folded.get(key, 0) + own
+        if len(stack) >= _MAX_STACK_DEPTH:
+            return
+        for callee, edge_time in callees.get(func, {}).items():
+            callee_total = stats.stats[callee][3]
+            if callee_total <= 0 or _frame_name(callee) in stack:
+                continue
+            child_share = share * min(edge_time / callee_total, 1.0)
+            if callee_total * child_share >= _MIN_SAMPLE_SECONDS:
+                walk(callee, stack, child_share)
+
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.stats.items():
+        if not callers:
+            walk(func, [], 1.0)
+
+    return {stack: round(seconds * 1_000_000) for stack, seconds in folded.items()
+            if round(seconds * 1_000_000) > 0}
+
+
+def write_profile(profiler: cProfile.Profile, out: Path):
+    """
+    Write ``<out>.pstats`` and ``<out>.collapsed`` for a finished profile.
+
+    Args:
+        profiler (cProfile.Profile): A disabled profiler.
+        out (Path): Output path without extension.
+
+    Returns:
+        tuple: The pstats and collapsed-stack paths.
+    """
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    pstats_path = out.with_name(out.name + ".pstats")
+    collapsed_path = out.with_name(out.name + ".collapsed")
+
+    profiler.dump_stats(pstats_path)
+    stacks = collapsed_stacks(pstats.Stats(profiler))
+    with open(collapsed_path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+    return pstats_path, collapsed_path
+
+
+def profile_call(out, fn, *args, **kwargs):
+    """
+    Run ``fn(*args, **kwargs)`` under cProfile and write the profile to ``out``.
+
+    Returns:
+        tuple: ``(result, (pstats_path, collapsed_path))``.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+    return result, write_profile(profiler, out)
+
+
+def summary(pstats_path, limit=20) -> str:
+    """Return the top ``limit`` functions by cumulative time as text."""
+    stream = io.StringIO()
+    pstats.Stats(str(pstats_path), stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def default_output(label: str) -> Path:
+    """Return a fresh output path in PROFILE_DIR for a profile named ``label``."""
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_") or "root"
+    return PROFILE_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}-{safe[:80]}"
+
+
+class ProfilerMiddleware:
+    """
+    WSGI middleware that profiles selected requests.
+
+    With ``mode`` "header", only requests carrying the ``X-TraceSpec-Profile``
+    header are profiled; with "all", every request is; with "off" (the
+    default) requests pass straight through.  Profiled responses carry the
+    same header, naming the files written.
+
+    Args:
+        app: The WSGI application to wrap.
+        mode (str): One of PROFILE_MODES.
+        profile_dir (Path, optional): Output folder; defaults to PROFILE_DIR.
+    """
+
+    def __init__(self, app, mode='off', profile_dir=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Profiling mode must be one of {', '.join(PROFILE_MODES)}, got {mode!r}")
+        self.app = app
+        self.mode = mode
+        self.profile_dir = profile_dir
+
+    def _wanted(self, environ):
+        if self.mode == 'all':
+            return True
+        return self.mode == 'header' and bool(environ.get("HTTP_X_TRACESPEC_PROFILE"))
+
+    def __call__(self, environ, start_response):
+        if self.mode == 'off' or not self._wanted(environ):
+            return self.app(environ, start_response)
+
+        label = f"{environ.get('REQUEST_METHOD', 'GET')}{environ.get('PATH_INFO', '')}"
+        out = default_output(label)
+        if self.profile_dir is not None:
+            out = Path(self.profile_dir) / out.name
+
+        def start_with_header(status, headers, exc_info=None):
+            headers = list(headers) + [(PROFILE_HEADER, f"{out.name}.pstats")]
+            return start_response(status, headers, exc_info)
+
+        body = []
+
+        def run():
+            iterable = self.app(environ, start_with_header)
+            try:
+                body.extend(iterable)
+            finally:
+                if hasattr(iterable, "close"):
+                    iterable.close()
+
+        profile_call(out, run)
+        return body
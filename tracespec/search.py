@@ -0,0 +1,505 @@
+"""
+Full-text search over requirement text, notes and ID components.
+
+``SearchIndex`` is a positional inverted index: for every token it keeps
+the documents containing it and where in each document it occurs, in
+compact integer arrays.  Documents are numbered in the order they were
+indexed, so the arrays stay sorted by appending; a requirement that
+changes is indexed again under a new number and its old number is only
+marked dead, until dead numbers make up enough of the index to rebuild it.
+
+The index follows HEAD like ``RequirementIndex`` does: after a commit
+only the requirement files that differ between the two commits are
+re-indexed, or the whole index when the old commit is no longer in the
+repository.  ``save`` (run by ``tracespec build-cache``) writes it to a
+file inside the Git directory; once that file exists it is loaded at
+startup instead of re-tokenizing every requirement, and the commits made
+since it was saved are applied in memory.  Refreshing never rewrites the
+file, so no search waits on serializing the index.
+
+Queries are whitespace-separated words that must all match.  A word
+ending in ``*`` matches any token with that prefix, and ``"quoted
+words"`` must appear together and in order.  Matches are ranked by BM25.
+"""
+
+import heapq
+import math
+import os
+import re
+import struct
+import subprocess
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from .index import get_index
+from .utils import git_changed_files, git_dir
+
+MAGIC = b"TSSI"
+FORMAT_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+# Positions skipped between fields, so a phrase never spans two of them
+_FIELD_GAP = 2
+# Rebuild once this share of document numbers belongs to replaced requirements
+_DEAD_RATIO = 0.25
+# Binary-search a posting list per document when it is this many times longer
+_PROBE_RATIO = 16
+# Prefixes expanding to more tokens than this give every match the same score
+_MAX_PREFIX_TOKENS = 64
+
+_HEADER = struct.Struct("<4sHcB")
+_COUNTS = struct.Struct("<IIII")
+_BYTE_ORDERS = {b"L": "little", b"B": "big"}
+
+
+def tokenize(text):
+    """Split text into case-folded word tokens."""
+    return _TOKEN.findall(text.casefold()) if text else []
+
+
+def _document(record):
+    """
+    Return ``({token: [positions]}, length)`` for one requirement.
+
+    The ID comes first, followed by its document, subsystem and sequence
+    components, then the requirement text and the notes.
+    """
+    req_id = record.get('requirement_id') or ''
+    parsed = record.get('parsed') or {}
+    fields = (
+        tokenize(req_id) + tokenize(parsed.get('document_id')) + tokenize(parsed.get('subsystem'))
+        + ([req_id[-5:]] if parsed else []),
+        tokenize(record.get('requirement_text')),
+        tokenize(record.get('notes')),
+    )
+    positions = {}
+    pos = length = 0
+    for tokens in fields:
+        for token in tokens:
+            positions.setdefault(token, []).append(pos)
+            pos += 1
+        length += len(tokens)
+        pos += _FIELD_GAP
+    return positions, length
+
+
+def parse_query(query):
+    """
+    Split a query into clauses.
+
+    Returns:
+        list: ``('term', token)``, ``('prefix', token)`` and
+            ``('phrase', [tokens])`` tuples.  A word that tokenizes into
+            several tokens (e.g. "two-factor") is treated as a phrase.
+    """
+    clauses = []
+    for quoted, word in _QUERY.findall(query):
+        tokens = tokenize(quoted or word)
+        if not tokens:
+            continue
+        if word.endswith("*"):
+            if len(tokens) > 1:
+                clauses.append(('phrase', tokens[:-1]))
+            clauses.append(('prefix', tokens[-1]))
+        elif len(tokens) > 1:
+            clauses.append(('phrase', tokens))
+        else:
+            clauses.append(('term', tokens[0]))
+    return clauses
+
+
+def _contains(docs, doc):
+    i = bisect_left(docs, doc)
+    return i < len(docs) and docs[i] == doc
+
+
+def search_path(repo_dir):
+    """Where the on-disk search index for ``repo_dir`` is stored (None outside Git)."""
+    directory = git_dir(repo_dir)
+    return directory / "tracespec" / "search.bin" if directory else None
+
+
+class SearchIndex:
+    """
+    Inverted index over the requirements of one repository.
+
+    Args:
+        repo_dir (Path): Requirements folder inside the Git working tree.
+    """
+
+    def __init__(self, repo_dir):
+        self.repo_dir = Path(repo_dir)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._clear()
+
+    def _clear(self):
+        self.head = None
+        self._built = False
+        # token -> (document numbers, start of each document's positions, positions)
+        self._postings = {}
+        # Sorted tokens for prefix queries, rebuilt when a token is added
+        self._tokens = None
+        # document number -> requirement_id, or None once replaced
+        self._doc_ids = []
+        self._doc_lengths = array("I")
+        # requirement_id -> live document number, and the replaced numbers
+        self._docs = {}
+        self._dead = set()
+        self._total_length = 0
+
+    @property
+    def path(self):
+        return search_path(self.repo_dir)
+
+    def _add(self, record):
+        req_id = record.get('requirement_id')
+        if not req_id:
+            return
+        self._remove(req_id)
+        doc = len(self._doc_ids)
+        positions, length = _document(record)
+        for token, where in positions.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = (array("I"), array("I"), array("I"))
+                self._tokens = None
+            docs, starts, flat = postings
+            docs.append(doc)
+            starts.append(len(flat))
+            flat.extend(where)
+        self._doc_ids.append(req_id)
+        self._doc_lengths.append(length)
+        self._docs[req_id] = doc
+        self._total_length += length
+
+    def _remove(self, req_id):
+        doc = self._docs.pop(req_id, None)
+        if doc is not None:
+            self._doc_ids[doc] = None
+            self._dead.add(doc)
+            self._total_length -= self._doc_lengths[doc]
+
+    def _build(self, index):
+        self._clear()
+        for records in index.by_subsystem().values():
+            for record in records:
+                self._add(record)
+        self._built = True
+
+    def refresh(self):
+        """
+        Bring the index up to HEAD, re-indexing only the requirement files
+        that changed since the commit it was built from.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+            index = get_index(self.repo_dir)
+            head = index.commit
+            if self._built and head == self.head:
+                return
+            changed = None
+            if self._built and self.head is not None and head is not None:
+                try:
+                    changed = git_changed_files(self.head, head, self.repo_dir)
+                except subprocess.CalledProcessError:
+                    # The indexed commit is gone, e.g. after a history rewrite
+                    print(f"Warning: search index commit {self.head[:12]} not found, rebuilding")
+            if changed is None:
+                self._build(index)
+            else:
+                req_ids = [Path(path).stem for path in changed
+                           if len(Path(path).parts) == 2 and path.endswith(".json")]
+                found = index.get_many(req_ids)
+                for req_id in req_ids:
+                    if req_id in found:
+                        self._add(found[req_id])
+                    else:
+                        self._remove(req_id)
+                if len(self._dead) > _DEAD_RATIO * len(self._doc_ids):
+                    self._build(index)
+            self.head = head
+
+    def _idf(self, df):
+        n = len(self._docs)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _prefixed(self, prefix):
+        if self._tokens is None:
+            self._tokens = sorted(self._postings)
+        tokens = self._tokens
+        i = bisect_left(tokens, prefix)
+        matches = []
+        while i < len(tokens) and tokens[i].startswith(prefix):
+            matches.append(self._postings[tokens[i]])
+            i += 1
+        return matches
+
+    def _clause_postings(self, kind, value):
+        """Return the posting lists a clause reads; empty if it cannot match."""
+        if kind == 'prefix':
+            return self._prefixed(value)
+        tokens = value if kind == 'phrase' else [value]
+        postings = [self._postings.get(token) for token in tokens]
+        return [] if None in postings else postings
+
+    def _narrow(self, candidates, kind, postings):
+        """
+        Return the documents of ``candidates`` (None for all live ones) that
+        contain a clause's tokens.  Phrases are only checked for containing
+        every token here; word order is checked while scoring.
+
+        Set operations run over the posting arrays in C; a handful of
+        candidates is instead probed with a binary search per document.
+        """
+        if kind == 'phrase':
+            for token_postings in sorted(postings, key=lambda p: len(p[0])):
+                candidates = self._narrow(candidates, 'term', [token_postings])
+            return candidates
+        if candidates is None:
+            docs = set()
+            for token_docs, _starts, _flat in postings:
+                docs.update(token_docs)
+            return docs - self._dead
+        if len(postings) == 1:
+            token_docs = postings[0][0]
+            if len(candidates) * _PROBE_RATIO < len(token_docs):
+                return {doc for doc in candidates if _contains(token_docs, doc)}
+            return candidates.intersection(token_docs)
+        docs = set()
+        for token_docs, _starts, _flat in postings:
+            docs.update(token_docs)
+        return candidates & docs
+
+    def _spans(self, postings, docs):
+        """Return ``{doc: (start, end)}`` into a token's positions for the documents in ``docs``."""
+        token_docs, starts, flat = postings
+        n = len(token_docs)
+        ends = starts[1:]
+        ends.append(len(flat))
+        if len(docs) * _PROBE_RATIO < n:
+            spans = {}
+            for doc in docs:
+                i = bisect_left(token_docs, doc)
+                if i < n and token_docs[i] == doc:
+                    spans[doc] = (starts[i], ends[i])
+            return spans
+        return {doc: (start, end) for doc, start, end in zip(token_docs, starts, ends) if doc in docs}
+
+    def _score(self, scores, kind, postings):
+        """Add a clause's BM25 score to ``scores``, dropping documents it does not match."""
+        lengths = self._doc_lengths
+        base = BM25_K1 * (1 - BM25_B)
+        per_length = BM25_K1 * BM25_B * len(self._docs) / self._total_length
+
+        if kind == 'phrase':
+            idf = sum(self._idf(len(p[0])) for p in postings)
+            spans = [self._spans(p, scores) for p in postings]
+            flats = [p[2] for p in postings]
+            for doc in list(scores):
+                start, end = spans[0][doc]
+                following = [flat[slice(*token_spans[doc])]
+                             for flat, token_spans in zip(flats[1:], spans[1:])]
+                tf = sum(all(pos + i + 1 in where for i, where in enumerate(following))
+                         for pos in flats[0][start:end])
+                if tf:
+                    scores[doc] += idf * tf * (BM25_K1 + 1) / (tf + base + per_length * lengths[doc])
+                else:
+                    del scores[doc]
+            return
+
+        if len(postings) > _MAX_PREFIX_TOKENS:
+            # Too many tokens to score one by one: every match counts the same
+            idf = self._idf(min(len(scores), len(self._docs)))
+            for doc in scores:
+                scores[doc] += idf
+            return
+
+        for p in postings:
+            idf = self._idf(len(p[0]))
+            for doc, (start, end) in self._spans(p, scores).items():
+                tf = end - start
+                scores[doc] += idf * tf * (BM25_K1 + 1) / (tf + base + per_length * lengths[doc])
+
+    def search(self, query, limit=20):
+        """
+        Find the requirements matching every clause of ``query``.
+
+        Args:
+            query (str): Words, ``prefix*`` words and ``"quoted phrases"``.
+            limit (int): Number of results to return.
+
+        Returns:
+            dict: 'total' number of matches and 'results', the best
+                ``limit`` as {'requirement_id', 'score'} dicts, best first.
+        """
+        clauses = parse_query(query)
+        self.refresh()
+        with self._lock:
+            if not clauses or not self._docs:
+                return {'total': 0, 'results': []}
+            resolved = []
+            for kind, value in clauses:
+                postings = self._clause_postings(kind, value)
+                if not postings:
+                    return {'total': 0, 'results': []}
+                resolved.append((sum(len(p[0]) for p in postings), kind, postings))
+            # Narrow from the most selective clause, then score phrases first
+            # since checking word order can drop documents
+            resolved.sort(key=lambda clause: clause[0])
+            candidates = None
+            for _size, kind, postings in resolved:
+                candidates = self._narrow(candidates, kind, postings)
+                if not candidates:
+                    return {'total': 0, 'results': []}
+            scores = dict.fromkeys(candidates, 0.0)
+            for _size, kind, postings in sorted(resolved, key=lambda clause: clause[1] != 'phrase'):
+                self._score(scores, kind, postings)
+            best = heapq.nlargest(limit, scores, key=scores.__getitem__)
+            return {
+                'total': len(scores),
+                'results': [{'requirement_id': self._doc_ids[doc], 'score': round(scores[doc], 4)}
+                            for doc in best],
+            }
+
+    def stats(self):
+        """Return the number of requirements, tokens and indexed positions."""
+        with self._lock:
+            return {
+                'requirements': len(self._docs),
+                'tokens': len(self._postings),
+                'positions': sum(len(flat) for _docs, _starts, flat in self._postings.values()),
+            }
+
+    def save(self):
+        """
+        Write the index to ``path``.  From then on it is loaded at startup
+        and brought forward from the commit it was saved at.
+
+        Returns:
+            Path: The file written.
+
+        Raises:
+            ValueError: If the repository is not inside a Git working tree.
+        """
+        if self.path is None:
+            raise ValueError(f"{self.repo_dir} is not inside a Git repository")
+        self.refresh()
+        with self._lock:
+            self._save()
+        return self.path
+
+    def _save(self):
+        tokens = list(self._postings)
+        doc_counts, position_counts = array("I"), array("I")
+        docs, starts, positions = array("I"), array("I"), array("I")
+        for token in tokens:
+            token_docs, token_starts, token_positions = self._postings[token]
+            doc_counts.append(len(token_docs))
+            position_counts.append(len(token_positions))
+            docs.extend(token_docs)
+            starts.extend(token_starts)
+            positions.extend(token_positions)
+        text = "\n".join(doc_id or "" for doc_id in self._doc_ids).encode("utf-8")
+        token_text = "\n".join(tokens).encode("utf-8")
+        head = (self.head or "").encode("ascii")
+        byte_order = b"L" if sys.byteorder == "little" else b"B"
+
+        path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, byte_order, len(head)))
+            f.write(head)
+            f.write(_COUNTS.pack(len(self._doc_ids), len(tokens), len(docs), len(positions)))
+            f.write(struct.pack("<II", len(text), len(token_text)))
+            for values in (self._doc_lengths, doc_counts, position_counts, docs, starts, positions):
+                f.write(values.tobytes())
+            f.write(text)
+            f.write(token_text)
+        os.replace(tmp, path)
+
+    def _load(self):
+        """Load the on-disk index if there is a usable one."""
+        path = self.path
+        if path is None:
+            return
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return
+        try:
+            self._parse(data)
+        except (ValueError, struct.error, IndexError) as e:
+            print(f"Warning: ignoring search index {self.path}: {e}")
+            self._clear()
+
+    def _parse(self, data):
+        magic, version, byte_order, head_len = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"not a version {FORMAT_VERSION} search index")
+        if _BYTE_ORDERS.get(byte_order) != sys.byteorder:
+            raise ValueError("built on a machine with a different byte order")
+        pos = _HEADER.size
+        head = data[pos:pos + head_len].decode("ascii")
+        pos += head_len
+        n_docs, n_tokens, n_postings, n_positions = _COUNTS.unpack_from(data, pos)
+        pos += _COUNTS.size
+        text_len, token_text_len = struct.unpack_from("<II", data, pos)
+        pos += 8
+
+        def u32(count):
+            nonlocal pos
+            values = array("I")
+            values.frombytes(data[pos:pos + 4 * count])
+            if len(values) != count:
+                raise ValueError("truncated")
+            pos += 4 * count
+            return values
+
+        doc_lengths = u32(n_docs)
+        doc_counts, position_counts = u32(n_tokens), u32(n_tokens)
+        docs, starts, positions = u32(n_postings), u32(n_postings), u32(n_positions)
+        doc_ids = data[pos:pos + text_len].decode("utf-8").split("\n") if n_docs else []
+        pos += text_len
+        tokens = data[pos:pos + token_text_len].decode("utf-8").split("\n") if n_tokens else []
+        if len(doc_ids) != n_docs or len(tokens) != n_tokens:
+            raise ValueError("truncated")
+
+        d = p = 0
+        for token, doc_count, position_count in zip(tokens, doc_counts, position_counts):
+            self._postings[token] = (docs[d:d + doc_count], starts[d:d + doc_count],
+                                     positions[p:p + position_count])
+            d += doc_count
+            p += position_count
+        self._doc_ids = [doc_id or None for doc_id in doc_ids]
+        self._doc_lengths = doc_lengths
+        self._docs = {doc_id: doc for doc, doc_id in enumerate(self._doc_ids) if doc_id is not None}
+        self._dead = {doc for doc, doc_id in enumerate(self._doc_ids) if doc_id is None}
+        self._total_length = sum(doc_lengths[doc] for doc in self._docs.values())
+        self.head = head or None
+        self._built = True
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(repo_dir) -> SearchIndex:
+    """Return the shared search index for ``repo_dir``, creating it on first use."""
+    key = Path(repo_dir).resolve()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = SearchIndex(key)
+        return index
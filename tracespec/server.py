@@ -0,0 +1,422 @@
+"""
+Preforking production server.
+
+``serve`` loads the requirement index, link graph and search index once in
+the parent, then forks reader processes that accept on one shared
+listening socket.  The forked readers start with those structures already
+in memory and share their pages copy-on-write, so adding cores adds
+throughput without adding a copy of the repository per worker.  The
+objects are moved to the garbage collector's permanent generation before
+forking, so collections in the children do not touch, and thereby copy,
+the shared pages.
+
+Writes go to a single writer process: readers forward ``WRITE_ROUTES``
+over a Unix socket, so uploads are queued, ingested and polled in one
+place, as with the development server.
+
+The parent watches HEAD.  When it moves, the parent brings its own copies
+up to date (only the changed files are re-read), forks a fresh generation
+of readers and then asks the old ones to finish their in-flight requests
+and exit.  Counters on ``/metrics`` are kept per process.
+"""
+
+import gc
+import http.client
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from . import app as app_module
+from .gitobjects import close_object_readers
+from .graph import get_link_graph
+from .index import get_index
+from .search import get_search_index
+from .utils import read_head
+
+# Paths handled by the writer process; readers forward them
+WRITE_ROUTES = ("/upload", "/jobs")
+# How often the parent checks HEAD and its children
+POLL_SECONDS = 1.0
+# How long a retiring worker may spend on in-flight requests before it is killed
+GRACEFUL_TIMEOUT = 30.0
+# Idle keep-alive connections are closed after this long, so they do not
+# hold a retiring worker open
+KEEPALIVE_SECONDS = 5.0
+LISTEN_BACKLOG = 1024
+# Largest piece of a forwarded body held in memory at once
+CHUNK_BYTES = 64 * 1024
+
+# Not forwarded between client, reader and writer
+_HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+               "te", "trailer", "transfer-encoding", "upgrade"}
+# Handled by the parent, and reset in each child
+_PARENT_SIGNALS = {signal.SIGTERM, signal.SIGINT, signal.SIGHUP}
+
+
+class _RequestHandler(WSGIRequestHandler):
+    timeout = KEEPALIVE_SECONDS
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection to a server listening on a Unix socket."""
+
+    def __init__(self, path, timeout=GRACEFUL_TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+        self.path = str(path)
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class WriterProxy:
+    """
+    WSGI middleware that passes write routes to the writer process.
+
+    Request and response bodies are streamed in ``CHUNK_BYTES`` pieces,
+    so an upload is spooled by the writer without ever being held whole
+    in a reader.
+
+    Args:
+        app: WSGI application serving everything else.
+        writer_path (Path): Unix socket the writer listens on.
+        routes (tuple): Path prefixes to forward.
+    """
+
+    def __init__(self, app, writer_path, routes=WRITE_ROUTES):
+        self.app = app
+        self.writer_path = writer_path
+        self.routes = routes
+
+    def forwards(self, path):
+        return any(path == route or path.startswith(route + "/") for route in self.routes)
+
+    def __call__(self, environ, start_response):
+        if not self.forwards(environ.get('PATH_INFO', '')):
+            return self.app(environ, start_response)
+
+        headers = {name[5:].replace("_", "-").title(): value for name, value in environ.items()
+                   if name.startswith("HTTP_") and name[5:].replace("_", "-").lower() not in _HOP_BY_HOP}
+        if environ.get('CONTENT_TYPE'):
+            headers['Content-Type'] = environ['CONTENT_TYPE']
+        stream = environ['wsgi.input']
+        if environ.get('wsgi.input_terminated'):
+            # Length unknown: http.client sends the chunks with chunked encoding
+            body = _read_chunks(stream)
+        elif int(environ.get('CONTENT_LENGTH') or 0):
+            length = int(environ['CONTENT_LENGTH'])
+            headers['Content-Length'] = str(length)
+            body = _read_chunks(stream, length)
+        else:
+            body = None
+        url = quote((environ.get('SCRIPT_NAME', '') + environ['PATH_INFO']).encode('latin-1'))
+        if environ.get('QUERY_STRING'):
+            url += "?" + environ['QUERY_STRING']
+
+        connection = _UnixHTTPConnection(self.writer_path)
+        try:
+            connection.request(environ['REQUEST_METHOD'], url, body=body, headers=headers)
+            response = connection.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            print(f"Warning: writer unavailable for {environ['REQUEST_METHOD']} {url}: {e}")
+            start_response("503 Service Unavailable", [("Content-Type", "text/plain"), ("Retry-After", "1")])
+            return [b"Writer unavailable"]
+        start_response(f"{response.status} {response.reason}",
+                       [(name, value) for name, value in response.getheaders()
+                        if name.lower() not in _HOP_BY_HOP])
+        return _ProxiedBody(connection, response)
+
+
+class _ProxiedBody:
+    """WSGI response body relaying the writer's response as it arrives."""
+
+    def __init__(self, connection, response):
+        self.connection = connection
+        self.response = response
+
+    def __iter__(self):
+        while True:
+            chunk = self.response.read1(CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self.connection.close()
+
+
+def _read_chunks(stream, length=None):
+    """Yield ``stream`` in pieces of at most ``CHUNK_BYTES``, stopping after ``length`` bytes if given."""
+    while length is None or length > 0:
+        chunk = stream.read(CHUNK_BYTES if length is None else min(CHUNK_BYTES, length))
+        if not chunk:
+            return
+        if length is not None:
+            length -= len(chunk)
+        yield chunk
+
+
+def preload(repo_dir):
+    """
+    Bring the shared index, link graph and search index of ``repo_dir``
+    up to HEAD.
+
+    Returns:
+        Optional[str]: The commit they were loaded at.
+    """
+    index = get_index(repo_dir)
+    head = index.commit
+    index.by_subsystem()
+    get_link_graph(repo_dir).refresh()
+    get_search_index(repo_dir).refresh()
+    return head
+
+
+def _watch_parent(parent, server):
+    """Stop ``server`` once the process that forked it has gone."""
+    while os.getppid() == parent:
+        time.sleep(POLL_SECONDS)
+    server.shutdown()
+
+
+def _serve_child(server):
+    """Run ``server`` until SIGTERM or the parent exits, then finish in-flight requests."""
+    # Request threads are joined on close instead of being abandoned
+    server.daemon_threads = False
+    server.block_on_close = True
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    threading.Thread(target=_watch_parent, args=(os.getppid(), server), daemon=True).start()
+    server.serve_forever()
+    server.server_close()
+
+
+def _fork(target, *args):
+    """Run ``target(*args)`` in a child process and return its pid."""
+    # Buffered output would otherwise be written again by the child
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # Until the child replaces them, the parent's handlers would swallow a SIGTERM
+    signal.pthread_sigmask(signal.SIG_BLOCK, _PARENT_SIGNALS)
+    pid = os.fork()
+    if pid:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _PARENT_SIGNALS)
+        return pid
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # The parent turns Ctrl-C into SIGTERM for every child
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, _PARENT_SIGNALS)
+    status = 1
+    try:
+        target(*args)
+        status = 0
+    except BaseException as e:
+        print(f"Error: worker {os.getpid()} failed: {e!r}")
+    finally:
+        close_object_readers()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+class PreforkServer:
+    """
+    Parent process of a preforked server.
+
+    Args:
+        app: WSGI application to serve.
+        repo_dir (Path): Requirements folder the application serves.
+        host (str): Address to bind.
+        port (int): Port to bind; 0 picks a free one.
+        workers (int): Reader processes to run.
+    """
+
+    def __init__(self, app, repo_dir, host="127.0.0.1", port=5000, workers=2):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.app = app
+        self.repo_dir = Path(repo_dir)
+        self.host = host
+        self.workers = workers
+        self.socket = socket.create_server((host, port), backlog=LISTEN_BACKLOG,
+                                           family=socket.AF_INET6 if ":" in host else socket.AF_INET)
+        self.port = self.socket.getsockname()[1]
+        self._writer_dir = Path(tempfile.mkdtemp(prefix="tracespec-writer-"))
+        self.writer_path = self._writer_dir / "writer.sock"
+        self.writer_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.writer_socket.bind(str(self.writer_path))
+        self.writer_socket.listen(LISTEN_BACKLOG)
+        self.head = None
+        self.readers = set()
+        self.writer = None
+        # pid -> time by which a retiring reader is killed
+        self.retiring = {}
+        self._stopping = False
+        self._reload_requested = False
+
+    def _run_reader(self):
+        self.writer_socket.close()
+        server = make_server(self.host, self.port, WriterProxy(self.app, self.writer_path),
+                             threaded=True, request_handler=_RequestHandler, fd=self.socket.fileno())
+        _serve_child(server)
+
+    def _run_writer(self):
+        self.socket.close()
+        server = make_server(f"unix://{self.writer_path}", 0, self.app, threaded=True,
+                             request_handler=_RequestHandler, fd=self.writer_socket.fileno())
+        _serve_child(server)
+        # Let queued ingests finish rather than leave a half-written commit
+        if app_module._ingest_queue is not None:
+            app_module._ingest_queue.join()
+
+    def _load(self):
+        """Preload in the parent and freeze the result, so children share it."""
+        gc.unfreeze()
+        started = time.perf_counter()
+        self.head = preload(self.repo_dir)
+        gc.collect()
+        gc.freeze()
+        counts = get_index(self.repo_dir).counts()
+        print(f"Loaded {sum(counts.values())} requirements at {(self.head or 'no commit')[:12]} "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    def _spawn_readers(self, count):
+        for _ in range(count):
+            self.readers.add(_fork(self._run_reader))
+
+    def _spawn_writer(self):
+        self.writer = _fork(self._run_writer)
+
+    def _retire(self, pids):
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        for pid in pids:
+            self._signal(pid, signal.SIGTERM)
+            self.retiring[pid] = deadline
+
+    @staticmethod
+    def _signal(pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def reload(self):
+        """Reload at the current HEAD and replace the readers without dropping requests."""
+        try:
+            self._load()
+        except Exception as e:
+            print(f"Warning: reload failed, keeping current workers: {e}")
+            return
+        old = self.readers
+        self.readers = set()
+        self._spawn_readers(self.workers)
+        self._retire(old)
+
+    def _reap(self):
+        """Collect exited children, restarting any that were not asked to stop."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if self.retiring.pop(pid, None) is not None or self._stopping:
+                self.readers.discard(pid)
+                continue
+            print(f"Warning: worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            if pid == self.writer:
+                self._spawn_writer()
+            elif pid in self.readers:
+                self.readers.discard(pid)
+                self._spawn_readers(1)
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def serve_forever(self):
+        """Fork the workers and supervise them until SIGTERM or SIGINT."""
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        try:
+            self._load()
+            self._spawn_writer()
+            self._spawn_readers(self.workers)
+            print(f"Listening on http://{self.host}:{self.port} with {self.workers} readers "
+                  f"and 1 writer (parent {os.getpid()})")
+            while not self._stopping:
+                time.sleep(POLL_SECONDS)
+                self._reap()
+                now = time.monotonic()
+                for pid, deadline in list(self.retiring.items()):
+                    if now > deadline:
+                        self._signal(pid, signal.SIGKILL)
+                if self._stopping:
+                    break
+                head = read_head(self.repo_dir)
+                if head != self.head or self._reload_requested:
+                    self._reload_requested = False
+                    print(f"HEAD at {(head or 'no commit')[:12]}, reloading workers")
+                    self.reload()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Stop every child, giving in-flight requests ``GRACEFUL_TIMEOUT`` to finish."""
+        self._stopping = True
+        children = set(self.readers) | set(self.retiring)
+        if self.writer:
+            children.add(self.writer)
+        for pid in children:
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while children:
+            try:
+                pid, _status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                children.discard(pid)
+            elif time.monotonic() > deadline:
+                for pid in children:
+                    self._signal(pid, signal.SIGKILL)
+                deadline = float('inf')
+            else:
+                time.sleep(0.05)
+        self.readers.clear()
+        self.retiring.clear()
+        self.writer = None
+        self.socket.close()
+        self.writer_socket.close()
+        shutil.rmtree(self._writer_dir, ignore_errors=True)
+
+
+def serve(app, repo_dir, host="127.0.0.1", port=5000, workers=2):
+    """
+    Serve ``app`` from ``workers`` forked readers and one writer until
+    SIGTERM or SIGINT.  SIGHUP reloads the workers without waiting for
+    HEAD to move.
+
+    Args:
+        app: WSGI application to serve.
+        repo_dir (Path): Requirements folder the application serves.
+        host (str): Address to bind.
+        port (int): Port to bind.
+        workers (int): Reader processes to run.
+    """
+    PreforkServer(app, repo_dir, host=host, port=port, workers=workers).serve_forever()
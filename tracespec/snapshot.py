@@ -0,0 +1,244 @@
+"""
+Read-only views of the requirements as they were at any commit.
+
+Trees and blobs are read straight from the object store through the shared
+``git cat-file`` pool, so nothing is checked out.  Everything parsed is
+keyed by the id of the Git tree it came from, and trees never change, so
+the cache only needs a memory bound.  Subsystems that did not change
+between two baselines share a tree id and are parsed only once.
+"""
+
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+from .cache import LRUCache
+from .gitobjects import BATCH_SIZE, GitObjectMissing, get_object_reader
+from .model import Requirement
+from .utils import extract_subsystem
+
+SNAPSHOT_CACHE_BYTES = int(os.environ.get("TRACESPEC_SNAPSHOT_CACHE_BYTES", 64 * 1024 * 1024))
+
+# Values are (approximate size in bytes, payload); parsed records cost a
+# few times their JSON size in memory
+_RECORD_OVERHEAD = 4
+_TREE_ENTRY_BYTES = 100
+_FULL_OID = re.compile(r'^(?:[0-9a-f]{40}|[0-9a-f]{64})$')
+
+
+def _cached_size(value):
+    return value[0]
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _cache_for(repo_dir) -> LRUCache:
+    key = Path(repo_dir).resolve()
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = LRUCache(SNAPSHOT_CACHE_BYTES, sizeof=_cached_size)
+        return cache
+
+
+def snapshot_cache_stats():
+    """Return the summed counters of every repository's snapshot cache."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    totals = {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+    for cache in caches:
+        stats = cache.stats()
+        for field in totals:
+            totals[field] += stats[field]
+    return totals
+
+
+def parse_tree(data: bytes, oid_size: int) -> list:
+    """
+    Parse the body of a Git tree object.
+
+    Args:
+        data (bytes): Raw tree content, as returned by ``git cat-file``.
+        oid_size (int): Bytes per object id (20 for SHA-1, 32 for SHA-256).
+
+    Returns:
+        list: ``(mode, name, oid)`` tuples in tree order.
+    """
+    entries = []
+    pos = 0
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        nul = data.index(b"\0", space)
+        mode = data[pos:space].decode("ascii")
+        name = data[space + 1:nul].decode("utf-8")
+        oid = data[nul + 1:nul + 1 + oid_size].hex()
+        entries.append((mode, name, oid))
+        pos = nul + 1 + oid_size
+    return entries
+
+
+class Snapshot:
+    """
+    The requirements folder as of one commit.
+
+    Use ``get_snapshot`` rather than constructing this directly.
+    """
+
+    def __init__(self, repo_dir, commit, tree):
+        self.repo_dir = Path(repo_dir)
+        self.commit = commit
+        self._reader = get_object_reader(self.repo_dir)
+        self._cache = _cache_for(self.repo_dir)
+        self._oid_size = len(commit) // 2
+        # subsystem -> tree id; no tree means the folder did not exist yet
+        self._subsystems = {name: oid for mode, name, oid in (self._tree(tree) if tree else ())
+                            if mode == "40000"}
+
+    def _tree(self, oid):
+        key = ("tree", oid)
+        cached = self._cache.get(key)
+        if cached is None:
+            entries = parse_tree(self._reader.read(oid).data, self._oid_size)
+            cached = (len(entries) * _TREE_ENTRY_BYTES, entries)
+            self._cache.put(key, cached)
+        return cached[1]
+
+    def _blobs(self, name):
+        """Return ``{requirement_id: blob id}`` for one subsystem; do not modify it."""
+        oid = self._subsystems.get(name)
+        if oid is None:
+            return {}
+        key = ("blobs", oid)
+        cached = self._cache.get(key)
+        if cached is None:
+            blobs = {entry_name[:-len(".json")]: blob
+                     for mode, entry_name, blob in self._tree(oid)
+                     if mode != "40000" and entry_name.endswith(".json")}
+            cached = (len(blobs) * _TREE_ENTRY_BYTES, blobs)
+            self._cache.put(key, cached)
+        return cached[1]
+
+    def tree_id(self, name):
+        """Return the id of a subsystem's tree, or None if it does not exist."""
+        return self._subsystems.get(name.lower())
+
+    def blob_id(self, req_id):
+        """Return the id of a requirement's blob, or None if it does not exist."""
+        subsystem = extract_subsystem(req_id)
+        if not subsystem:
+            return None
+        return self._blobs(subsystem.lower()).get(req_id)
+
+    def subsystems(self):
+        """Return the subsystem names, sorted."""
+        return sorted(self._subsystems)
+
+    def counts(self):
+        """Return {subsystem: number of requirements}, reading only trees."""
+        return {name: len(self._blobs(name)) for name in self.subsystems()}
+
+    def subsystem(self, name):
+        """Return the requirements of one subsystem sorted by ID (empty if unknown)."""
+        name = name.lower()
+        oid = self._subsystems.get(name)
+        if oid is None:
+            return []
+        key = ("records", oid)
+        cached = self._cache.get(key)
+        if cached is None:
+            blobs = list(self._blobs(name).values())
+            records, size = [], 0
+            for blob in self._reader.read_many(blobs):
+                try:
+                    records.append(Requirement.from_dict(json.loads(blob.data)))
+                except Exception as e:
+                    print(f"Error loading {name}/{blob.oid} at {self.commit}: {e}")
+                size += blob.size
+            records.sort(key=lambda x: x.get('requirement_id', ''))
+            cached = (size * _RECORD_OVERHEAD, records)
+            self._cache.put(key, cached)
+        return cached[1]
+
+    def by_subsystem(self):
+        """Return all requirements grouped by subsystem, like ``RequirementIndex.by_subsystem``."""
+        return {name: self.subsystem(name) for name in self.subsystems()}
+
+    def iter_subsystem(self, name):
+        """
+        Yield the requirements of one subsystem in ID order.
+
+        Blobs are read in batches and the parsed records are not cached, so
+        exporting a large baseline neither holds it in memory nor evicts
+        the subsystems being browsed.
+        """
+        name = name.lower()
+        oid = self._subsystems.get(name)
+        if oid is None:
+            return
+        cached = self._cache.get(("records", oid))
+        if cached is not None:
+            yield from cached[1]
+            return
+        blobs = [oid for _req_id, oid in sorted(self._blobs(name).items())]
+        for i in range(0, len(blobs), BATCH_SIZE):
+            for blob in self._reader.read_many(blobs[i:i + BATCH_SIZE]):
+                yield Requirement.from_dict(json.loads(blob.data))
+
+    def get(self, req_id):
+        """Return one requirement as of this commit, or None."""
+        return self.get_many([req_id]).get(req_id)
+
+    def get_many(self, req_ids):
+        """
+        Look up many requirements as of this commit with one batched read.
+
+        Returns:
+            dict: requirement_id -> requirement for every ID that exists.
+        """
+        wanted = []
+        subsystems = {}
+        for req_id in req_ids:
+            subsystem = extract_subsystem(req_id)
+            if not subsystem:
+                continue
+            name = subsystem.lower()
+            if name not in subsystems:
+                subsystems[name] = self._blobs(name)
+            blob = subsystems[name].get(req_id)
+            if blob is not None:
+                wanted.append((req_id, blob))
+        blobs = self._reader.read_many(oid for _req_id, oid in wanted)
+        return {req_id: Requirement.from_dict(json.loads(blob.data))
+                for (req_id, _oid), blob in zip(wanted, blobs)}
+
+
+def get_snapshot(commit: str, repo_dir: Path) -> Snapshot:
+    """
+    Return the requirements folder as of ``commit``.
+
+    Args:
+        commit (str): Commit id, tag or any other revision.
+        repo_dir (Path): Requirements folder inside the Git working tree.
+
+    Raises:
+        GitObjectMissing: If ``commit`` does not name a commit.
+    """
+    # A commit id always names the same tree, so resolving it is remembered
+    cache = _cache_for(repo_dir)
+    if _FULL_OID.match(commit):
+        cached = cache.get(("commit", commit))
+        if cached is not None:
+            return Snapshot(repo_dir, commit, cached[1])
+    reader = get_object_reader(repo_dir)
+    resolved = reader.info(f"{commit}^{{commit}}")
+    if resolved is None:
+        raise GitObjectMissing(f"Unknown commit: {commit}")
+    # "<commit>:./" names the tree at the reader's working directory
+    tree = reader.info(f"{resolved.oid}:./")
+    tree = tree.oid if tree and tree.type == "tree" else None
+    cache.put(("commit", resolved.oid), (_TREE_ENTRY_BYTES, tree))
+    return Snapshot(repo_dir, resolved.oid, tree)
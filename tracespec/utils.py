@@ -1,9 +1,31 @@
 import re
+import time
 from typing import Optional
 import subprocess
 
 from pathlib import Path
 
+from .gitobjects import GitObjectMissing, get_object_reader
+from .metrics import GIT_COMMAND_SECONDS
+
+
+def run_git(args, cwd: Path, **kwargs) -> subprocess.CompletedProcess:
+    """
+    Run ``git <args>`` through ``subprocess.run``, recording its latency.
+    
+    Args:
+        args (list): Arguments after ``git``; the first names the subcommand.
+        **kwargs: Passed through to ``subprocess.run``.
+    
+    Returns:
+        subprocess.CompletedProcess: The finished process.
+    """
+    start = time.perf_counter()
+    try:
+        return subprocess.run(["git", *args], cwd=cwd, **kwargs)
+    finally:
+        GIT_COMMAND_SECONDS.observe(time.perf_counter() - start, command=args[0])
+
 
 def git_commit(filepath: str, message: str, cwd: Path):
     """
@@ -13,29 +35,86 @@ def git_commit(filepath: str, message: str, cwd: Path):
         filepath (str): Path to the file relative to the Git repo root.
         message (str): Commit message.
     """
-    subprocess.run(["git", "add", filepath], cwd=cwd, check=True)
-    subprocess.run(["git", "commit", "-m", message], cwd=cwd, check=True)
+    run_git(["add", filepath], cwd=cwd, check=True)
+    run_git(["commit", "-m", message], cwd=cwd, check=True)
+
+def git_commit_files(filepaths, message: str, cwd: Path):
+    """
+    Stage many files and record them in a single Git commit.
+
+    The paths are streamed to Git over stdin rather than the command line,
+    so the cost is two processes per commit regardless of how many files
+    are included.
 
-def git_diff(filepath: str, commit1: str, commit2: str, cwd: Path) -> str:
+    Args:
+        filepaths (list): Paths relative to ``cwd``.
+        message (str): Commit message.
+    """
+    pathspec = "\0".join(str(p) for p in filepaths)
+    run_git(
+        ["add", "--pathspec-from-file=-", "--pathspec-file-nul"],
+        input=pathspec, cwd=cwd, text=True, check=True
+    )
+    run_git(
+        ["commit", "-q", "-m", message,
+         "--pathspec-from-file=-", "--pathspec-file-nul"],
+        input=pathspec, cwd=cwd, text=True, check=True
+    )
+
+def git_tag(tag: str, message: str, cwd: Path, commit: str = "HEAD"):
+    """
+    Create an annotated Git tag.
+    
+    Args:
+        tag (str): Tag name, e.g. "v1.0".
+        message (str): Tag message.
+        commit (str): Commit to tag (defaults to HEAD).
+    """
+    run_git(["tag", "-a", tag, "-m", message, commit], cwd=cwd, check=True)
+
+def git_diff(filepath: str, commit1: str, commit2: str, cwd: Path, cache=None) -> str:
     """
     Return the diff of a file between two Git commits.
     
+    The blob ids are resolved through the shared ``git cat-file`` pool, so
+    unchanged files and cached diffs never start a ``git`` process; only a
+    cache miss runs ``git diff``.
+    
     Args:
         filepath (str): Path to the file relative to the Git repo root.
         commit1 (str): Older commit hash.
         commit2 (str): Newer commit hash.
+        cache (DiffCache, optional): Cache of ``git diff`` output keyed by blob ids.
     
     Returns:
         str: Unified diff output.
+    
+    Raises:
+        GitObjectMissing: If either commit does not exist.
     """
-    result = subprocess.run(
-        ["git", "diff", commit1, commit2, "--", filepath],
-        cwd=cwd,
-        capture_output=True,
-        text=True,
-        check=True
-    )
-    return result.stdout
+    reader = get_object_reader(cwd)
+    for commit in (commit1, commit2):
+        if reader.info(f"{commit}^{{commit}}") is None:
+            raise GitObjectMissing(f"Unknown commit: {commit}")
+
+    old = reader.info(f"{commit1}:{filepath}")
+    new = reader.info(f"{commit2}:{filepath}")
+    old_oid = old.oid if old else None
+    new_oid = new.oid if new else None
+    if old_oid == new_oid:
+        return ""
+
+    key = cache.key(old_oid, new_oid) if cache is not None else None
+    diff = cache.get(key) if cache is not None else None
+    # The output names the file, so a blob pair cached under another path is a miss
+    if diff is None or not diff.startswith(f"diff --git a/{filepath} b/{filepath}\n"):
+        diff = run_git(
+            ["diff", commit1, commit2, "--", f":(top){filepath}"],
+            cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout
+        if cache is not None:
+            cache.put(key, diff)
+    return diff
 
 def git_show_file(filepath: str, commit: str, cwd: Path) -> str:
     """
@@ -47,16 +126,101 @@ def git_show_file(filepath: str, commit: str, cwd: Path) -> str:
     
     Returns:
         str: File content at the given commit.
+    
+    Raises:
+        GitObjectMissing: If the file does not exist at that commit.
+    """
+    obj = get_object_reader(cwd).read(f"{commit}:{filepath}")
+    return obj.data.decode("utf-8")
+
+
+def git_changed_files(commit1: str, commit2: str, cwd: Path) -> list:
+    """
+    List files that differ between two commits, relative to ``cwd``.
+    
+    Args:
+        commit1 (str): Older commit hash.
+        commit2 (str): Newer commit hash.
+    
+    Returns:
+        list: Paths relative to ``cwd`` that were added, modified or removed.
     """
-    full_path = f"{commit}:{filepath}"
-    result = subprocess.run(
-        ["git", "show", full_path],
+    result = run_git(
+        ["diff-tree", "-r", "--no-commit-id", "--name-only", "--relative", "-z",
+         commit1, commit2],
         cwd=cwd,
         capture_output=True,
         text=True,
         check=True
     )
-    return result.stdout
+    return [p for p in result.stdout.split("\0") if p]
+
+_git_dirs = {}
+
+def _find_git_dirs(cwd: Path):
+    if cwd in _git_dirs:
+        return _git_dirs[cwd]
+    for folder in (cwd, *cwd.parents):
+        dotgit = folder / ".git"
+        if dotgit.is_dir():
+            git_dir = dotgit
+        elif dotgit.is_file():
+            # Linked worktree or submodule: ".git" holds "gitdir: <path>"
+            target = dotgit.read_text(encoding="utf-8").strip().split("gitdir:", 1)[1].strip()
+            git_dir = (folder / target).resolve()
+        else:
+            continue
+        common = git_dir / "commondir"
+        if common.exists():
+            common_dir = (git_dir / common.read_text(encoding="utf-8").strip()).resolve()
+        else:
+            common_dir = git_dir
+        _git_dirs[cwd] = (git_dir, common_dir)
+        return git_dir, common_dir
+    return None, None
+
+def git_dir(cwd: Path) -> Optional[Path]:
+    """
+    Locate the ``.git`` directory for the working tree containing ``cwd``.
+    
+    Returns:
+        Optional[Path]: The Git directory, or None if ``cwd`` is not in a repo.
+    """
+    return _find_git_dirs(Path(cwd).resolve())[0]
+
+def read_head(cwd: Path) -> Optional[str]:
+    """
+    Resolve HEAD to a commit id by reading the ref files directly.
+    
+    This avoids starting ``git rev-parse`` and is cheap enough to call on
+    every request.
+    
+    Returns:
+        Optional[str]: The commit id, or None for an unborn branch or no repo.
+    """
+    head_dir, common_dir = _find_git_dirs(Path(cwd).resolve())
+    if head_dir is None:
+        return None
+
+    head = (head_dir / "HEAD").read_text(encoding="utf-8").strip()
+    if not head.startswith("ref:"):
+        return head
+    ref = head[4:].strip()
+
+    for base in (head_dir, common_dir):
+        try:
+            return (base / ref).read_text(encoding="utf-8").strip()
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+
+    try:
+        packed = (common_dir / "packed-refs").read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    for line in packed.splitlines():
+        if line.endswith(" " + ref) and not line.startswith(("#", "^")):
+            return line.split(" ", 1)[0]
+    return None
 
 
 def extract_subsystem(requirement_id: str) -> Optional[str]:
@@ -0,0 +1,162 @@
+"""
+Per-requirement version history built from a single ``git log`` walk.
+
+Listing the versions of one requirement with ``git log -- <file>`` walks
+the whole history every time.  ``HistoryIndex`` walks it once, recording
+for every requirement the commits that added, modified or removed its
+file, and afterwards only walks the commits made since the last one it
+indexed.  The index is stored inside the Git directory, next to the
+ingest manifest.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .utils import git_dir, read_head, run_git
+
+HISTORY_VERSION = 1
+
+_CHANGES = {'A': 'added', 'M': 'modified', 'D': 'removed'}
+# Marks the line starting each commit in the log output
+_COMMIT_MARK = "\x1e"
+_LOG_FORMAT = f"--format={_COMMIT_MARK}%H%x1f%an%x1f%ae%x1f%at%x1f%s"
+
+
+class HistoryIndex:
+    """
+    requirement_id -> the commits that changed it, oldest first.
+
+    Args:
+        repo_dir (Path): Requirements folder inside the Git working tree.
+    """
+
+    def __init__(self, repo_dir):
+        self.repo_dir = Path(repo_dir)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.head = None
+        # commit id -> [author name, author email, unix time, subject]
+        self.commits = {}
+        # requirement_id -> [[commit id, change], ...]
+        self.requirements = {}
+
+    @property
+    def path(self) -> Path:
+        return git_dir(self.repo_dir) / "tracespec" / "history.json"
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("version") == HISTORY_VERSION:
+            self.head = data["head"]
+            self.commits = data["commits"]
+            self.requirements = data["requirements"]
+
+    def _save(self):
+        path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "version": HISTORY_VERSION,
+            "head": self.head,
+            "commits": self.commits,
+            "requirements": self.requirements,
+        }), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _is_ancestor(self, commit, head):
+        result = run_git(["merge-base", "--is-ancestor", commit, head],
+                         cwd=self.repo_dir, capture_output=True)
+        return result.returncode == 0
+
+    def _walk(self, revisions):
+        """Record every commit in ``revisions`` that touched a requirement file."""
+        result = run_git(
+            ["log", "--reverse", "--no-renames", "--name-status", "--relative", _LOG_FORMAT,
+             *revisions, "--", "."],
+            cwd=self.repo_dir, capture_output=True, text=True, encoding="utf-8", check=True
+        )
+        commit = None
+        # Not splitlines(), which also breaks on the \x1e commit mark
+        for line in result.stdout.split("\n"):
+            if line.startswith(_COMMIT_MARK):
+                commit, name, email, timestamp, subject = line[1:].split("\x1f", 4)
+                self.commits[commit] = [name, email, int(timestamp), subject]
+                continue
+            status, _, path = line.partition("\t")
+            parts = Path(path).parts
+            change = _CHANGES.get(status[:1])
+            if commit is None or change is None or len(parts) != 2 or not parts[1].endswith(".json"):
+                continue
+            self.requirements.setdefault(parts[1][:-len(".json")], []).append([commit, change])
+
+    def refresh(self):
+        """
+        Bring the index up to HEAD, walking only commits not yet indexed.
+
+        The whole history is walked again if the last indexed commit is no
+        longer an ancestor of HEAD (for example after a reset).
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+            head = read_head(self.repo_dir)
+            if head == self.head:
+                return
+            if head is None:
+                self.head, self.commits, self.requirements = None, {}, {}
+            elif self.head is not None and self._is_ancestor(self.head, head):
+                self._walk([f"{self.head}..{head}"])
+                self.head = head
+            else:
+                self.commits, self.requirements = {}, {}
+                self._walk([head])
+                self.head = head
+            try:
+                self._save()
+            except OSError as e:
+                print(f"Warning: could not save history index {self.path}: {e}")
+
+    def versions(self, req_id):
+        """
+        Return the versions of one requirement, oldest first.
+
+        Returns:
+            list: Dicts with 'commit', 'change', 'author', 'email',
+                'timestamp' (Unix seconds), 'date' (ISO 8601, UTC) and
+                'subject'.  Empty if the requirement was never committed.
+        """
+        self.refresh()
+        with self._lock:
+            entries = list(self.requirements.get(req_id, ()))
+            commits = [(commit, change, self.commits[commit]) for commit, change in entries]
+        return [{
+            'commit': commit,
+            'change': change,
+            'author': name,
+            'email': email,
+            'timestamp': timestamp,
+            'date': datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+            'subject': subject,
+        } for commit, change, (name, email, timestamp, subject) in commits]
+
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def get_history(repo_dir) -> HistoryIndex:
+    """Return the shared history index for ``repo_dir``, creating it on first use."""
+    key = Path(repo_dir).resolve()
+    with _histories_lock:
+        history = _histories.get(key)
+        if history is None:
+            history = _histories[key] = HistoryIndex(key)
+        return history